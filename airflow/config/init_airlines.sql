@@ -58,6 +58,111 @@ CREATE INDEX IF NOT EXISTS idx_dynamic_callsign ON flight_dynamic(callsign);
 CREATE INDEX IF NOT EXISTS idx_dynamic_departure ON flight_dynamic(departure_scheduled);
 CREATE INDEX IF NOT EXISTS idx_dynamic_arrival ON flight_dynamic(arrival_scheduled);
 CREATE INDEX IF NOT EXISTS idx_dynamic_callsign_update ON flight_dynamic(callsign, last_update DESC);
+CREATE INDEX IF NOT EXISTS idx_dynamic_last_update ON flight_dynamic(last_update);
+CREATE INDEX IF NOT EXISTS idx_dynamic_open_last_update ON flight_dynamic(last_update) WHERE status IN ('en route', 'departing');
+CREATE INDEX IF NOT EXISTS idx_dynamic_flight_latest ON flight_dynamic(callsign, icao24, flight_date DESC, departure_scheduled DESC);
+
+-- VIEW: flight_datasets (équivalent SQL de flight_features.build_flight_datasets, lue par l'API)
+-- Seuils à garder alignés sur api/services/flight_features.py et api/core/config.py
+CREATE OR REPLACE VIEW flight_datasets AS
+WITH base AS (
+    SELECT
+        fd.*,
+        fd.flight_date + fd.departure_scheduled AS dep_sched,
+        fd.flight_date + fd.departure_actual AS dep_act,
+        fd.flight_date + fd.arrival_scheduled AS arr_sched,
+        fd.flight_date + fd.arrival_actual AS arr_act,
+        fd.last_update AT TIME ZONE 'UTC' AS last_update_utc,
+        now() AT TIME ZONE 'UTC' AS now_utc
+    FROM flight_dynamic fd
+),
+-- Recalage J-1 global (DAY_SHIFT_HORIZON : 6 h)
+yesterday AS (
+    SELECT *,
+        COALESCE(status IN ('en route', 'arrived') AND dep_sched > now_utc + interval '6 hours', false) AS is_yesterday
+    FROM base
+),
+-- Recalage J-1 (scheduled + actual)
+yesterday_actual AS (
+    SELECT *,
+        is_yesterday AND (
+            COALESCE(dep_act > now_utc + interval '6 hours', false) OR
+            COALESCE(arr_act > now_utc + interval '6 hours', false)
+        ) AS is_yesterday_actual
+    FROM yesterday
+),
+shifted AS (
+    SELECT *,
+        CASE WHEN is_yesterday THEN dep_sched - interval '1 day' ELSE dep_sched END AS dep_sched_1,
+        CASE WHEN is_yesterday THEN arr_sched - interval '1 day' ELSE arr_sched END AS arr_sched_1,
+        CASE WHEN is_yesterday_actual THEN dep_act - interval '1 day' ELSE dep_act END AS dep_act_1,
+        CASE WHEN is_yesterday_actual THEN arr_act - interval '1 day' ELSE arr_act END AS arr_act_1
+    FROM yesterday_actual
+),
+-- Corrections individuelles J+1
+next_day AS (
+    SELECT *,
+        NOT is_yesterday AND COALESCE(dep_act_1 < dep_sched_1, false) AS dep_next_day,
+        COALESCE(arr_sched_1 < dep_sched_1, false) AS arr_sched_next_day
+    FROM shifted
+),
+next_day_departure AS (
+    SELECT *,
+        CASE WHEN dep_next_day THEN dep_act_1 + interval '1 day' ELSE dep_act_1 END AS dep_act_2,
+        CASE WHEN arr_sched_next_day THEN arr_sched_1 + interval '1 day' ELSE arr_sched_1 END AS arr_sched_2
+    FROM next_day
+),
+next_day_arrival AS (
+    SELECT *,
+        COALESCE(arr_act_1 < dep_act_2, false) AS arr_act_next_day
+    FROM next_day_departure
+),
+normalized AS (
+    SELECT *,
+        CASE WHEN arr_act_next_day THEN arr_act_1 + interval '1 day' ELSE arr_act_1 END AS arr_act_2
+    FROM next_day_arrival
+),
+-- Validation métier et calcul des différences
+classified AS (
+    SELECT *,
+        COALESCE(
+            EXTRACT(EPOCH FROM arr_act_2 - dep_act_2) > 24 * 3600 OR EXTRACT(EPOCH FROM arr_act_2 - dep_act_2) < 0,
+            false
+        ) AS suspicious_duration,
+        (EXTRACT(EPOCH FROM dep_act_2 - dep_sched_1) / 60)::double precision AS dep_difference,
+        (EXTRACT(EPOCH FROM arr_act_2 - arr_sched_2) / 60)::double precision AS arr_difference,
+        arr_act_2 IS NULL
+            AND COALESCE(now_utc > arr_sched_2, false)
+            AND COALESCE(EXTRACT(EPOCH FROM now_utc - last_update_utc) > 7200, false) AS is_stale  -- STALE_THRESHOLD (2 h)
+    FROM normalized
+)
+SELECT
+    unique_key, callsign, icao24, status,
+    dep_sched_1 AS departure_scheduled_ts,
+    dep_act_2 AS departure_actual_ts,
+    arr_sched_2 AS arrival_scheduled_ts,
+    arr_act_2 AS arrival_actual_ts,
+    dep_difference AS departure_difference,
+    arr_difference AS arrival_difference,
+    last_update_utc AS last_update,
+    CASE
+        WHEN is_yesterday_actual THEN 'shifted_J-1_global (scheduled+actual)'
+        WHEN is_yesterday THEN 'shifted_J-1_global'
+        WHEN dep_next_day THEN 'shifted_J+1_departure_actual'
+        WHEN arr_sched_next_day THEN 'shifted_J+1_arrival_scheduled'
+        WHEN arr_act_next_day THEN 'shifted_J+1_arrival_actual'
+        ELSE 'initial'
+    END
+        || CASE WHEN is_yesterday AND arr_sched_next_day THEN ' + J+1_arr_sched' ELSE '' END
+        || CASE WHEN is_yesterday AND arr_act_next_day THEN ' + J+1_arr_actual' ELSE '' END
+        || CASE WHEN suspicious_duration THEN ' [SUSPICIOUS_DURATION]' ELSE '' END AS day_adjust_state,
+    suspicious_duration,
+    CASE
+        WHEN status = 'arrived' AND arr_difference IS NOT NULL THEN 'done'
+        WHEN status IN ('departing', 'en route') AND NOT is_stale THEN 'current'
+    END AS dataset
+FROM classified;
+-- FIN VIEW: flight_datasets
 
 -- TABLE: live_data
 CREATE TABLE IF NOT EXISTS live_data (
@@ -90,6 +195,29 @@ CREATE INDEX IF NOT EXISTS idx_live_indice ON live_data(indice DESC);
 CREATE INDEX IF NOT EXISTS idx_live_callsign ON live_data(callsign);
 CREATE INDEX IF NOT EXISTS idx_live_icao24 ON live_data(icao24);
 CREATE INDEX IF NOT EXISTS idx_live_unique_key ON live_data(unique_key);
+CREATE INDEX IF NOT EXISTS idx_live_request_id ON live_data(request_id);
+CREATE INDEX IF NOT EXISTS idx_live_unique_key_indice ON live_data(unique_key, indice DESC);
+
+-- TABLE: live_predictions (pré-calculées par l'API, une ligne par indice et version de modèle)
+CREATE TABLE IF NOT EXISTS live_predictions (
+    indice INTEGER NOT NULL,
+    model_version VARCHAR(50) NOT NULL,
+    predicted_delay DOUBLE PRECISION,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (indice, model_version),
+    CONSTRAINT fk_live_predictions_indice FOREIGN KEY(indice)
+        REFERENCES live_data(indice) ON DELETE CASCADE
+);
+
+-- TABLE: weather_cache (météo par cellule de grille et tranche de temps, partagée entre runs)
+CREATE TABLE IF NOT EXISTS weather_cache (
+    cell TEXT NOT NULL,
+    bucket BIGINT NOT NULL,
+    weather JSONB NOT NULL,
+    fetched_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (cell, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_weather_cache_fetched ON weather_cache(fetched_at);
 
 -- 4. Import des données
 
@@ -80,6 +80,32 @@ def flight_data_pipeline():
 			# (succès ou raise AirflowFailException)
 			push_dag_metrics(registry)
 
+	@task
+	def sweeping():
+		"""Clôture des vols restés en cours sans mise à jour (hors du chemin de lecture du triage), purge du cache météo."""
+		from postgres_client import PostgresClient
+		from weather_client import WeatherClient
+		from prometheus_client import CollectorRegistry, Gauge
+
+		registry = CollectorRegistry()
+		metric_closed = Gauge('etl_stale_flights_closed_run', 'Vols passés à arrived par le sweep (run)', registry=registry)
+
+		postgrescli = PostgresClient()
+		try:
+			closed = postgrescli.close_stale_flights()
+			metric_closed.set(closed)
+			push_dag_metrics(registry)
+			logging.info(f"Sweep : {closed} vols clôturés.")
+
+			weathercli = WeatherClient(postgrescli.new_connection())
+			try:
+				pruned = weathercli.cache.prune()
+			finally:
+				weathercli.close()
+			logging.info(f"Sweep : {pruned} entrées météo expirées supprimées.")
+		finally:
+			postgrescli.close()
+
 	@task
 	def triage(flights: List[Dict]) -> Dict[str, List[Dict]]:
 		from postgres_client import PostgresClient
@@ -92,29 +118,32 @@ def flight_data_pipeline():
 		metric_triage.labels(type='direct').set(0)
 
 		postgrescli = PostgresClient()
-		weathercli = WeatherClient()
+		weathercli = WeatherClient(postgrescli.new_connection())
 		needs_scrape, direct_live = [], []
 
 		try:
-			for f in flights:
-				current_static = postgrescli.get_static_flight(f["callsign"])
-				latest_dynamic = postgrescli.get_latest_dynamic_flight(f["callsign"], f["icao24"])
-				
-				is_incomplete = not current_static or not all([current_static.get("airline_name"), current_static.get("origin_code"), current_static.get("destination_code")])
+			# Une seule requête pour tout le lot (statique + dernier dynamique)
+			for f, decision in zip(flights, postgrescli.triage_flights(flights)):
+				latest_dynamic = decision["dynamic"]
 
-				if is_incomplete or postgrescli.needs_refresh(f["callsign"], f["icao24"], f["on_ground"]):
+				if not decision["static_complete"] or decision["needs_refresh"]:
 					needs_scrape.append(f)
 				elif latest_dynamic:
-					lat, lon = f.get("latitude"), f.get("longitude")
-					if lat and lon: f.update(weathercli.get_weather(lat, lon))
 					f.update({"flight_date": latest_dynamic["flight_date"], "unique_key": latest_dynamic["unique_key"], "departure_scheduled": latest_dynamic["departure_scheduled"].strftime("%H:%M:%S") if latest_dynamic["departure_scheduled"] else None})
 					direct_live.append(f)
 
+			# Météo des vols directs en un lot (cellules dédupliquées, appels concurrents)
+			located = [f for f in direct_live if f.get("latitude") and f.get("longitude")]
+			for f, weather in zip(located, weathercli.get_weather_many([(f["latitude"], f["longitude"]) for f in located])):
+				f.update(weather)
+
 			metric_triage.labels(type='scrape').set(len(needs_scrape))
 			metric_triage.labels(type='direct').set(len(direct_live))
 			push_dag_metrics(registry)
+			weathercli.push_metrics("triage")
 			return {"scrape": needs_scrape, "direct": direct_live}
 		finally:
+			weathercli.close()
 			postgrescli.close()
 
 	@task
@@ -132,7 +161,7 @@ def flight_data_pipeline():
 	
 		seleniumcli = SeleniumClient()
 		postgrescli = PostgresClient()
-		weathercli = WeatherClient()
+		weathercli = WeatherClient(postgrescli.new_connection())
 		flightawarecli = FlightAwareClient(seleniumcli, postgrescli)
 	
 		def time_to_str(t): return t.strftime("%H:%M:%S") if t else None
@@ -148,7 +177,8 @@ def flight_data_pipeline():
 			# Scraping FlightAware
 			static_row = flightawarecli.parse_static_flight(callsign)
 			if not static_row: 
-				return None
+				# Compteurs météo conservés : agrégés au chargement
+				return {"weather_stats": weathercli.stats()}
 	
 			dynamic_row = flightawarecli.parse_dynamic_flight(callsign, icao24)
 			if dynamic_row:
@@ -168,15 +198,18 @@ def flight_data_pipeline():
 			return {
 				"static_rows": [static_row] if static_row.get("commercial_flight") else [],
 				"dynamic_rows": [dynamic_row] if dynamic_row else [],
-				"live_rows": [live_row]
+				"live_rows": [live_row],
+				"weather_stats": weathercli.stats()
 			}
 		finally:
+			weathercli.close()
 			seleniumcli.close()
 			postgrescli.close()
 
 	@task
 	def loading(scrape_results: List[Optional[Dict]], direct_rows: List[Dict]):
 		from postgres_client import PostgresClient
+		from weather_client import push_weather_metrics
 		from prometheus_client import CollectorRegistry, Gauge
 	
 		registry = CollectorRegistry()
@@ -187,30 +220,27 @@ def flight_data_pipeline():
 	
 		postgrescli = PostgresClient()
 		try:
-			count_static, count_dynamic, count_live = 0, 0, 0
-			
-			for res in scrape_results:
-				if res:
-					s, d, l = res.get("static_rows", []), res.get("dynamic_rows", []), res.get("live_rows", [])
-					if s: 
-						postgrescli.insert_flight_static(s)
-						count_static += len(s)
-					if d: 
-						postgrescli.insert_flight_dynamic(d)
-						count_dynamic += len(d)
-					if l: 
-						postgrescli.insert_live_data(l)
-						count_live += len(l)
-	
-			if direct_rows:
-				postgrescli.insert_live_data(direct_rows)
-				count_live += len(direct_rows)
+			results = [res for res in scrape_results if res]
+			static_rows = [row for res in results for row in res.get("static_rows", [])]
+			dynamic_rows = [row for res in results for row in res.get("dynamic_rows", [])]
+			live_rows = [row for res in results for row in res.get("live_rows", [])] + (direct_rows or [])
+
+			# Un chargement en masse par table (ordre imposé par les clés étrangères)
+			count_static = postgrescli.insert_flight_static(static_rows)
+			count_dynamic = postgrescli.insert_flight_dynamic(dynamic_rows)
+			count_live = postgrescli.insert_live_data(live_rows)
+
+			# Réveil du flux live de l'API une fois toutes les lignes du run insérées
+			if count_live:
+				postgrescli.notify_live_data(live_rows[0]["request_id"])
 	
 			metric_loaded.labels(table='static').set(count_static)
 			metric_loaded.labels(table='dynamic').set(count_dynamic)
 			metric_loaded.labels(table='live').set(count_live)
 			
 			push_dag_metrics(registry)
+			# Météo du scraping : un seul push pour toutes les instances mappées
+			push_weather_metrics("scraping", [res["weather_stats"] for res in results if "weather_stats" in res])
 			logging.info(f"Loading terminé: {count_live} lignes live insérées.")
 		finally:
 			postgrescli.close()
@@ -218,6 +248,7 @@ def flight_data_pipeline():
 	# Orchestration 
 	raw_flights = requesting()
 	triage_results = triage(raw_flights)
+	sweeping() >> triage_results
 	
 	# Extraction des listes pour le mapping dynamique
 	list_to_scrape = get_scrape_list(triage_results)
@@ -0,0 +1,146 @@
+import io
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Tuple
+
+import psycopg2
+
+# Chargement en masse : COPY dans une table de staging temporaire puis une fusion INSERT ... SELECT par lot.
+# Module sans dépendance Airflow (connexion psycopg2 fournie par PostgresClient).
+# Plusieurs lignes d'une même clé dans un lot sont regroupées comme si elles étaient appliquées dans l'ordre
+# (ON CONFLICT DO UPDATE ne peut modifier deux fois la même ligne).
+
+@dataclass(frozen = True)
+class BulkTable:
+	table: str
+	columns: Tuple[str, ...]
+	merge: str
+
+	@property
+	def stage(self) -> str:
+		return f"stage_{self.table}"
+
+FLIGHT_STATIC = BulkTable(
+	"flight_static",
+	("callsign", "airline_name", "origin_code", "destination_code", "commercial_flight"),
+	"""
+		INSERT INTO flight_static (callsign, airline_name, origin_code, destination_code, commercial_flight)
+		SELECT callsign,
+			   COALESCE((array_agg(airline_name ORDER BY ord DESC) FILTER (WHERE airline_name != 'Unknown Airline'))[1],
+						(array_agg(airline_name ORDER BY ord))[1]),
+			   (array_agg(origin_code ORDER BY ord DESC) FILTER (WHERE origin_code IS NOT NULL))[1],
+			   (array_agg(destination_code ORDER BY ord DESC) FILTER (WHERE destination_code IS NOT NULL))[1],
+			   (array_agg(commercial_flight ORDER BY ord))[1]
+		FROM stage_flight_static
+		GROUP BY callsign
+		ON CONFLICT (callsign) DO UPDATE SET
+			airline_name = CASE WHEN EXCLUDED.airline_name != 'Unknown Airline' THEN EXCLUDED.airline_name ELSE flight_static.airline_name END,
+			origin_code = COALESCE(EXCLUDED.origin_code, flight_static.origin_code),
+			destination_code = COALESCE(EXCLUDED.destination_code, flight_static.destination_code);
+	"""
+)
+
+FLIGHT_DYNAMIC = BulkTable(
+	"flight_dynamic",
+	("callsign", "icao24", "flight_date", "departure_scheduled", "departure_actual",
+	 "arrival_scheduled", "arrival_actual", "status", "unique_key"),
+	"""
+		INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, departure_actual,
+								   arrival_scheduled, arrival_actual, status, unique_key)
+		SELECT (array_agg(callsign ORDER BY ord))[1], (array_agg(icao24 ORDER BY ord))[1],
+			   (array_agg(flight_date ORDER BY ord))[1], (array_agg(departure_scheduled ORDER BY ord))[1],
+			   (array_agg(departure_actual ORDER BY ord DESC) FILTER (WHERE departure_actual IS NOT NULL))[1],
+			   (array_agg(arrival_scheduled ORDER BY ord))[1],
+			   (array_agg(arrival_actual ORDER BY ord DESC) FILTER (WHERE arrival_actual IS NOT NULL))[1],
+			   (array_agg(status ORDER BY ord DESC))[1], unique_key
+		FROM stage_flight_dynamic
+		GROUP BY unique_key
+		ON CONFLICT (unique_key) DO UPDATE SET
+			status = EXCLUDED.status,
+			departure_actual = COALESCE(EXCLUDED.departure_actual, flight_dynamic.departure_actual),
+			arrival_actual = COALESCE(EXCLUDED.arrival_actual, flight_dynamic.arrival_actual),
+			last_update = NOW();
+	"""
+)
+
+LIVE_DATA = BulkTable(
+	"live_data",
+	("request_id", "callsign", "icao24", "flight_date", "departure_scheduled",
+	 "longitude", "latitude", "baro_altitude", "geo_altitude", "on_ground",
+	 "velocity", "vertical_rate", "temperature", "wind_speed", "gust_speed",
+	 "visibility", "cloud_coverage", "rain", "global_condition", "unique_key"),
+	"""
+		INSERT INTO live_data (request_id, callsign, icao24, flight_date, departure_scheduled,
+							  longitude, latitude, baro_altitude, geo_altitude, on_ground,
+							  velocity, vertical_rate, temperature, wind_speed, gust_speed,
+							  visibility, cloud_coverage, rain, global_condition, unique_key)
+		SELECT request_id, callsign, icao24, flight_date, departure_scheduled,
+			   longitude, latitude, baro_altitude, geo_altitude, on_ground,
+			   velocity, vertical_rate, temperature, wind_speed, gust_speed,
+			   visibility, cloud_coverage, rain, global_condition, unique_key
+		FROM stage_live_data
+		ORDER BY ord;
+	"""
+)
+
+def _copy_value(value) -> str:
+	"""Champ au format texte de COPY (NULL = \\N, séparateurs échappés)."""
+	if value is None:
+		return "\\N"
+	return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+class BulkLoader:
+	"""
+	Un COPY + une fusion par lot et par table. Un lot en erreur est coupé en deux jusqu'à isoler
+	les lignes fautives, qui sont seules écartées.
+	"""
+
+	def __init__(self, conn, batch_size: int = 50000):
+		self.conn = conn
+		self.batch_size = batch_size
+		self._stages = set()
+
+	def _ensure_stage(self, spec: BulkTable):
+		# Table temporaire : propre à la session, non journalisée, vidée à chaque commit
+		if spec.table in self._stages:
+			return
+		with self.conn.cursor() as cur:
+			cur.execute(f"""
+				CREATE TEMP TABLE IF NOT EXISTS {spec.stage} ON COMMIT DELETE ROWS AS
+				SELECT 0 AS ord, {", ".join(spec.columns)} FROM {spec.table} WITH NO DATA
+			""")
+		self.conn.commit()
+		self._stages.add(spec.table)
+
+	def _merge(self, spec: BulkTable, rows: List[Tuple[int, Dict]]) -> int:
+		buffer = io.StringIO()
+		for ord, row in rows:
+			buffer.write("\t".join([str(ord)] + [_copy_value(row.get(col)) for col in spec.columns]) + "\n")
+		buffer.seek(0)
+
+		with self.conn.cursor() as cur:
+			cur.copy_expert(f"COPY {spec.stage} (ord, {', '.join(spec.columns)}) FROM STDIN", buffer)
+			cur.execute(spec.merge)
+		self.conn.commit()
+		return len(rows)
+
+	def _load_batch(self, spec: BulkTable, rows: List[Tuple[int, Dict]]) -> int:
+		try:
+			return self._merge(spec, rows)
+		except psycopg2.Error as e:
+			self.conn.rollback()
+			if len(rows) == 1:
+				logging.error(f"Bulk {spec.table}: ligne {rows[0][0]} rejetée : {e}")
+				return 0
+			half = len(rows) // 2
+			return self._load_batch(spec, rows[:half]) + self._load_batch(spec, rows[half:])
+
+	def load(self, spec: BulkTable, rows: List[Dict]) -> int:
+		"""Charge les lignes dans la table, retourne le nombre de lignes fusionnées."""
+		if not rows: return 0
+		self._ensure_stage(spec)
+		numbered = list(enumerate(rows))
+		return sum(
+			self._load_batch(spec, numbered[i:i + self.batch_size])
+			for i in range(0, len(numbered), self.batch_size)
+		)
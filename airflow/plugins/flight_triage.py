@@ -0,0 +1,52 @@
+from typing import List, Dict
+
+# Triage et clôture des vols en requêtes ensemblistes (une par lot ou par run), sans dépendance Airflow.
+# Connexion psycopg2 fournie par PostgresClient.
+
+TRIAGE_SQL = """
+	SELECT
+		COALESCE(s.airline_name, '') <> '' AND COALESCE(s.origin_code, '') <> '' AND COALESCE(s.destination_code, '') <> '',
+		d.unique_key IS NULL OR d.last_update IS NULL OR d.last_update < NOW() - make_interval(mins => %s),
+		d.flight_date, d.departure_scheduled, d.status, d.last_update, d.unique_key
+	FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS f(callsign, icao24, ord)
+	LEFT JOIN flight_static s ON s.callsign = f.callsign
+	LEFT JOIN LATERAL (
+		SELECT flight_date, departure_scheduled, status, last_update, unique_key
+		FROM flight_dynamic
+		WHERE callsign = f.callsign AND icao24 = f.icao24
+		ORDER BY flight_date DESC, departure_scheduled DESC
+		LIMIT 1
+	) d ON true
+	ORDER BY f.ord;
+"""
+
+def triage_flights(conn, flights: List[Dict], threshold_minutes: int = 10) -> List[Dict]:
+	"""
+	Triage du lot en une requête : statique et dernier dynamique de chaque (callsign, icao24).
+	Retourne, dans l'ordre du lot, static_complete, needs_refresh et le dernier dynamique (ou None).
+	"""
+	if not flights: return []
+	with conn.cursor() as cur:
+		cur.execute(TRIAGE_SQL, (threshold_minutes, [f["callsign"] for f in flights], [f["icao24"] for f in flights]))
+		records = cur.fetchall()
+
+	results = []
+	for static_complete, needs_refresh, flight_date, departure_scheduled, status, last_update, unique_key in records:
+		dynamic = None
+		if unique_key is not None:
+			dynamic = {"flight_date": flight_date, "departure_scheduled": departure_scheduled, "status": status, "last_update": last_update, "unique_key": unique_key}
+		results.append({"static_complete": static_complete, "needs_refresh": needs_refresh, "dynamic": dynamic})
+	return results
+
+def close_stale_flights(conn, stale_minutes: int = 90) -> int:
+	"""
+	Vols en cours sans mise à jour depuis stale_minutes passés à 'arrived', en une requête par run.
+	Le commit revient à l'appelant.
+	"""
+	with conn.cursor() as cur:
+		cur.execute("""
+			UPDATE flight_dynamic SET status = 'arrived'
+			WHERE status IN ('en route', 'departing')
+			  AND last_update < NOW() - make_interval(mins => %s);
+		""", (stale_minutes,))
+		return cur.rowcount
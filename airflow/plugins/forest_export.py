@@ -0,0 +1,82 @@
+import os
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+# Export du pipeline (imputer + encodeur + forêt) en tableaux NumPy contigus, lus par api/services/forest.py.
+# Un fichier .npy par tableau, projetable en mémoire (mmap) en lecture seule par l'API.
+
+def _preprocessing_tables(preprocessor: ColumnTransformer) -> dict:
+	tables = {}
+	transformers = [(name, step, cols) for name, step, cols in preprocessor.transformers_ if step != "drop"]
+	if len(transformers) != 2:
+		raise ValueError("Préprocesseur non supporté : imputer numérique + encodeur ordinal attendus")
+
+	(_, imputer, numeric_cols), (_, encoder, categorical_cols) = transformers
+	if not isinstance(imputer, SimpleImputer) or not isinstance(encoder, OrdinalEncoder):
+		raise ValueError("Préprocesseur non supporté : imputer numérique + encodeur ordinal attendus")
+
+	tables["numeric_columns"] = np.array(numeric_cols, dtype=str)
+	tables["numeric_fill"] = np.asarray(imputer.statistics_, dtype=np.float64)
+	if np.isnan(tables["numeric_fill"]).any():
+		raise ValueError("Colonne numérique sans valeur d'imputation")
+	tables["categorical_columns"] = np.array(categorical_cols, dtype=str)
+	tables["unknown_value"] = np.float64(encoder.unknown_value if encoder.unknown_value is not None else np.nan)
+	for i, categories in enumerate(encoder.categories_):
+		# Valeurs manquantes (None/NaN) encodées à NaN par l'encodeur : hors table
+		categories = [c for c in categories if not (c is None or (isinstance(c, float) and np.isnan(c)))]
+		if not all(isinstance(c, str) for c in categories):
+			raise ValueError(f"Catégories non textuelles pour {categorical_cols[i]}")
+		tables[f"categories_{i}"] = np.array(categories, dtype=str)
+	return tables
+
+def _forest_tables(forest: RandomForestRegressor) -> dict:
+	"""
+	Arbres concaténés : indices de nœuds globaux, enfants entrelacés (gauche, droite).
+	Les feuilles pointent sur elles-mêmes et lisent la feature 0, sans effet.
+	"""
+	features, thresholds, children, values, roots = [], [], [], [], []
+	offset, max_depth = 0, 0
+	for estimator in forest.estimators_:
+		tree = estimator.tree_
+		n_nodes = tree.node_count
+		index = np.arange(n_nodes) + offset
+		leaf = tree.children_left < 0
+
+		features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+		thresholds.append(tree.threshold.astype(np.float64))
+		children.append(np.column_stack([
+			np.where(leaf, index, tree.children_left + offset),
+			np.where(leaf, index, tree.children_right + offset)
+		]).astype(np.int32).ravel())
+		values.append(tree.value[:, 0, 0].astype(np.float64))
+		roots.append(offset)
+		offset += n_nodes
+		max_depth = max(max_depth, tree.max_depth)
+
+	return {
+		"feature": np.concatenate(features),
+		"threshold": np.concatenate(thresholds),
+		"children": np.concatenate(children),
+		"value": np.concatenate(values),
+		"roots": np.array(roots, dtype=np.int32),
+		"max_depth": np.int32(max_depth)
+	}
+
+def export_forest(pipeline: Pipeline) -> dict:
+	"""Aplatit un Pipeline(prep=ColumnTransformer, reg=RandomForestRegressor) ajusté."""
+	preprocessor, forest = pipeline.named_steps.get("prep"), pipeline.named_steps.get("reg")
+	if not isinstance(preprocessor, ColumnTransformer) or not isinstance(forest, RandomForestRegressor):
+		raise ValueError("Pipeline non supporté : étapes prep (ColumnTransformer) et reg (RandomForestRegressor) attendues")
+	if forest.n_outputs_ != 1:
+		raise ValueError("Forêt multi-sorties non supportée")
+	return {**_preprocessing_tables(preprocessor), **_forest_tables(forest)}
+
+def save_forest(pipeline: Pipeline, directory: str) -> str:
+	os.makedirs(directory, exist_ok=True)
+	for name, array in export_forest(pipeline).items():
+		np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+	return directory
@@ -8,6 +8,7 @@ import pandas as pd
 import mlflow
 import io
 import base64
+import tempfile
 from mlflow.tracking import MlflowClient
 from airflow.models import Variable
 from airflow.exceptions import AirflowSkipException
@@ -19,6 +20,7 @@ from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OrdinalEncoder
 from sklearn.impute import SimpleImputer
 from prometheus_client import CollectorRegistry, Gauge, push_to_gateway
+from forest_export import save_forest
 
 class MLClient:
 	def __init__(self):
@@ -46,25 +48,48 @@ class MLClient:
 		except Exception as e:
 			logging.warning(f"Prometheus push failed: {e}")
 
+	def _register(self, client: MlflowClient, pipeline) -> str:
+		result = mlflow.sklearn.log_model(pipeline, "model", registered_model_name=self.model_name)
+
+		# Correction robuste de la version
+		try:
+			return result.version
+		except AttributeError:
+			latest_versions = client.get_latest_versions(self.model_name, stages=["None"])
+			return latest_versions[0].version
+
 	def optimize_memory(self, df: pd.DataFrame) -> pd.DataFrame:
 		for col in df.columns:
 			if df[col].dtype == "float64": df[col] = df[col].astype("float32")
 			if df[col].dtype == "int64": df[col] = df[col].astype("int32")
 		return df
 
+	def _fetch_live_history(self, page_size: int = 10000) -> pd.DataFrame:
+		"""Parcourt /live/history/all page par page (curseur sur indice), au format Parquet."""
+		pages, cursor = [], None
+		while True:
+			params = {"page_size": page_size, "format": "parquet"}
+			if cursor is not None:
+				params["after"] = cursor
+			res = requests.get(f"{self.api_url}/live/history/all", params=params, timeout=30)
+			res.raise_for_status()
+			pages.append(pd.read_parquet(io.BytesIO(res.content)))
+			cursor = res.headers.get("X-Next-Cursor")
+			if cursor is None:
+				return pd.concat(pages, ignore_index=True)
+
 	def data_preprocessing(self) -> str:
 		try:
-			res_live = requests.get(f"{self.api_url}/live/history/all", timeout=30)
-			res_dynamic = requests.get(f"{self.api_url}/dynamic", params={"timeline": "historical"}, timeout=30)
-			
-			data_live = res_live.json().get("data", [])
-			data_dynamic = res_dynamic.json().get("data", [])
+			data_live = self._fetch_live_history()
+			res_dynamic = requests.get(f"{self.api_url}/dynamic", params={"timeline": "historical", "format": "parquet"}, timeout=30)
+			res_dynamic.raise_for_status()
+			data_dynamic = pd.read_parquet(io.BytesIO(res_dynamic.content))
 
-			if not data_live or not data_dynamic:
+			if data_live.empty or data_dynamic.empty:
 				raise AirflowSkipException("Donnees insuffisantes.")
 
-			df_features = pd.DataFrame(data_live).merge(
-				pd.DataFrame(data_dynamic)[["unique_key", "departure_difference", "arrival_difference"]], 
+			df_features = data_live.merge(
+				data_dynamic[["unique_key", "departure_difference", "arrival_difference"]], 
 				on="unique_key", how="left"
 			).dropna(subset=["departure_difference", "arrival_difference"])
 
@@ -104,6 +129,13 @@ class MLClient:
 			])
 			pipeline.fit(X_train, y_train)
 
+			# Export NumPy de la forêt, chargé par l'API à la place du modèle pyfunc
+			try:
+				with tempfile.TemporaryDirectory() as export_dir:
+					mlflow.log_artifacts(save_forest(pipeline, export_dir), artifact_path="forest")
+			except ValueError as e:
+				logging.warning(f"Export NumPy impossible : {e}")
+
 			# Evaluation
 			y_pred = pipeline.predict(X_test)
 			metrics = {
@@ -182,21 +214,14 @@ class MLClient:
 			
 			if promoted:
 				logging.info("Promotion validée !")
-				result = mlflow.sklearn.log_model(pipeline, "model", registered_model_name=self.model_name)
-				
-				# Correction robuste de la version
-				try:
-					new_version = result.version
-				except AttributeError:
-					latest_versions = client.get_latest_versions(self.model_name, stages=["None"])
-					new_version = latest_versions[0].version
-
-				client.set_registered_model_alias(self.model_name, "production", new_version)
+				client.set_registered_model_alias(self.model_name, "production", self._register(client, pipeline))
 				
 				self.metric_r2_score.labels(status='production').set(metrics["R2_Score"])
 				self.metric_mae.labels(status='production').set(metrics["MAE"])
 			else:
 				logging.info("Promotion refusée !")
+				# Enregistré sous l'alias challenger : scoré en fantôme par l'API (SHADOW_CHALLENGER)
+				client.set_registered_model_alias(self.model_name, "challenger", self._register(client, pipeline))
 			
 			self._push_metrics()
 			return {**metrics, "promoted": promoted}
\ No newline at end of file
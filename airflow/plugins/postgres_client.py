@@ -1,9 +1,12 @@
 import logging
-from datetime import datetime, timedelta, timezone
+from contextlib import closing
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 
 from airflow.models import Variable
 from airflow.providers.postgres.hooks.postgres import PostgresHook
+from bulk_loader import BulkLoader, FLIGHT_STATIC, FLIGHT_DYNAMIC, LIVE_DATA
+import flight_triage
 
 class PostgresClient:
 	def __init__(self):
@@ -11,6 +14,12 @@ class PostgresClient:
 		self.hook = PostgresHook(postgres_conn_id = conn_id)
 		self.conn = self.hook.get_conn()
 		self.cur = self.conn.cursor()
+		# Insertions en masse (COPY + fusion), un appel par table et par run
+		self.loader = BulkLoader(self.conn)
+
+	def new_connection(self):
+		"""Connexion supplémentaire sur la même base (cache météo), fermée par l'appelant."""
+		return self.hook.get_conn()
 
 	def get_static_flight(self, callsign: str) -> Optional[Dict]:
 		"""Récupère les infos statiques pour le triage."""
@@ -61,83 +70,43 @@ class PostgresClient:
 			"icao24", "callsign", "flight_date", "departure_scheduled", "departure_actual",
 			"arrival_scheduled", "arrival_actual", "status", "last_update", "unique_key"
 		]
-		dynamic = dict(zip(columns, result))
-
-		last_update = dynamic["last_update"]
-		if last_update.tzinfo is None:
-			last_update = last_update.replace(tzinfo=timezone.utc)
-
-		if dynamic["status"] in ("en route", "departing"):
-			now = datetime.now(timezone.utc)
-			if (now - last_update) > timedelta(minutes=90):
-				update_sql = "UPDATE flight_dynamic SET status = 'arrived' WHERE unique_key = %s"
-				self.hook.run(update_sql, parameters=(dynamic["unique_key"],))
-				dynamic["status"] = "arrived"
-				
-		return dynamic
-
-	def insert_flight_static(self, rows: List[Dict]):
-		if not rows: return
-		query = """
-			INSERT INTO flight_static (callsign, airline_name, origin_code, destination_code, commercial_flight)
-			VALUES (%(callsign)s, %(airline_name)s, %(origin_code)s, %(destination_code)s, %(commercial_flight)s)
-			ON CONFLICT (callsign) DO UPDATE SET
-				airline_name = CASE WHEN EXCLUDED.airline_name != 'Unknown Airline' THEN EXCLUDED.airline_name ELSE flight_static.airline_name END,
-				origin_code = COALESCE(EXCLUDED.origin_code, flight_static.origin_code),
-				destination_code = COALESCE(EXCLUDED.destination_code, flight_static.destination_code);
-		"""
-		for row in rows:
-			try:
-				self.cur.execute(query, row)
-				self.conn.commit()
-			except Exception as e:
-				self.conn.rollback()
-				logging.error(f"Static insert failed for {row.get('callsign')}: {e}")
-
-	def insert_flight_dynamic(self, rows: List[Dict]):
-		if not rows: return
-		query = """
-			INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, departure_actual,
-									   arrival_scheduled, arrival_actual, status, unique_key)
-			VALUES (%(callsign)s, %(icao24)s, %(flight_date)s, %(departure_scheduled)s,
-					%(departure_actual)s, %(arrival_scheduled)s, %(arrival_actual)s, %(status)s, %(unique_key)s)
-			ON CONFLICT (unique_key) DO UPDATE SET
-				status = EXCLUDED.status,
-				departure_actual = COALESCE(EXCLUDED.departure_actual, flight_dynamic.departure_actual),
-				arrival_actual = COALESCE(EXCLUDED.arrival_actual, flight_dynamic.arrival_actual),
-				last_update = NOW();
-		"""
-		for row in rows:
-			if not all([row.get("flight_date"), row.get("departure_scheduled"), row.get("unique_key")]): 
-				continue
-			try:
-				self.cur.execute(query, row)
-				self.conn.commit()
-			except Exception as e:
-				self.conn.rollback()
-				logging.error(f"Dynamic upsert failed for {row.get('unique_key')}: {e}")
-
-	def insert_live_data(self, rows: List[Dict]):
-		if not rows: return
-		query = """
-			INSERT INTO live_data (request_id, callsign, icao24, flight_date, departure_scheduled,
-								  longitude, latitude, baro_altitude, geo_altitude, on_ground,
-								  velocity, vertical_rate, temperature, wind_speed, gust_speed,
-								  visibility, cloud_coverage, rain, global_condition, unique_key)
-			VALUES (%(request_id)s, %(callsign)s, %(icao24)s, %(flight_date)s, %(departure_scheduled)s,
-					%(longitude)s, %(latitude)s, %(baro_altitude)s, %(geo_altitude)s, %(on_ground)s,
-					%(velocity)s, %(vertical_rate)s, %(temperature)s, %(wind_speed)s, %(gust_speed)s,
-					%(visibility)s, %(cloud_coverage)s, %(rain)s, %(global_condition)s, %(unique_key)s)
-		"""
-		for row in rows:
-			if not all([row.get("flight_date"), row.get("departure_scheduled"), row.get("unique_key")]):
-				continue
-			try:
-				self.cur.execute(query, row)
-				self.conn.commit()
-			except Exception as e:
-				self.conn.rollback()
-				logging.error(f"Live insert failed for {row.get('callsign')}: {e}")
+		return dict(zip(columns, result))
+
+	def close_stale_flights(self, stale_minutes: int = 90) -> int:
+		try:
+			closed = flight_triage.close_stale_flights(self.conn, stale_minutes)
+			self.conn.commit()
+			return closed
+		except Exception as e:
+			self.conn.rollback()
+			logging.error(f"Stale sweep failed: {e}")
+			return 0
+
+	def triage_flights(self, flights: List[Dict], threshold_minutes: int = 10) -> List[Dict]:
+		"""Triage du lot en une requête (voir flight_triage), sur une connexion dédiée comme hook.get_records."""
+		with closing(self.new_connection()) as conn:
+			return flight_triage.triage_flights(conn, flights, threshold_minutes)
+
+	def _required_keys(self, rows: List[Dict]) -> List[Dict]:
+		return [row for row in rows if all([row.get("flight_date"), row.get("departure_scheduled"), row.get("unique_key")])]
+
+	def insert_flight_static(self, rows: List[Dict]) -> int:
+		return self.loader.load(FLIGHT_STATIC, rows)
+
+	def insert_flight_dynamic(self, rows: List[Dict]) -> int:
+		return self.loader.load(FLIGHT_DYNAMIC, self._required_keys(rows))
+
+	def insert_live_data(self, rows: List[Dict]) -> int:
+		return self.loader.load(LIVE_DATA, self._required_keys(rows))
+
+	def notify_live_data(self, request_id: str):
+		"""Signale la fin d'un run à l'API (LISTEN live_data) : un seul NOTIFY par run."""
+		try:
+			self.cur.execute("SELECT pg_notify('live_data', %s)", (str(request_id),))
+			self.conn.commit()
+		except Exception as e:
+			self.conn.rollback()
+			logging.error(f"Live notify failed for {request_id}: {e}")
 
 	def close(self):
 		try:
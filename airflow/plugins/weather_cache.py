@@ -0,0 +1,88 @@
+import json
+import logging
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+import psycopg2
+
+# Cache météo partagé entre tâches et runs (table weather_cache), sans dépendance Airflow.
+# Clé : cellule de grille lat/lon (resolution degrés) + tranche de temps (ttl) ; les avions d'une même
+# zone sur la même tranche partagent un seul appel à l'API météo.
+
+class WeatherCache:
+	def __init__(self, conn, resolution: float = 0.25, ttl_minutes: int = 30, max_entries: int = 10000):
+		# Connexion dédiée en autocommit : lectures et écritures du cache ne valident ni n'annulent
+		# le travail en cours de la tâche sur sa propre connexion
+		self.conn = conn
+		self.conn.autocommit = True
+		self.resolution = resolution
+		self.ttl = ttl_minutes * 60
+		self.max_entries = max_entries
+		# Copie locale au processus : une seule lecture DB par cellule et par tâche
+		self._local = {}
+		self.hits, self.misses = 0, 0
+
+	def key(self, lat: float, lon: float, now: Optional[float] = None) -> Tuple[str, int]:
+		cell = f"{math.floor(lat / self.resolution)}:{math.floor(lon / self.resolution)}"
+		bucket = int((time.time() if now is None else now) // self.ttl)
+		return cell, bucket
+
+	def get(self, lat: float, lon: float) -> Optional[Dict]:
+		key = self.key(lat, lon)
+		weather = self._local.get(key)
+		if weather is None:
+			weather = self._read(key)
+			if weather is not None:
+				self._local[key] = weather
+
+		if weather is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return weather
+
+	def _read(self, key: Tuple[str, int]) -> Optional[Dict]:
+		try:
+			with self.conn.cursor() as cur:
+				cur.execute("SELECT weather FROM weather_cache WHERE cell = %s AND bucket = %s", key)
+				row = cur.fetchone()
+			return row[0] if row else None
+		except psycopg2.Error as e:
+			logging.warning(f"Weather cache read failed: {e}")
+			return None
+
+	def set(self, lat: float, lon: float, weather: Dict):
+		key = self.key(lat, lon)
+		self._local[key] = weather
+		try:
+			with self.conn.cursor() as cur:
+				cur.execute("""
+					INSERT INTO weather_cache (cell, bucket, weather) VALUES (%s, %s, %s)
+					ON CONFLICT (cell, bucket) DO UPDATE SET weather = EXCLUDED.weather, fetched_at = NOW();
+				""", (*key, json.dumps(weather)))
+		except psycopg2.Error as e:
+			logging.warning(f"Weather cache write failed: {e}")
+
+	def prune(self) -> int:
+		"""Supprime les tranches expirées puis les entrées les plus anciennes au-delà de max_entries."""
+		current = int(time.time() // self.ttl)
+		try:
+			with self.conn.cursor() as cur:
+				cur.execute("DELETE FROM weather_cache WHERE bucket < %s", (current,))
+				deleted = cur.rowcount
+				cur.execute("""
+					DELETE FROM weather_cache WHERE (cell, bucket) IN (
+						SELECT cell, bucket FROM weather_cache ORDER BY fetched_at DESC OFFSET %s
+					)
+				""", (self.max_entries,))
+				deleted += cur.rowcount
+			return deleted
+		except psycopg2.Error as e:
+			logging.warning(f"Weather cache prune failed: {e}")
+			return 0
+
+	@property
+	def hit_ratio(self) -> float:
+		total = self.hits + self.misses
+		return self.hits / total if total else 0.0
@@ -1,37 +1,85 @@
 import logging
-import requests
+from typing import Dict, List
 
 from airflow.models import Variable
+from prometheus_client import CollectorRegistry, Gauge, push_to_gateway
+from weather_cache import WeatherCache
+from weather_fetcher import WeatherFetcher, Point, get_weather_many
 
 class WeatherClient:
-	def __init__(self):
+	def __init__(self, conn = None):
 		self.api_url = Variable.get("WEATHER_API_URL")
 		self.api_key = Variable.get("WEATHER_API_KEY")
 		self.fields = Variable.get("WEATHER_FIELDS", deserialize_json = True)
 		self.timeout = int(Variable.get("WEATHER_TIMEOUT"))
 
+		# Session keep-alive ; lots concurrents bornés en débit (req/s) et en durée totale (s)
+		self.fetcher = WeatherFetcher(
+			self.api_url, self.api_key, self.timeout,
+			max_workers = int(Variable.get("WEATHER_MAX_WORKERS", default_var = 8)),
+			rate_limit = float(Variable.get("WEATHER_RATE_LIMIT", default_var = 10)),
+			deadline = float(Variable.get("WEATHER_DEADLINE", default_var = 30))
+		)
+
+		# Lectures demandées, à comparer aux points transmis à l'API (cache + déduplication)
+		self.lookups = 0
+
+		# Cache par cellule de grille et tranche de temps, persistant en base (connexion dédiée, fermée par close())
+		self.cache = None
+		if conn is not None:
+			self.cache = WeatherCache(
+				conn,
+				resolution = float(Variable.get("WEATHER_CACHE_RESOLUTION", default_var = 0.25)),
+				ttl_minutes = int(Variable.get("WEATHER_CACHE_TTL_MINUTES", default_var = 30)),
+				max_entries = int(Variable.get("WEATHER_CACHE_MAX_ENTRIES", default_var = 10000))
+			)
+
 	def get_weather(self, lat, lon):
-		try:
-			params = {"q": f"{lat},{lon}", "key": self.api_key}
-			r = requests.get(self.api_url, params=params, timeout=self.timeout)
-			
-			if r.status_code != 200:
-				return {k: None for k in self.fields}
-			
-			data = r.json().get("current", {})
-
-			result = {
-				"temperature": data.get("temp_c"),
-				"wind_speed": data.get("wind_kph"),
-				"gust_speed": data.get("gust_kph"),
-				"visibility": data.get("vis_km"),
-				"cloud_coverage": data.get("cloud"),
-				"rain": data.get("precip_mm"),
-				"global_condition": data.get("condition", {}).get("text"),
-			}
-
-			return result
-
-		except Exception as e:
-			logging.warning(f"Weather API error: {e}")
-			return {k: None for k in self.fields}
\ No newline at end of file
+		self.lookups += 1
+		if self.cache is not None:
+			cached = self.cache.get(lat, lon)
+			if cached is not None:
+				return cached
+
+		result = self.fetcher.fetch(lat, lon)
+		if result is None:
+			return {k: None for k in self.fields}
+		if self.cache is not None:
+			self.cache.set(lat, lon, result)
+		return result
+
+	def get_weather_many(self, points: List[Point]) -> List[Dict]:
+		"""Météo d'un lot de points (lat, lon), dans l'ordre : dédupliqué, cache puis appels concurrents."""
+		self.lookups += len(points)
+		return get_weather_many(self.fetcher, points, self.fields, self.cache)
+
+	def stats(self) -> Dict[str, int]:
+		"""Compteurs de la tâche, agrégeables entre instances (tâches mappées)."""
+		return {
+			"lookups": self.lookups,
+			"requested": self.fetcher.requested,
+			"hits": self.cache.hits if self.cache is not None else 0,
+			"misses": self.cache.misses if self.cache is not None else 0
+		}
+
+	def push_metrics(self, task: str):
+		push_weather_metrics(task, [self.stats()])
+
+	def close(self):
+		if self.cache is not None:
+			self.cache.conn.close()
+
+def push_weather_metrics(task: str, stats: List[Dict[str, int]]):
+	"""Efficacité du cache sur la tâche, toutes instances confondues (Pushgateway, un seul push par tâche et par run)."""
+	total = {key: sum(entry.get(key, 0) for entry in stats) for key in ("lookups", "requested", "hits", "misses")}
+	reads = total["hits"] + total["misses"]
+
+	registry = CollectorRegistry()
+	Gauge('weather_cache_hits_run', 'Lectures météo servies par le cache (run)', registry=registry).set(total["hits"])
+	Gauge('weather_cache_misses_run', 'Lectures météo absentes du cache (run)', registry=registry).set(total["misses"])
+	Gauge('weather_cache_hit_ratio_run', 'Taux de succès du cache météo (run)', registry=registry).set(total["hits"] / reads if reads else 0.0)
+	Gauge('weather_api_calls_saved_run', 'Appels API météo évités (run)', registry=registry).set(max(total["lookups"] - total["requested"], 0))
+	try:
+		push_to_gateway(Variable.get("PUSHGATEWAY_URL"), job="airflow_weather", grouping_key={"task": task}, registry=registry)
+	except Exception as e:
+		logging.warning(f"Prometheus push failed for weather cache: {e}")
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Appels à l'API météo : session HTTP keep-alive partagée, lots concurrents avec limite de débit
+# et échéance globale. Module sans dépendance Airflow (paramètres fournis par WeatherClient).
+
+Point = Tuple[float, float]
+
+def parse_current(payload: Dict) -> Dict:
+	data = payload.get("current", {})
+	return {
+		"temperature": data.get("temp_c"),
+		"wind_speed": data.get("wind_kph"),
+		"gust_speed": data.get("gust_kph"),
+		"visibility": data.get("vis_km"),
+		"cloud_coverage": data.get("cloud"),
+		"rain": data.get("precip_mm"),
+		"global_condition": data.get("condition", {}).get("text"),
+	}
+
+class RateLimiter:
+	"""Départs de requêtes espacés d'au moins 1/rate secondes, tous threads confondus (rate=0 : illimité)."""
+
+	def __init__(self, rate: float):
+		self.interval = 1.0 / rate if rate > 0 else 0.0
+		self._lock = threading.Lock()
+		self._next = 0.0
+
+	def acquire(self, deadline: float) -> bool:
+		with self._lock:
+			now = time.monotonic()
+			slot = max(now, self._next)
+			if slot >= deadline:
+				return False
+			self._next = slot + self.interval
+		time.sleep(slot - now)
+		return True
+
+class WeatherFetcher:
+	def __init__(self, api_url: str, api_key: str, timeout: float, max_workers: int = 8, rate_limit: float = 10.0, deadline: float = 30.0):
+		self.api_url = api_url
+		self.api_key = api_key
+		self.timeout = timeout
+		self.max_workers = max_workers
+		self.deadline = deadline
+		self.limiter = RateLimiter(rate_limit)
+		# Points transmis à l'API (après cache et déduplication)
+		self.requested = 0
+
+		# Connexions réutilisées entre appels et entre threads
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+
+	def fetch(self, lat: float, lon: float) -> Optional[Dict]:
+		"""Météo courante au point, None en cas d'échec, de refus HTTP ou d'échéance dépassée."""
+		self.requested += 1
+		return self._fetch(lat, lon, time.monotonic() + self.deadline)
+
+	def _fetch(self, lat: float, lon: float, deadline: float) -> Optional[Dict]:
+		if not self.limiter.acquire(deadline):
+			return None
+		try:
+			timeout = min(self.timeout, max(deadline - time.monotonic(), 0.001))
+			r = self.session.get(self.api_url, params={"q": f"{lat},{lon}", "key": self.api_key}, timeout=timeout)
+			if r.status_code != 200:
+				return None
+			return parse_current(r.json())
+		except Exception as e:
+			logging.warning(f"Weather API error: {e}")
+			return None
+
+	def fetch_many(self, points: List[Point]) -> Dict[Point, Optional[Dict]]:
+		"""Un appel par coordonnée distincte, en parallèle ; les points non servis avant l'échéance valent None."""
+		unique = list(dict.fromkeys(points))
+		if not unique:
+			return {}
+		self.requested += len(unique)
+		deadline = time.monotonic() + self.deadline
+		executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique)), thread_name_prefix="weather")
+		try:
+			futures = {point: executor.submit(self._fetch, *point, deadline) for point in unique}
+			wait(futures.values(), timeout=max(deadline - time.monotonic(), 0))
+		finally:
+			# Les requêtes en vol se terminent d'elles-mêmes (timeout borné par l'échéance)
+			executor.shutdown(wait=False, cancel_futures=True)
+
+		late = sum(1 for future in futures.values() if not future.done())
+		if late:
+			logging.warning(f"Weather batch: {late}/{len(unique)} points non servis avant l'échéance")
+		return {point: future.result() if future.done() and not future.cancelled() else None for point, future in futures.items()}
+
+def get_weather_many(fetcher: WeatherFetcher, points: List[Point], fields: List[str], cache = None) -> List[Dict]:
+	"""
+	Météo de chaque point, dans l'ordre : points regroupés par clé de cache (cellule et tranche) ou par coordonnée,
+	lecture du cache, puis un seul lot concurrent pour les clés manquantes.
+	"""
+	keys = [cache.key(*point) if cache is not None else point for point in points]
+	results, misses = {}, {}
+	for key, point in zip(keys, points):
+		if key in results or key in misses:
+			continue
+		cached = cache.get(*point) if cache is not None else None
+		if cached is not None:
+			results[key] = cached
+		else:
+			misses[key] = point
+
+	fetched = fetcher.fetch_many(list(misses.values()))
+	for key, point in misses.items():
+		weather = fetched.get(point)
+		if weather is not None and cache is not None:
+			cache.set(*point, weather)
+		results[key] = weather if weather is not None else {k: None for k in fields}
+	return [results[key] for key in keys]
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+
+class LRUCache:
+	"""Cache borné en nombre d'entrées, éviction de la moins récemment utilisée."""
+
+	def __init__(self, maxsize: int, on_evict = None):
+		self.maxsize = maxsize
+		# on_evict(raison) : appelé à chaque entrée retirée ("size", "ttl", "generation")
+		self.on_evict = on_evict
+		self._data = OrderedDict()
+
+	def get(self, key, default = None):
+		if key not in self._data:
+			return default
+		self._data.move_to_end(key)
+		return self._data[key]
+
+	def set(self, key, value):
+		self._data[key] = value
+		self._data.move_to_end(key)
+		while len(self._data) > self.maxsize:
+			self._data.popitem(last = False)
+			self._evicted("size")
+
+	def pop(self, key, reason = None):
+		value = self._data.pop(key, None)
+		if reason is not None and value is not None:
+			self._evicted(reason)
+		return value
+
+	def clear(self, reason = None):
+		count = len(self._data)
+		self._data.clear()
+		if reason is not None:
+			self._evicted(reason, count)
+
+	def _evicted(self, reason, count = 1):
+		if self.on_evict is not None and count:
+			self.on_evict(reason, count)
+
+	def __contains__(self, key):
+		return key in self._data
+
+	def __len__(self):
+		return len(self._data)
+
+class QueryCache(LRUCache):
+	"""
+	Résultats de requêtes : LRU + TTL, vidé quand la génération change
+	(nouveau request_id dans live_data, c'est-à-dire nouveau run ETL).
+	"""
+
+	def __init__(self, maxsize: int, ttl: float, on_evict = None):
+		super().__init__(maxsize, on_evict)
+		self.ttl = ttl
+		self.generation = None
+
+	def get(self, key, default = None):
+		entry = super().get(key)
+		if entry is None:
+			return default
+		expires_at, value = entry
+		if time.monotonic() >= expires_at:
+			self.pop(key, "ttl")
+			return default
+		return value
+
+	def set(self, key, value):
+		super().set(key, (time.monotonic() + self.ttl, value))
+
+	def set_generation(self, generation):
+		if generation != self.generation:
+			self.clear("generation")
+			self.generation = generation
+
+def freeze(value):
+	"""Rend les paramètres SQL hashables (listes, dicts) pour servir de clé."""
+	if isinstance(value, dict):
+		return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+	if isinstance(value, (list, tuple)):
+		return tuple(freeze(v) for v in value)
+	return value
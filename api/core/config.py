@@ -7,6 +7,50 @@ POSTGRES_PORT = int(os.getenv("POSTGRES_PORT"))
 AIRLINES_POSTGRES_DB = os.getenv("AIRLINES_POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", 1))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10))
 
 # Autres constantes
-STALE_THRESHOLD = timedelta(hours = 2)
\ No newline at end of file
+STALE_THRESHOLD = timedelta(hours = 2)
+
+# Snapshot des vols (flight_dynamic)
+SNAPSHOT_WATERMARK_OVERLAP = timedelta(minutes = 5)
+SNAPSHOT_RESYNC_INTERVAL = timedelta(hours = 1)
+
+# Pagination
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 50000
+
+# Cache de l'historique des vols terminés (/merged)
+MERGED_HISTORY_CACHE_SIZE = int(os.getenv("MERGED_HISTORY_CACHE_SIZE", 5000))
+
+# Delta live (/live/changes) : jeux courants mémorisés par curseur remis aux clients
+LIVE_CHANGES_CURSOR_HISTORY = int(os.getenv("LIVE_CHANGES_CURSOR_HISTORY", 256))
+
+# Flux live (SSE)
+LIVE_FEED_CHANNEL = "live_data"
+LIVE_FEED_POLL_INTERVAL = timedelta(seconds = int(os.getenv("LIVE_FEED_POLL_INTERVAL", 60)))
+LIVE_FEED_KEEPALIVE = timedelta(seconds = 15)
+LIVE_FEED_QUEUE_SIZE = 16
+
+# Cache des résultats de requêtes (opt-in, invalidé par run ETL)
+QUERY_CACHE_TTL = timedelta(seconds = int(os.getenv("QUERY_CACHE_TTL", 120)))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 1000))
+QUERY_CACHE_GENERATION_PROBE = timedelta(seconds = 5)
+
+# Prédictions pré-calculées (live_predictions)
+PREDICTION_WORKER_INTERVAL = timedelta(seconds = int(os.getenv("PREDICTION_WORKER_INTERVAL", 300)))
+# Verrou consultatif PostgreSQL : un seul worker de l'API pré-calcule à la fois
+PREDICTION_WORKER_LOCK = 0x64737461
+# Taille maximale d'un lot POST /prediction/batch
+PREDICTION_BATCH_MAX_ROWS = int(os.getenv("PREDICTION_BATCH_MAX_ROWS", 200_000))
+# Taille maximale du corps (octets), refusée avant lecture et décodage
+PREDICTION_BATCH_MAX_BYTES = int(os.getenv("PREDICTION_BATCH_MAX_BYTES", PREDICTION_BATCH_MAX_ROWS * 256))
+
+# Modèle MLflow : scrutation de l'alias production
+MODEL_POLL_INTERVAL = timedelta(seconds = int(os.getenv("MODEL_POLL_INTERVAL", 300)))
+# Challenger scoré en fantôme (même lot que la production, thread dédié)
+SHADOW_CHALLENGER = os.getenv("SHADOW_CHALLENGER", "false").lower() in ("1", "true", "yes")
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", 2))
+# Artefacts projetés en mémoire (partagés par les workers d'un même hôte)
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "/tmp/dst_airlines/models")
\ No newline at end of file
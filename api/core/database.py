@@ -1,11 +1,23 @@
+import asyncio
 import logging
+import time
+from uuid import uuid4
+import psycopg
 from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
-from api.core.config import POSTGRES_HOST, POSTGRES_PORT, AIRLINES_POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+from psycopg.rows import dict_row
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool
+from contextlib import contextmanager, asynccontextmanager
+from api.core.cache import QueryCache, freeze
+from api.core.singleflight import SingleFlight
+from api.core.config import POSTGRES_HOST, POSTGRES_PORT, AIRLINES_POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_POOL_MIN_SIZE, POSTGRES_POOL_MAX_SIZE
+from api.core.config import QUERY_CACHE_TTL, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_GENERATION_PROBE
+from api.metrics import QUERY_CACHE_HITS, QUERY_CACHE_MISSES, QUERY_CACHE_EVICTIONS, COALESCED_CALLS
 
 logging.basicConfig(level = logging.INFO)
 
+# Client synchrone (psycopg2) : conservé pour les tests et les scripts hors event loop
 class PostgresClient:
 	_pool = None
 
@@ -39,4 +51,171 @@ class PostgresClient:
 				cur.execute(sql, params or ())
 				return cur.fetchall()
 
-db = PostgresClient()
\ No newline at end of file
+	def query_columns(self, sql, params=None):
+		# Sans RealDictCursor : noms de colonnes + tuples (pas de dict par ligne)
+		with self.get_connection() as conn:
+			with conn.cursor() as cur:
+				cur.execute(sql, params or ())
+				return [col.name for col in cur.description], cur.fetchall()
+
+	def stream(self, sql, params=None, itersize=1000):
+		# Curseur nommé côté serveur : les lignes arrivent par paquets de itersize
+		with self.get_connection() as conn:
+			try:
+				with conn.cursor(name=f"stream_{uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+					cur.itersize = itersize
+					cur.execute(sql, params or ())
+					for row in cur:
+						yield row
+			finally:
+				conn.rollback()
+
+	def execute(self, sql, params=None):
+		with self.get_connection() as conn:
+			with conn.cursor() as cur:
+				cur.execute(sql, params or ())
+			conn.commit()
+
+db = PostgresClient()
+
+ASYNC_CONNECTION_KWARGS = {
+	"host": POSTGRES_HOST,
+	"port": POSTGRES_PORT,
+	"dbname": AIRLINES_POSTGRES_DB,
+	"user": POSTGRES_USER,
+	"password": POSTGRES_PASSWORD
+}
+
+# Client asynchrone (psycopg 3) utilisé par les routers
+class AsyncPostgresClient:
+	def __init__(self):
+		self._pool = None
+		self._pool_loop = None
+		self.query_cache = QueryCache(
+			QUERY_CACHE_MAX_ENTRIES,
+			QUERY_CACHE_TTL.total_seconds(),
+			on_evict=lambda reason, count: QUERY_CACHE_EVICTIONS.labels(reason=reason).inc(count)
+		)
+		self._generation_checked = 0.0
+		self._inflight = SingleFlight(on_coalesce=COALESCED_CALLS.labels(operation="query").inc)
+
+	@staticmethod
+	async def _configure(conn):
+		# UUID renvoyés en texte, comme avec psycopg2
+		conn.adapters.register_loader("uuid", TextLoader)
+
+	async def open(self):
+		loop = asyncio.get_running_loop()
+		# Un pool est lié à son event loop (TestClient sans contexte : une boucle par requête)
+		if self._pool is None or self._pool_loop is not loop:
+			await self.close()
+			self._pool = AsyncConnectionPool(
+				conninfo="",
+				kwargs=ASYNC_CONNECTION_KWARGS,
+				min_size=POSTGRES_POOL_MIN_SIZE,
+				max_size=POSTGRES_POOL_MAX_SIZE,
+				configure=self._configure,
+				open=False
+			)
+			self._pool_loop = loop
+			await self._pool.open()
+			logging.info("PostgreSQL async connection pool created")
+		return self._pool
+
+	async def close(self):
+		if self._pool is not None:
+			pool, pool_loop = self._pool, self._pool_loop
+			self._pool = None
+			self._pool_loop = None
+			try:
+				await pool.close()
+			except (RuntimeError, ValueError):
+				# Pool d'une boucle terminée : connexions inactives fermées, seules ses tâches internes ne peuvent être attendues
+				if pool_loop is asyncio.get_running_loop():
+					raise
+
+	@asynccontextmanager
+	async def get_connection(self):
+		pool = await self.open()
+		async with pool.connection() as conn:
+			yield conn
+
+	async def query(self, sql, params=None, cache=False):
+		"""cache=True : résultat partagé entre requêtes jusqu'au prochain run ETL (ne pas le modifier)."""
+		if cache:
+			return await self._cached(("query", sql, freeze(params)), self.query, sql, params)
+		async with self.get_connection() as conn:
+			async with conn.cursor(row_factory=dict_row) as cur:
+				await cur.execute(sql, params)
+				return await cur.fetchall()
+
+	async def query_columns(self, sql, params=None, cache=False):
+		if cache:
+			return await self._cached(("columns", sql, freeze(params)), self.query_columns, sql, params)
+		async with self.get_connection() as conn:
+			async with conn.cursor() as cur:
+				await cur.execute(sql, params)
+				return [col.name for col in cur.description], await cur.fetchall()
+
+	async def _cached(self, key, fetch, sql, params):
+		await self.refresh_generation()
+		result = self.query_cache.get(key)
+		if result is not None:
+			QUERY_CACHE_HITS.inc()
+			return result
+
+		QUERY_CACHE_MISSES.inc()
+		# Requête identique déjà en cours : même résultat, une seule exécution
+		async def run():
+			result = await fetch(sql, params)
+			self.query_cache.set(key, result)
+			return result
+		return await self._inflight.do(key, run)
+
+	def expire_generation(self):
+		"""Force la relecture de la génération à la prochaine requête (NOTIFY d'un run ETL)."""
+		self._generation_checked = 0.0
+
+	async def refresh_generation(self, force=False):
+		"""Génération = dernier request_id de live_data, sondé au plus toutes les QUERY_CACHE_GENERATION_PROBE."""
+		now = time.monotonic()
+		if not force and now - self._generation_checked < QUERY_CACHE_GENERATION_PROBE.total_seconds():
+			return
+		self._generation_checked = now
+		rows = await self.query("SELECT request_id FROM live_data ORDER BY indice DESC LIMIT 1")
+		self.query_cache.set_generation(rows[0]["request_id"] if rows else None)
+
+	async def stream(self, sql, params=None, itersize=1000):
+		async with self.get_connection() as conn:
+			async with conn.cursor(name=f"stream_{uuid4().hex}", row_factory=dict_row) as cur:
+				cur.itersize = itersize
+				await cur.execute(sql, params)
+				async for row in cur:
+					yield row
+
+	async def execute(self, sql, params=None):
+		async with self.get_connection() as conn:
+			await conn.execute(sql, params)
+
+	@asynccontextmanager
+	async def advisory_lock(self, key):
+		"""Verrou consultatif de session sur une connexion dédiée en autocommit (hors pool) : True si obtenu."""
+		conn = await psycopg.AsyncConnection.connect(autocommit=True, **ASYNC_CONNECTION_KWARGS)
+		async with conn:
+			cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+			acquired = (await cur.fetchone())[0]
+			try:
+				yield acquired
+			finally:
+				if acquired:
+					await conn.execute("SELECT pg_advisory_unlock(%s)", (key,))
+
+	async def listen(self, channel):
+		"""Connexion dédiée hors pool : itère sur les NOTIFY du canal."""
+		conn = await psycopg.AsyncConnection.connect(autocommit=True, **ASYNC_CONNECTION_KWARGS)
+		async with conn:
+			await conn.execute(f"LISTEN {channel}")
+			async for notify in conn.notifies():
+				yield notify
+
+adb = AsyncPostgresClient()
\ No newline at end of file
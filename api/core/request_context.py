@@ -0,0 +1,29 @@
+import asyncio
+from contextvars import ContextVar
+
+# Mémo propre à une requête HTTP : partagé par les helpers des routers qui s'appellent entre eux
+_request_memo = ContextVar("request_memo", default = None)
+
+class RequestContextMiddleware:
+	"""Middleware ASGI : ouvre un mémo vide pour chaque requête HTTP."""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			return await self.app(scope, receive, send)
+		token = _request_memo.set({})
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			_request_memo.reset(token)
+
+async def memoize(key, fn):
+	"""Calcule fn() une seule fois par requête ; appel direct hors requête (tâches de fond, tests)."""
+	memo = _request_memo.get()
+	if memo is None:
+		return await fn()
+	if key not in memo:
+		memo[key] = asyncio.ensure_future(fn())
+	return await memo[key]
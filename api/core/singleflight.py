@@ -0,0 +1,32 @@
+import asyncio
+
+class SingleFlight:
+	"""
+	Regroupement des appels identiques concurrents : le premier lance le calcul,
+	les suivants attendent le même résultat au lieu de relancer la requête.
+	"""
+
+	def __init__(self, on_coalesce = None):
+		self.on_coalesce = on_coalesce
+		self._inflight = {}
+
+	async def do(self, key, fn):
+		task = self._inflight.get(key)
+		if task is None:
+			# Tâche indépendante : l'annulation d'un appelant n'interrompt pas les autres
+			task = asyncio.ensure_future(fn())
+			self._inflight[key] = task
+			task.add_done_callback(lambda done: self._done(key, done))
+		elif self.on_coalesce is not None:
+			self.on_coalesce()
+		return await asyncio.shield(task)
+
+	def _done(self, key, task):
+		if self._inflight.get(key) is task:
+			del self._inflight[key]
+		# Exception consommée même si tous les appelants ont été annulés
+		if not task.cancelled():
+			task.exception()
+
+	def __len__(self):
+		return len(self._inflight)
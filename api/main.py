@@ -1,13 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from api.core.database import adb
+from api.core.request_context import RequestContextMiddleware
 from api.routers import healthcheck, static, dynamic, live, merged, geography, predict
 from prometheus_fastapi_instrumentator import Instrumentator
 
+# Chaque run ETL notifié réveille aussi le pré-calcul des prédictions
+live.live_feed.on_notify.append(predict.prediction_worker.notify)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pool async ouvert au démarrage, fermé à l'arrêt
+    await adb.open()
+    live.live_feed.start()
+    predict.shadow_scorer.start()
+    await predict.model_refresher.start()
+    predict.prediction_worker.start()
+    yield
+    await predict.prediction_worker.stop()
+    await predict.model_refresher.stop()
+    predict.shadow_scorer.stop()
+    await live.live_feed.stop()
+    await adb.close()
+
 app = FastAPI(
     title = "DST Airlines API",
     description = "API REST pour suivi des vols en temps réel",
-    version = "1.0.0"
+    version = "1.0.0",
+    lifespan = lifespan
 )
 
+app.add_middleware(RequestContextMiddleware)
+
 app.include_router(healthcheck.router)
 app.include_router(live.router)
 app.include_router(static.router)
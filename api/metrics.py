@@ -1,3 +1,4 @@
+import numpy as np
 from prometheus_client import Counter, Histogram, Gauge
 
 # Volume de requêtes par alias (Champion vs Challenger)
@@ -15,9 +16,83 @@ PREDICTION_OUTPUTS = Histogram(
 	buckets=[-15.0, 0.0, 15.0, 30.0, 60.0, 120.0, 240.0]
 )
 
+# Temps d'inférence par lot, par alias (production sur le chemin de la réponse, challenger en fantôme)
+PREDICTION_LATENCY = Histogram(
+	'api_prediction_latency_seconds',
+	'Duree de model.predict par lot',
+	['model_alias'],
+	buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+# Lots challenger abandonnés (thread fantôme saturé)
+SHADOW_DROPPED = Counter(
+	'api_shadow_dropped_total',
+	'Lots non scores par le challenger faute de capacite',
+	['model_alias']
+)
+
 # Statut de chargement MLflow
 MODEL_LOAD_STATUS = Gauge(
 	'api_model_load_status',
 	'Statut du chargement des modeles depuis MLflow',
 	['model_alias']
-)
\ No newline at end of file
+)
+
+# Durée des rechargements du modèle (arrière-plan)
+MODEL_RELOAD_DURATION = Histogram(
+	'api_model_reload_duration_seconds',
+	'Duree de resolution et chargement du modele depuis MLflow',
+	['model_alias', 'outcome'],
+	buckets=[0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0]
+)
+
+# Cache des résultats de requêtes (invalidé à chaque run ETL)
+QUERY_CACHE_HITS = Counter(
+	'api_query_cache_hits_total',
+	'Requetes servies depuis le cache'
+)
+
+QUERY_CACHE_MISSES = Counter(
+	'api_query_cache_misses_total',
+	'Requetes cachables executees sur PostgreSQL'
+)
+
+QUERY_CACHE_EVICTIONS = Counter(
+	'api_query_cache_evictions_total',
+	'Entrees retirees du cache',
+	['reason']
+)
+
+# Appels identiques regroupés sur un calcul déjà en cours (single-flight)
+COALESCED_CALLS = Counter(
+	'api_coalesced_calls_total',
+	'Appels servis par un calcul identique deja en cours',
+	['operation']
+)
+
+HISTOGRAM_INTERNALS = ("_raise_if_not_observable", "_upper_bounds", "_buckets", "_sum")
+
+def observe_many(histogram, values):
+	"""
+	Équivalent vectorisé de histogram.observe(v) pour chaque valeur : comptage par bucket avec NumPy,
+	puis un inc par bucket touché et un seul inc de la somme. histogram : métrique sans label ou enfant
+	déjà résolu par .labels(...). Les NaN sont ignorés.
+	Attributs internes de prometheus_client (version épinglée dans requirements.txt) : s'ils manquent,
+	repli sur observe() valeur par valeur.
+	"""
+	values = np.asarray(values, dtype=np.float64).ravel()
+	values = values[~np.isnan(values)]
+	if not all(hasattr(histogram, attr) for attr in HISTOGRAM_INTERNALS):
+		for value in values.tolist():
+			histogram.observe(value)
+		return
+	histogram._raise_if_not_observable()
+	if not values.size:
+		return
+
+	# Premier bucket tel que valeur <= borne (dernière borne : +Inf)
+	counts = np.bincount(np.searchsorted(histogram._upper_bounds, values, side="left"), minlength=len(histogram._upper_bounds))
+	for bucket, count in zip(histogram._buckets, counts.tolist()):
+		if count:
+			bucket.inc(count)
+	histogram._sum.inc(float(values.sum()))
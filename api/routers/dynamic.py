@@ -1,9 +1,10 @@
 from enum import Enum
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException
 from typing import Optional
 import pandas as pd
-from api.core.database import db
-from api.services import flight_features
+from api.services import columnar, flight_snapshot, flight_status
+from api.services.columnar import ResponseFormat
+from api.services.flight_status import FLIGHT_DATASETS_COLUMNS
 
 router = APIRouter(tags = ["Dynamic"])
 
@@ -13,41 +14,32 @@ class FlightStatus(str, Enum):
 	history = "historical"
 	all = "all"
 
-def get_datasets():
-	sql = "SELECT * FROM flight_dynamic ORDER BY last_update DESC"
-	all_flights = pd.DataFrame(db.query(sql))
-	return flight_features.build_flight_datasets(all_flights)
+async def get_datasets():
+	return await flight_snapshot.get_datasets()
 
 @router.get("/dynamic")
-def get_dynamic_flights(
+async def get_dynamic_flights(
 	timeline: FlightStatus = Query(FlightStatus.all),
 	callsign: Optional[str] = None,
-	limit: Optional[int] = Query(None, ge=1)
+	limit: Optional[int] = Query(None, ge=1),
+	fmt: ResponseFormat = Depends(columnar.response_format)
 ):
-	datasets = get_datasets()
-	
-	# Sélection du dataset
-	if timeline == FlightStatus.live:
-		rows = datasets["current"]
-	elif timeline == FlightStatus.history:
-		rows = datasets["done"]
+	# Une seule tranche (timeline ou callsign) : classification et filtres poussés dans PostgreSQL
+	if timeline != FlightStatus.all or callsign:
+		dataset = {FlightStatus.live: "current", FlightStatus.history: "done"}.get(timeline)
+		rows = await flight_status.query_flight_datasets(dataset, callsign, limit)
 	else:
-		rows = datasets["current"] + datasets["done"]
-
-	# Filtre callsign
-	if callsign:
-		rows = [r for r in rows if r.get("callsign") == callsign]
-
-	# tri cohérent
-	rows = sorted(
-		rows, 
-		key=lambda r: r.get("last_update") if r.get("last_update") is not None else pd.Timestamp.min, 
-		reverse=True
-	)
-
-	# Application de la limite
-	if limit is not None:
-		rows = rows[:limit]
+		datasets = await get_datasets()
+		rows = sorted(
+			datasets["current"] + datasets["done"],
+			key=lambda r: r.get("last_update") if r.get("last_update") is not None else pd.Timestamp.min,
+			reverse=True
+		)
+		if limit is not None:
+			rows = rows[:limit]
+
+	if columnar.is_columnar(fmt):
+		return columnar.table_response(columnar.table_from_records(rows, FLIGHT_DATASETS_COLUMNS), fmt)
 
 	return {
 		"count": len(rows),
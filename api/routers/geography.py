@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Query
 from typing import Optional
-from api.core.database import db
+from api.core.database import adb
 import pandas as pd
 
 router = APIRouter(tags=["Geography"])
 
 @router.get("/airports")
-def get_airports(
+async def get_airports(
 	airport_code: Optional[str] = None,
 	airport_name: Optional[str] = None,
 	country_code: Optional[str] = None,
@@ -31,11 +31,11 @@ def get_airports(
 		query_str += " LIMIT %(limit)s"
 		params["limit"] = limit
 
-	airports = pd.DataFrame(db.query(query_str, params))
+	airports = pd.DataFrame(await adb.query(query_str, params, cache=True))
 	return {"count": len(airports), "airports": airports.to_dict(orient = "records")}
 
 @router.get("/countries")
-def get_countries(
+async def get_countries(
 	country_code: Optional[str] = None,
 	country_name: Optional[str] = None,
 	limit: Optional[int] = Query(None, ge = 1)
@@ -55,5 +55,5 @@ def get_countries(
 		query_str += " LIMIT %(limit)s"
 		params["limit"] = limit
 
-	countries = pd.DataFrame(db.query(query_str, params))
+	countries = pd.DataFrame(await adb.query(query_str, params, cache=True))
 	return {"count": len(countries), "countries": countries.to_dict(orient = "records")}
\ No newline at end of file
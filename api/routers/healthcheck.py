@@ -1,11 +1,11 @@
 from fastapi import APIRouter, HTTPException
-from api.core.database import db
+from api.core.database import adb
 router = APIRouter(tags=["Healthcheck"])
 
 @router.get("/healthcheck")
-def healthcheck():
+async def healthcheck():
     try:
-        db.query("SELECT 1;")
+        await adb.query("SELECT 1;")
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         raise HTTPException(status_code = 503, detail = str(e))
\ No newline at end of file
@@ -1,174 +1,311 @@
-from fastapi import APIRouter, Query
+import asyncio
+import json
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
-from api.core.database import db
-from api.services import flight_features
-import pandas as pd
+from api.core.cache import LRUCache
+from api.core.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, LIVE_CHANGES_CURSOR_HISTORY, LIVE_FEED_CHANNEL, LIVE_FEED_KEEPALIVE
+from api.core.database import adb
+from api.services import columnar, flight_snapshot
+from api.services.columnar import ResponseFormat
+from api.services.live_feed import LiveFeed
 
 router = APIRouter(tags=["Live"])
 
-def get_current_subset():
-	sql = "SELECT * FROM flight_dynamic ORDER BY last_update DESC"
-	all_flights = pd.DataFrame(db.query(sql))
-	datasets = flight_features.build_flight_datasets(all_flights)
-	return datasets["current"]
+async def get_current_subset():
+	return (await flight_snapshot.get_datasets())["current"]
 
-# Toutes les métadonnées
+def current_flights_params(current_rows):
+	"""Vols en cours passés en trois paramètres tableau (un seul plan de requête quelle que soit la flotte)."""
+	return (
+		[r["unique_key"] for r in current_rows],
+		[r["callsign"] for r in current_rows],
+		[r["icao24"] for r in current_rows]
+	)
 
-@router.get("/live/history/all")
-def get_live_history_all(
-	callsign: Optional[str] = Query(None),
-	limit: Optional[int] = Query(None, ge=1)
-):
-	current_rows = get_current_subset()
-	sql = "SELECT * FROM live_data"
-	params = []
+def json_default(value):
+	return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+CURRENT_FLIGHTS = "unnest(%s::text[], %s::text[], %s::text[]) AS cur(unique_key, callsign, icao24)"
 
-	if current_rows:
-		tuples_to_exclude = [(r["unique_key"], r["callsign"], r["icao24"]) for r in current_rows]
-		in_clause = ",".join(["(%s,%s,%s)"] * len(tuples_to_exclude))
-		sql += f" WHERE (unique_key, callsign, icao24) NOT IN ({in_clause})"
-		params.extend([item for t in tuples_to_exclude for item in t])
+def current_live_sql(columns: str, current_rows, callsign: Optional[str], limit: Optional[int], after: Optional[int] = None):
+	sql = f"""
+		SELECT {columns}
+		FROM live_data
+		JOIN {CURRENT_FLIGHTS} USING (unique_key, callsign, icao24)
+	"""
+	params = list(current_flights_params(current_rows))
+	conditions = []
 
 	if callsign:
-		sql += " AND callsign = %s" if "WHERE" in sql else " WHERE callsign = %s"
+		conditions.append("callsign = %s")
 		params.append(callsign)
 
+	if after is not None:
+		conditions.append("indice > %s")
+		params.append(after)
+
+	if conditions:
+		sql += " WHERE " + " AND ".join(conditions)
+
 	sql += " ORDER BY request_id DESC"
 	
 	if limit is not None:
 		sql += " LIMIT %s"
 		params.append(limit)
 
-	live_rows = db.query(sql, tuple(params))
-	return {"count": len(live_rows), "data": live_rows}
+	return sql, tuple(params)
 
-# Toutes les métadonnées (Current)
+def latest_live_sql(columns: str, current_rows):
+	"""Dernière ligne live de chaque vol en cours (une lecture d'index par vol, quel que soit l'historique)."""
+	sql = f"""
+		SELECT latest.*
+		FROM {CURRENT_FLIGHTS}
+		CROSS JOIN LATERAL (
+			SELECT {columns}
+			FROM live_data
+			WHERE live_data.unique_key = cur.unique_key
+			  AND live_data.callsign = cur.callsign
+			  AND live_data.icao24 = cur.icao24
+			ORDER BY live_data.indice DESC
+			LIMIT 1
+		) AS latest
+		ORDER BY latest.indice DESC
+	"""
+	return sql, current_flights_params(current_rows)
 
-@router.get("/live/current/all")
-def get_live_current_all(
-	callsign: Optional[str] = Query(None),
-	limit: Optional[int] = Query(None, ge=1)
-):
-	current_rows = get_current_subset()
+async def query_current_latest(columns: str, current_rows) -> list:
 	if not current_rows:
-		return {"count": 0, "data": []}
-
-	tuples = [(r["unique_key"], r["callsign"], r["icao24"]) for r in current_rows]
-	in_clause = ",".join(["(%s,%s,%s)"] * len(tuples))
-	sql = f"SELECT * FROM live_data WHERE (unique_key, callsign, icao24) IN ({in_clause})"
-	params = [item for t in tuples for item in t]
-
-	if callsign:
-		sql += " AND callsign = %s"
-		params.append(callsign)
+		return []
+	sql, params = latest_live_sql(columns, current_rows)
+	return await adb.query(sql, params, cache=True)
 
-	sql += " ORDER BY request_id DESC"
-	
-	if limit is not None:
-		sql += " LIMIT %s"
-		params.append(limit)
+async def query_current_live(columns: str, current_rows, callsign: Optional[str], limit: Optional[int], fmt = None):
+	sql, params = current_live_sql(columns, current_rows, callsign, limit)
+	if columnar.is_columnar(fmt):
+		return await columnar.query_response(sql, params, fmt, cache=True)
 
-	live_rows = db.query(sql, tuple(params))
+	if not current_rows:
+		return {"count": 0, "data": []}
+	live_rows = await adb.query(sql, params, cache=True)
 	return {"count": len(live_rows), "data": live_rows}
 
-# Position / current
+# Toutes les métadonnées
 
-@router.get("/live/current/position")
-def get_live_current_position(
+@router.get("/live/history/all")
+async def get_live_history_all(
 	callsign: Optional[str] = Query(None),
-	limit: Optional[int] = Query(None, ge=1)
+	limit: Optional[int] = Query(None, ge=1),
+	after: Optional[int] = Query(None, ge=0),
+	page_size: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+	stream: bool = Query(False),
+	fmt: ResponseFormat = Depends(columnar.response_format)
 ):
-	current_rows = get_current_subset()
-	if not current_rows:
-		return {"count": 0, "data": []}
-
-	tuples = [(r["unique_key"], r["callsign"], r["icao24"]) for r in current_rows]
-	in_clause = ",".join(["(%s,%s,%s)"] * len(tuples))
+	current_rows = await get_current_subset()
 	sql = f"""
-		SELECT request_id, callsign, icao24, longitude, latitude,
-			   baro_altitude, geo_altitude, on_ground, velocity, vertical_rate, unique_key
+		SELECT *
 		FROM live_data
-		WHERE (unique_key, callsign, icao24) IN ({in_clause})
+		WHERE NOT EXISTS (
+			SELECT 1 FROM {CURRENT_FLIGHTS}
+			WHERE cur.unique_key = live_data.unique_key
+			  AND cur.callsign = live_data.callsign
+			  AND cur.icao24 = live_data.icao24
+		)
 	"""
-	params = [item for t in tuples for item in t]
+	params = list(current_flights_params(current_rows))
 
 	if callsign:
 		sql += " AND callsign = %s"
 		params.append(callsign)
 
-	sql += " ORDER BY request_id DESC"
+	# Pagination par curseur (keyset) sur indice, monotone
+	paginated = after is not None or page_size is not None
+	if paginated or stream:
+		if after is not None:
+			sql += " AND indice > %s"
+			params.append(after)
+		sql += " ORDER BY indice ASC"
+		if paginated:
+			limit = page_size or DEFAULT_PAGE_SIZE
+	else:
+		sql += " ORDER BY request_id DESC"
 	
 	if limit is not None:
 		sql += " LIMIT %s"
 		params.append(limit)
 
-	live_rows = db.query(sql, tuple(params))
+	if stream:
+		rows = adb.stream(sql, tuple(params))
+		return StreamingResponse((json.dumps(row, default=json_default) + "\n" async for row in rows), media_type="application/x-ndjson")
+
+	# Cache réservé aux requêtes bornées : l'historique complet ne reste pas en mémoire jusqu'au prochain run
+	bounded = limit is not None
+	if columnar.is_columnar(fmt):
+		table = columnar.table_from_columns(*await adb.query_columns(sql, tuple(params), cache=bounded))
+		headers = {}
+		if paginated and table.num_rows == limit:
+			headers["X-Next-Cursor"] = str(table.column("indice")[-1].as_py())
+		return columnar.table_response(table, fmt, headers)
+
+	live_rows = await adb.query(sql, tuple(params), cache=bounded)
+	if paginated:
+		next_cursor = live_rows[-1]["indice"] if len(live_rows) == limit else None
+		return {"count": len(live_rows), "next_cursor": next_cursor, "data": live_rows}
 	return {"count": len(live_rows), "data": live_rows}
 
-# Weather / current
+# Changements depuis un curseur (Current)
+
+async def resolve_since(since: Optional[str]) -> Optional[int]:
+	"""Curseur client : indice, ou request_id d'un run ETL (dernier indice du run)."""
+	if since is None or since.isdigit():
+		return int(since) if since else None
+	try:
+		request_id = str(UUID(since))
+	except ValueError:
+		raise HTTPException(status_code=422, detail="since doit être un indice ou un request_id")
+
+	rows = await adb.query("SELECT max(indice) AS indice FROM live_data WHERE request_id = %s", (request_id,))
+	if rows[0]["indice"] is None:
+		raise HTTPException(status_code=404, detail="request_id inconnu")
+	return rows[0]["indice"]
+
+# Jeu courant remis avec chaque curseur (unique_key -> callsign) : removed = courant au curseur - courant maintenant
+current_at_cursor = LRUCache(LIVE_CHANGES_CURSOR_HISTORY)
+
+def remember_current(cursor: int, current_rows):
+	# Un même curseur peut être remis avec des jeux différents (vol clos sans nouvelle ligne live) : union
+	known = current_at_cursor.get(cursor) or {}
+	current_at_cursor.set(cursor, {**known, **{r["unique_key"]: r["callsign"] for r in current_rows}})
+
+@router.get("/live/changes")
+async def get_live_changes(
+	since: Optional[str] = Query(None, description="indice ou request_id déjà reçu par le client"),
+	callsign: Optional[str] = Query(None)
+):
+	"""
+	Lignes live des vols en cours ingérées après since, et vols sortis du jeu courant.
+	Sans since : jeu courant complet (initialisation de l'état client).
+	Curseur inconnu du serveur (redémarrage, autre worker) : jeu complet avec reset=true, le client repart de zéro.
+	"""
+	return await live_changes(await resolve_since(since), callsign)
+
+async def live_changes(after: Optional[int], callsign: Optional[str] = None, columns: str = "live_data.*") -> dict:
+	head = (await adb.query("SELECT max(indice) AS indice FROM live_data"))[0]["indice"]
+	current_rows = await get_current_subset()
+
+	seen = current_at_cursor.get(after) if after is not None else None
+	reset = after is not None and seen is None
+
+	sql, params = current_live_sql(columns, current_rows, callsign, None, None if reset else after)
+	live_rows = await adb.query(sql, params) if current_rows else []
+
+	# Vols en cours au curseur du client qui ne le sont plus
+	current_keys = {r["unique_key"] for r in current_rows}
+	removed = sorted(
+		key for key, flight_callsign in (seen or {}).items()
+		if key not in current_keys and (not callsign or flight_callsign == callsign)
+	)
+
+	next_cursor = max([head or 0, after or 0] + [row["indice"] for row in live_rows])
+	remember_current(next_cursor, current_rows)
+	return {
+		"since": after,
+		"next_cursor": next_cursor,
+		"reset": reset,
+		"count": len(live_rows),
+		"data": live_rows,
+		"removed": removed
+	}
 
-@router.get("/live/current/weather")
-def get_live_current_weather(
+# Toutes les métadonnées (Current)
+
+@router.get("/live/current/all")
+async def get_live_current_all(
 	callsign: Optional[str] = Query(None),
-	limit: Optional[int] = Query(None, ge=1)
+	limit: Optional[int] = Query(None, ge=1),
+	fmt: ResponseFormat = Depends(columnar.response_format)
 ):
-	current_rows = get_current_subset()
-	if not current_rows:
-		return {"count": 0, "data": []}
+	current_rows = await get_current_subset()
+	return await query_current_live("live_data.*", current_rows, callsign, limit, fmt)
 
-	tuples = [(r["unique_key"], r["callsign"], r["icao24"]) for r in current_rows]
-	in_clause = ",".join(["(%s,%s,%s)"] * len(tuples))
-	sql = f"""
-		SELECT request_id, callsign, icao24, longitude, latitude,
-			   wind_speed, gust_speed, visibility, cloud_coverage, rain,
-			   global_condition, unique_key
-		FROM live_data
-		WHERE (unique_key, callsign, icao24) IN ({in_clause})
-	"""
-	params = [item for t in tuples for item in t]
+# Position / current
 
-	if callsign:
-		sql += " AND callsign = %s"
-		params.append(callsign)
+POSITION_COLUMNS = """
+	request_id, callsign, icao24, longitude, latitude,
+	baro_altitude, geo_altitude, on_ground, velocity, vertical_rate, unique_key
+"""
 
-	sql += " ORDER BY request_id DESC"
-	
-	if limit is not None:
-		sql += " LIMIT %s"
-		params.append(limit)
+@router.get("/live/current/position")
+async def get_live_current_position(
+	callsign: Optional[str] = Query(None),
+	limit: Optional[int] = Query(None, ge=1),
+	fmt: ResponseFormat = Depends(columnar.response_format)
+):
+	current_rows = await get_current_subset()
 
-	live_rows = db.query(sql, tuple(params))
-	return {"count": len(live_rows), "data": live_rows}
+	return await query_current_live(POSITION_COLUMNS, current_rows, callsign, limit, fmt)
 
-# Light / current
+# Position / push (SSE) : un diff par run ETL pour tous les abonnés
 
-@router.get("/live/current/light")
-def get_live_current_light(
+async def fetch_position_changes(after: Optional[int]) -> dict:
+	return await live_changes(after, columns=f"indice, {POSITION_COLUMNS}")
+
+async def etl_notifications():
+	async for notify in adb.listen(LIVE_FEED_CHANNEL):
+		# Nouveau run : le cache de requêtes relit sa génération dès la prochaine requête
+		adb.expire_generation()
+		yield notify
+
+live_feed = LiveFeed(fetch_position_changes, notifier=etl_notifications)
+
+def format_sse(event: dict) -> str:
+	payload = {key: event[key] for key in ("cursor", "data", "removed")}
+	return f"id: {event['cursor']}\nevent: {event['event']}\ndata: {json.dumps(payload, default=json_default)}\n\n"
+
+@router.get("/live/stream/position")
+async def stream_live_positions():
+	async def events():
+		queue = live_feed.subscribe()
+		try:
+			while True:
+				try:
+					event = await asyncio.wait_for(queue.get(), LIVE_FEED_KEEPALIVE.total_seconds())
+				except asyncio.TimeoutError:
+					yield ": keepalive\n\n"
+					continue
+				yield format_sse(event)
+		finally:
+			live_feed.unsubscribe(queue)
+
+	return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# Weather / current
+
+@router.get("/live/current/weather")
+async def get_live_current_weather(
 	callsign: Optional[str] = Query(None),
-	limit: Optional[int] = Query(None, ge=1)
+	limit: Optional[int] = Query(None, ge=1),
+	fmt: ResponseFormat = Depends(columnar.response_format)
 ):
-	current_rows = get_current_subset()
-	if not current_rows:
-		return {"count": 0, "data": []}
+	current_rows = await get_current_subset()
 
-	tuples = [(r["unique_key"], r["callsign"], r["icao24"]) for r in current_rows]
-	in_clause = ",".join(["(%s,%s,%s)"] * len(tuples))
-	sql = f"""
-		SELECT request_id, callsign, icao24, longitude, latitude, global_condition, unique_key
-		FROM live_data
-		WHERE (unique_key, callsign, icao24) IN ({in_clause})
+	columns = """
+		request_id, callsign, icao24, longitude, latitude,
+		wind_speed, gust_speed, visibility, cloud_coverage, rain,
+		global_condition, unique_key
 	"""
-	params = [item for t in tuples for item in t]
+	return await query_current_live(columns, current_rows, callsign, limit, fmt)
 
-	if callsign:
-		sql += " AND callsign = %s"
-		params.append(callsign)
+# Light / current
 
-	sql += " ORDER BY request_id DESC"
-	
-	if limit is not None:
-		sql += " LIMIT %s"
-		params.append(limit)
+@router.get("/live/current/light")
+async def get_live_current_light(
+	callsign: Optional[str] = Query(None),
+	limit: Optional[int] = Query(None, ge=1),
+	fmt: ResponseFormat = Depends(columnar.response_format)
+):
+	current_rows = await get_current_subset()
 
-	live_rows = db.query(sql, tuple(params))
-	return {"count": len(live_rows), "data": live_rows}
\ No newline at end of file
+	columns = "request_id, callsign, icao24, longitude, latitude, global_condition, unique_key"
+	return await query_current_live(columns, current_rows, callsign, limit, fmt)
\ No newline at end of file
@@ -1,90 +1,90 @@
 from fastapi import APIRouter, HTTPException
-from api.core.database import db
-from api.services import flight_features
-import pandas as pd
+from api.core.cache import LRUCache
+from api.core.config import MERGED_HISTORY_CACHE_SIZE
+from api.core.database import adb
+from api.services import flight_status
 
 router = APIRouter(tags=["Merged"])
 
-def get_datasets():
-	sql = "SELECT * FROM flight_dynamic ORDER BY last_update DESC"
-	all_flights = pd.DataFrame(db.query(sql))
-	return flight_features.build_flight_datasets(all_flights)
+# Historique des vols terminés : unique_key -> (last_update, entrée de réponse)
+history_cache = LRUCache(MERGED_HISTORY_CACHE_SIZE)
 
-
-def get_static_flight(callsign: str):
+async def get_static_flight(callsign: str):
 	sql = """
 		SELECT *
 		FROM flight_static
 		WHERE callsign = %s
 	"""
-	rows = db.query(sql, (callsign,))
+	rows = await adb.query(sql, (callsign,), cache=True)
 	return rows[0] if rows else None
 
 
-def get_live_rows(callsign: str, unique_key: str):
+async def get_live_rows_by_flight(callsign: str, unique_keys: list) -> dict:
+	"""live_data de plusieurs vols du callsign en une seule requête, groupée par unique_key."""
+	grouped = {key: [] for key in unique_keys}
+	if not unique_keys:
+		return grouped
+
 	sql = """
 		SELECT *
 		FROM live_data
-		WHERE callsign = %s AND unique_key = %s
+		WHERE callsign = %s AND unique_key = ANY(%s::text[])
 		ORDER BY request_id ASC
 	"""
-	return db.query(sql, (callsign, unique_key))
+	for row in await adb.query(sql, (callsign, unique_keys)):
+		grouped[row["unique_key"]].append(row)
+	return grouped
+
+
+def flight_entry(flight: dict, live_rows: list) -> dict:
+	return {
+		"unique_key": flight.get("unique_key"),
+		"status": flight.get("status"),
+		"departure_scheduled_ts": flight.get("departure_scheduled_ts"),
+		"departure_actual_ts": flight.get("departure_actual_ts"),
+		"arrival_scheduled_ts": flight.get("arrival_scheduled_ts"),
+		"arrival_actual_ts": flight.get("arrival_actual_ts"),
+		"departure_difference": flight.get("departure_difference"),
+		"arrival_difference": flight.get("arrival_difference"),
+		"last_update": flight.get("last_update"),
+		"live_data": live_rows
+	}
 
 
 @router.get("/merged/{callsign}")
-def get_merged_flight(callsign: str):
+async def get_merged_flight(callsign: str):
 
 	# Static
-	static_data = get_static_flight(callsign)
+	static_data = await get_static_flight(callsign)
 	if not static_data:
 		raise HTTPException(status_code = 404, detail = "Callsign not found")
 
-	# Datasets
-	datasets = get_datasets()
-	done = datasets.get("done", [])
-	current = datasets.get("current", [])
+	# Datasets du seul callsign, classés côté PostgreSQL
+	datasets = await flight_status.query_callsign_datasets(callsign)
+	done, current = datasets["done"], datasets["current"]
+
+	# Vols terminés déjà en cache (invalidés si last_update change)
+	cached = {}
+	for flight in done:
+		hit = history_cache.get(flight["unique_key"])
+		if hit is not None and hit[0] == flight.get("last_update"):
+			cached[flight["unique_key"]] = hit[1]
+
+	# Une seule requête live_data pour les vols en cours et l'historique manquant
+	missing = [f["unique_key"] for f in done if f["unique_key"] not in cached]
+	live_rows = await get_live_rows_by_flight(callsign, missing + [f["unique_key"] for f in current])
 
 	# History
 	history = []
 	for flight in done:
-		if flight["callsign"] != callsign:
-			continue
-
-		live_rows = get_live_rows(callsign, flight["unique_key"])
-
-		history.append({
-			"unique_key": flight.get("unique_key"),
-			"status": flight.get("status"),
-			"departure_scheduled_ts": flight.get("departure_scheduled_ts"),
-			"departure_actual_ts": flight.get("departure_actual_ts"),
-			"arrival_scheduled_ts": flight.get("arrival_scheduled_ts"),
-			"arrival_actual_ts": flight.get("arrival_actual_ts"),
-			"departure_difference": flight.get("departure_difference"),
-			"arrival_difference": flight.get("arrival_difference"),
-			"last_update": flight.get("last_update"),
-			"live_data": live_rows
-		})
+		entry = cached.get(flight["unique_key"])
+		if entry is None:
+			entry = flight_entry(flight, live_rows[flight["unique_key"]])
+			history_cache.set(flight["unique_key"], (flight.get("last_update"), entry))
+		history.append(entry)
 
 	# Live
-	live = []
-	for flight in current:
-		if flight["callsign"] != callsign:
-			continue
-
-		live_rows = get_live_rows(callsign, flight["unique_key"])
-
-		live.append({
-			"unique_key": flight.get("unique_key"),
-			"status": flight.get("status"),
-			"departure_scheduled_ts": flight.get("departure_scheduled_ts"),
-			"departure_actual_ts": flight.get("departure_actual_ts"),
-			"arrival_scheduled_ts": flight.get("arrival_scheduled_ts"),
-			"arrival_actual_ts": flight.get("arrival_actual_ts"),
-			"departure_difference": flight.get("departure_difference"),
-			"arrival_difference": flight.get("arrival_difference"),
-			"last_update": flight.get("last_update"),
-			"live_data": live_rows
-		})
+	live = [flight_entry(flight, live_rows[flight["unique_key"]]) for flight in current]
 
 	# Response
 	return {
@@ -94,4 +94,4 @@ def get_merged_flight(callsign: str):
 		"destination_code": static_data.get("destination_code"),
 		"history": history,
 		"live": live
-	}
\ No newline at end of file
+	}
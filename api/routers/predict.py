@@ -1,101 +1,411 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from enum import Enum
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 import mlflow.pyfunc
 import pandas as pd
 import os
+import shutil
+import tempfile
 import numpy as np
+import pyarrow as pa
 import logging
 import time
 
 # Import des métriques
-from api.metrics import PREDICTION_COUNT, PREDICTION_OUTPUTS, MODEL_LOAD_STATUS
+from api.metrics import PREDICTION_COUNT, PREDICTION_OUTPUTS, PREDICTION_LATENCY, MODEL_LOAD_STATUS, MODEL_RELOAD_DURATION, observe_many
 
-from api.routers.live import get_live_current_all
-from api.routers.dynamic import get_dynamic_flights, FlightStatus
+from api.core.config import PREDICTION_WORKER_INTERVAL, PREDICTION_WORKER_LOCK, PREDICTION_BATCH_MAX_ROWS, PREDICTION_BATCH_MAX_BYTES, MODEL_POLL_INTERVAL, MODEL_CACHE_DIR, SHADOW_CHALLENGER
+from api.core.database import adb
+from api.services import columnar
+from api.services.columnar import ResponseFormat
+from api.services.forest import FOREST_ARTIFACT, ForestPredictor
+from api.services.shadow import ShadowScorer
+from api.routers.live import get_live_current_all, get_current_subset, query_current_latest
 
 router = APIRouter(tags=["Prediction"])
 
-MODEL_URI = f"models:/{os.getenv('MODEL_NAME', 'ArrivalDelayModel')}@production"
+MODEL_NAME = os.getenv('MODEL_NAME', 'ArrivalDelayModel')
+MODEL_URI = f"models:/{MODEL_NAME}@production"
 
-# Gestion du Cache avec TTL
+# Modèle servi : remplacé d'un bloc par le rafraîchissement en arrière-plan
 cached_model = None
-last_update_ts = 0
-CACHE_TTL = 300  # l'API vérifie MLflow toutes les 5 min
 current_model_version = "unknown"
 
+# Challenger optionnel (SHADOW_CHALLENGER) : scoré en fantôme, jamais servi
+challenger_model = None
+challenger_version = None
+shadow_scorer = ShadowScorer()
+
 def get_model():
-	global cached_model, last_update_ts, current_model_version
+	"""Modèle courant, sans appel MLflow (chargé au démarrage puis par ModelRefresher)."""
+	return cached_model
+
+def resolve_alias_version(alias: str) -> str:
+	mlflow.set_tracking_uri(os.getenv("MLFLOW_API_URL"))
+	client = mlflow.tracking.MlflowClient()
+	return client.get_model_version_by_alias(MODEL_NAME, alias).version
 
-	now = time.time()
-	if cached_model is None or (now - last_update_ts) > CACHE_TTL:
+def resolve_production_version() -> str:
+	return resolve_alias_version("production")
+
+def fetch_forest(run_id: str, version: str) -> str:
+	"""Artefact téléchargé une fois par hôte : tous les workers projettent les mêmes fichiers."""
+	target = os.path.join(MODEL_CACHE_DIR, MODEL_NAME, str(version))
+	if not os.path.isdir(target):
+		os.makedirs(os.path.dirname(target), exist_ok=True)
+		staging = tempfile.mkdtemp(dir=os.path.dirname(target))
 		try:
-			mlflow.set_tracking_uri(os.getenv("MLFLOW_API_URL"))
-			new_model = mlflow.pyfunc.load_model(MODEL_URI)
-			cached_model = new_model
-			last_update_ts = now
-			
-			# Extraction de la version
-			current_model_version = new_model.metadata.model_uuid[:8]
-			client = mlflow.tracking.MlflowClient()
-			model_name = os.getenv('MODEL_NAME', 'ArrivalDelayModel')
-			latest_version = client.get_model_version_by_alias(model_name, "production").version
-			current_model_version = f"v{latest_version}"
-			
-			MODEL_LOAD_STATUS.labels(model_alias="production").set(1)
-			logging.info(f"Modèle Production {current_model_version} rafraîchi.")
-		except Exception as e:
-			logging.error(f"Erreur lors du rafraîchissement MLflow : {e}")
-			if cached_model is None:
-				MODEL_LOAD_STATUS.labels(model_alias="production").set(0)
-				try:
-					latest_uri = MODEL_URI.replace("@production", "/latest")
-					cached_model = mlflow.pyfunc.load_model(latest_uri)
-				except Exception:
-					return None
-	return cached_model
+			path = mlflow.artifacts.download_artifacts(run_id=run_id, artifact_path=FOREST_ARTIFACT, dst_path=staging)
+			# Renommage atomique ; échoue sans conséquence si un autre worker a déjà publié la version
+			os.rename(path, target)
+		except OSError:
+			pass
+		finally:
+			shutil.rmtree(staging, ignore_errors=True)
+	return target
+
+def load_model_version(version: str):
+	"""Forêt NumPy exportée avec le run si disponible (mmap), sinon modèle pyfunc."""
+	client = mlflow.tracking.MlflowClient()
+	run_id = client.get_model_version(MODEL_NAME, version).run_id
+	try:
+		return ForestPredictor.load(fetch_forest(run_id, version))
+	except Exception as e:
+		logging.info(f"Export NumPy absent pour v{version}, chargement pyfunc : {e}")
+		return mlflow.pyfunc.load_model(f"models:/{MODEL_NAME}/{version}")
+
+def load_latest_model():
+	return mlflow.pyfunc.load_model(f"models:/{MODEL_NAME}/latest")
+
+async def refresh_model() -> bool:
+	"""Charge la version pointée par l'alias production si elle a changé, hors du chemin des requêtes."""
+	global cached_model, current_model_version
+
+	start = time.perf_counter()
+	try:
+		version = await run_in_threadpool(resolve_production_version)
+		if cached_model is not None and current_model_version == f"v{version}":
+			return False
+
+		new_model = await run_in_threadpool(load_model_version, version)
+		# Remplacement atomique pour les requêtes (aucun await entre les deux affectations)
+		cached_model, current_model_version = new_model, f"v{version}"
+
+		MODEL_RELOAD_DURATION.labels(model_alias="production", outcome="success").observe(time.perf_counter() - start)
+		MODEL_LOAD_STATUS.labels(model_alias="production").set(1)
+		logging.info(f"Modèle Production {current_model_version} rafraîchi.")
+		return True
+	except Exception as e:
+		MODEL_RELOAD_DURATION.labels(model_alias="production", outcome="failure").observe(time.perf_counter() - start)
+		logging.error(f"Erreur lors du rafraîchissement MLflow : {e}")
+		if cached_model is None:
+			MODEL_LOAD_STATUS.labels(model_alias="production").set(0)
+			try:
+				cached_model = await run_in_threadpool(load_latest_model)
+			except Exception:
+				pass
+		return False
+
+async def refresh_challenger() -> bool:
+	"""Même principe pour l'alias challenger ; un échec conserve le challenger déjà chargé."""
+	global challenger_model, challenger_version
+
+	start = time.perf_counter()
+	try:
+		version = await run_in_threadpool(resolve_alias_version, "challenger")
+		if challenger_model is not None and challenger_version == f"v{version}":
+			return False
+
+		new_model = await run_in_threadpool(load_model_version, version)
+		challenger_model, challenger_version = new_model, f"v{version}"
+
+		MODEL_RELOAD_DURATION.labels(model_alias="challenger", outcome="success").observe(time.perf_counter() - start)
+		MODEL_LOAD_STATUS.labels(model_alias="challenger").set(1)
+		logging.info(f"Modèle Challenger {challenger_version} chargé (scoring fantôme).")
+		return True
+	except Exception as e:
+		MODEL_RELOAD_DURATION.labels(model_alias="challenger", outcome="failure").observe(time.perf_counter() - start)
+		logging.warning(f"Challenger indisponible : {e}")
+		if challenger_model is None:
+			MODEL_LOAD_STATUS.labels(model_alias="challenger").set(0)
+		return False
+
+class ModelRefresher:
+	"""Préchargement au démarrage puis scrutation de l'alias production (et challenger) toutes les MODEL_POLL_INTERVAL."""
+
+	def __init__(self, interval = MODEL_POLL_INTERVAL, challenger = SHADOW_CHALLENGER):
+		self.interval = interval.total_seconds()
+		self.challenger = challenger
+		self._task = None
+
+	async def refresh(self):
+		await refresh_model()
+		if self.challenger:
+			await refresh_challenger()
+
+	async def run(self):
+		while True:
+			await asyncio.sleep(self.interval)
+			await self.refresh()
+
+	async def start(self):
+		if not os.getenv("MLFLOW_API_URL"):
+			logging.warning("MLFLOW_API_URL absent : modèle non préchargé")
+			return
+		await self.refresh()
+		self._task = asyncio.create_task(self.run())
+
+	async def stop(self):
+		if self._task is not None:
+			self._task.cancel()
+			await asyncio.gather(self._task, return_exceptions=True)
+			self._task = None
+
+model_refresher = ModelRefresher()
+
+class PredictionMode(str, Enum):
+	full = "full"
+	latest = "latest"
+
+FEATURES = ["callsign", "icao24", "longitude", "latitude", "geo_altitude", "velocity", "global_condition", "departure_difference"]
+TEXT_FEATURES = ["callsign", "icao24", "global_condition"]
+
+def model_input(df: pd.DataFrame) -> pd.DataFrame:
+	return df.reindex(columns=FEATURES).fillna(0)
+
+def build_features(live_rows: list, dyn_rows: list) -> pd.DataFrame:
+	df_live = pd.DataFrame(live_rows)
+	df_dyn = pd.DataFrame(dyn_rows)
+
+	# Merge et features
+	if not df_dyn.empty:
+		df = df_live.merge(df_dyn[["unique_key", "departure_difference"]], on="unique_key", how="left")
+	else:
+		df = df_live.assign(departure_difference=np.nan)
+	return df
+
+async def read_predictions(model_version: str, indices: list) -> dict:
+	sql = """
+		SELECT indice, predicted_delay
+		FROM live_predictions
+		WHERE model_version = %s AND indice = ANY(%s::int[])
+	"""
+	rows = await adb.query(sql, (model_version, indices))
+	return {row["indice"]: row["predicted_delay"] for row in rows}
+
+async def score_rows(model, model_version: str, live_rows: list, dyn_rows: list) -> dict:
+	"""Inférence sur les lignes live données, enregistrée par (indice, version) si la version est connue."""
+	df = build_features(live_rows, dyn_rows)
+	X = model_input(df)
+	start = time.perf_counter()
+	preds = np.asarray(await run_in_threadpool(model.predict, X))
+	PREDICTION_LATENCY.labels(model_alias="production").observe(time.perf_counter() - start)
+
+	# Même lot soumis au challenger, sans attendre son résultat
+	if challenger_version != model_version:
+		shadow_scorer.submit(challenger_model, challenger_version, X)
+
+	# Distribution des prédictions : chaque ligne n'est scorée qu'une fois par version
+	observe_many(PREDICTION_OUTPUTS.labels(model_alias="production"), preds)
+
+	scored = dict(zip(df["indice"].tolist(), preds.round(2).tolist()))
+	if model_version != "unknown":
+		await adb.execute("""
+			INSERT INTO live_predictions (indice, model_version, predicted_delay)
+			SELECT indice, %s, predicted_delay
+			FROM unnest(%s::int[], %s::double precision[]) AS p(indice, predicted_delay)
+			ON CONFLICT (indice, model_version) DO NOTHING
+		""", (model_version, list(scored), list(scored.values())))
+	return scored
+
+async def current_rows(mode: PredictionMode) -> list:
+	"""Lignes à scorer : tout l'historique des vols en cours, ou leur seule dernière position."""
+	if mode == PredictionMode.latest:
+		return await query_current_latest("live_data.*", await get_current_subset())
+	return (await get_live_current_all(None, None)).get("data", [])
+
+async def predict_current(model, model_version: str, mode: PredictionMode = PredictionMode.full) -> list:
+	"""Prédictions des vols en cours : lues en table, scorées à la demande si absentes (nouvelle version, nouveau run)."""
+	live_data = await current_rows(mode)
+	if not live_data:
+		return []
+
+	predictions = await read_predictions(model_version, [row["indice"] for row in live_data])
+	missing = [row for row in live_data if row["indice"] not in predictions]
+	if missing:
+		dyn_data = await get_current_subset()
+		predictions.update(await score_rows(model, model_version, missing, dyn_data))
+
+	if mode == PredictionMode.latest:
+		return [{"indice": row["indice"], "unique_key": row["unique_key"], "predicted_delay": predictions[row["indice"]]} for row in live_data]
+	return [{"indice": row["indice"], "predicted_delay": predictions[row["indice"]]} for row in live_data]
+
+class PredictionWorker:
+	"""Pré-calcule les prédictions des nouvelles lignes live à chaque run ETL (NOTIFY) ou à intervalle fixe."""
+
+	def __init__(self, interval = PREDICTION_WORKER_INTERVAL):
+		self.interval = interval.total_seconds()
+		self._wakeup = asyncio.Event()
+		self._task = None
+
+	def notify(self):
+		self._wakeup.set()
+
+	async def score(self) -> int:
+		model = get_model()
+		if model is None or current_model_version == "unknown":
+			return 0
+
+		# Plusieurs workers uvicorn/gunicorn réveillés par le même run : le détenteur du verrou score,
+		# les autres passent leur tour (un scoreur arrivé après relit les lignes déjà en table)
+		async with adb.advisory_lock(PREDICTION_WORKER_LOCK) as acquired:
+			if not acquired:
+				return 0
+			return len(await predict_current(model, current_model_version))
+
+	async def run(self):
+		while True:
+			try:
+				await asyncio.wait_for(self._wakeup.wait(), self.interval)
+			except asyncio.TimeoutError:
+				pass
+			self._wakeup.clear()
+			try:
+				await self.score()
+			except Exception as e:
+				logging.error(f"Prediction worker failed: {e}")
+
+	def start(self):
+		self._task = asyncio.create_task(self.run())
+
+	async def stop(self):
+		if self._task is not None:
+			self._task.cancel()
+			await asyncio.gather(self._task, return_exceptions=True)
+			self._task = None
+
+prediction_worker = PredictionWorker()
 
 @router.get("/prediction/arrival_delay")
-async def predict_all_delays():
+async def predict_all_delays(mode: PredictionMode = Query(PredictionMode.full, description="full : toutes les positions des vols en cours ; latest : dernière position par vol")):
+	# Modèle déjà en mémoire : aucune requête n'attend MLflow
 	model = get_model()
 	if not model:
 		raise HTTPException(status_code=503, detail="Modèle indisponible.")
 
 	try:
-		# Récupération des données
-		live_data = get_live_current_all(None, None).get("data", [])
-		dyn_data = get_dynamic_flights(FlightStatus.live, None, None).get("data", [])
-
-		if not live_data:
+		predictions = await predict_current(model, current_model_version, mode)
+		if not predictions:
 			return {"count": 0, "predictions": []}
 
-		# Préparation
-		df_live = pd.DataFrame(live_data)
-		df_dyn = pd.DataFrame(dyn_data)
-
-		# Merge et features
-		if not df_dyn.empty:
-			df = df_live.merge(df_dyn[["unique_key", "departure_difference"]], on="unique_key", how="left")
-		else:
-			df = df_live.assign(departure_difference=np.nan)
-
-		features = ["callsign", "icao24", "longitude", "latitude", "geo_altitude", "velocity", "global_condition", "departure_difference"]
-		X = df.reindex(columns=features).fillna(0)
-
-		preds = model.predict(X)
-		
-		# Enregistrement des métriques Prometheus
 		PREDICTION_COUNT.labels(model_alias="production", model_version=current_model_version).inc()
-		for p in preds:
-			PREDICTION_OUTPUTS.labels(model_alias="production").observe(p)
-
-		df["predicted_delay"] = preds.round(2)
 
 		# Réponse
 		return {
 			"status": "success",
-			"count": len(df),
-			"predictions": df[["indice", "predicted_delay"]].to_dict(orient="records")
+			"mode": mode,
+			"count": len(predictions),
+			"predictions": predictions
 		}
 
 	except Exception as e:
 		logging.error(f"Prediction Error: {e}")
-		raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+		raise HTTPException(status_code=400, detail=str(e))
+
+# Lot de features arbitraires (analyses hors ligne, simulations)
+
+def too_large(unit: str) -> HTTPException:
+	limit = PREDICTION_BATCH_MAX_ROWS if unit == "lignes" else PREDICTION_BATCH_MAX_BYTES
+	return HTTPException(status_code=413, detail=f"Lot limité à {limit} {unit}")
+
+async def batch_body(request: Request) -> bytes:
+	"""Corps borné : Content-Length vérifié avant lecture, puis taille cumulée (corps chunked)."""
+	declared = request.headers.get("content-length")
+	if declared and declared.isdigit() and int(declared) > PREDICTION_BATCH_MAX_BYTES:
+		raise too_large("octets")
+	body = bytearray()
+	async for chunk in request.stream():
+		body += chunk
+		if len(body) > PREDICTION_BATCH_MAX_BYTES:
+			raise too_large("octets")
+	return bytes(body)
+
+def batch_columns(body: bytes, content_type: str) -> dict:
+	"""Corps colonne par colonne : JSON {feature: [valeurs]} ou flux Arrow IPC."""
+	if content_type.startswith(columnar.ARROW_STREAM):
+		try:
+			reader = pa.ipc.open_stream(body)
+			batches, rows = [], 0
+			for batch in reader:
+				rows += batch.num_rows
+				if rows > PREDICTION_BATCH_MAX_ROWS:
+					raise too_large("lignes")
+				batches.append(batch)
+			table = pa.Table.from_batches(batches, schema=reader.schema)
+		except pa.ArrowException as e:
+			raise HTTPException(status_code=422, detail=f"Flux Arrow invalide : {e}")
+		return {name: table.column(name).to_pandas() for name in table.column_names if name in FEATURES}
+
+	try:
+		payload = json.loads(body)
+	except ValueError as e:
+		raise HTTPException(status_code=422, detail=f"JSON invalide : {e}")
+	if not isinstance(payload, dict) or not all(isinstance(payload.get(f, []), list) for f in FEATURES):
+		raise HTTPException(status_code=422, detail="Objet {feature: [valeurs]} attendu")
+	if any(len(payload[name]) > PREDICTION_BATCH_MAX_ROWS for name in FEATURES if name in payload):
+		raise too_large("lignes")
+	return {name: pd.Series(payload[name]) for name in FEATURES if name in payload}
+
+def batch_frame(columns: dict) -> pd.DataFrame:
+	"""Validation par colonne (présence, longueur, type), sans objet par ligne."""
+	missing = [f for f in FEATURES if f not in columns]
+	if missing:
+		raise HTTPException(status_code=422, detail=f"Colonnes manquantes : {missing}")
+	lengths = {len(columns[f]) for f in FEATURES}
+	if len(lengths) > 1:
+		raise HTTPException(status_code=422, detail="Colonnes de longueurs différentes")
+	if lengths.pop() > PREDICTION_BATCH_MAX_ROWS:
+		raise too_large("lignes")
+
+	data = {}
+	for name in FEATURES:
+		kind = pd.api.types.infer_dtype(columns[name], skipna=True)
+		if name in TEXT_FEATURES:
+			if kind not in ("string", "empty"):
+				raise HTTPException(status_code=422, detail=f"{name} : texte attendu ({kind})")
+			data[name] = columns[name].astype(object)
+		else:
+			if kind not in ("floating", "integer", "mixed-integer-float", "empty"):
+				raise HTTPException(status_code=422, detail=f"{name} : numérique attendu ({kind})")
+			data[name] = columns[name].astype(np.float64)
+	return pd.DataFrame(data, columns=FEATURES)
+
+@router.post("/prediction/batch")
+async def predict_batch(request: Request, fmt: ResponseFormat = Depends(columnar.response_format)):
+	"""
+	Prédictions sur un lot de features fourni par l'appelant (hors snapshot live).
+	Non enregistrées dans live_predictions ni dans la distribution des sorties live.
+	"""
+	model, model_version = get_model(), current_model_version
+	if not model:
+		raise HTTPException(status_code=503, detail="Modèle indisponible.")
+
+	X = batch_frame(batch_columns(await batch_body(request), request.headers.get("content-type", "")))
+	try:
+		preds = np.asarray(await run_in_threadpool(model.predict, model_input(X)), dtype=np.float64) if len(X) else np.empty(0)
+	except Exception as e:
+		logging.error(f"Batch prediction error: {e}")
+		raise HTTPException(status_code=400, detail=str(e))
+
+	PREDICTION_COUNT.labels(model_alias="production", model_version=model_version).inc()
+	if columnar.is_columnar(fmt):
+		table = pa.table({"predicted_delay": preds.round(2)})
+		return columnar.table_response(table, fmt, {"X-Model-Version": model_version})
+	return {
+		"status": "success",
+		"model_version": model_version,
+		"count": len(preds),
+		"predictions": preds.round(2).tolist()
+	}
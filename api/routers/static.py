@@ -1,27 +1,23 @@
 from fastapi import APIRouter, Query
 from typing import Optional
-from api.core.database import db
-from api.services import flight_features
-import pandas as pd
+from api.core.database import adb
+from api.services import flight_snapshot
 
 router = APIRouter(tags=["Static"])
 
-def get_current_subset():
-	sql = "SELECT * FROM flight_dynamic ORDER BY last_update DESC"
-	all_flights = pd.DataFrame(db.query(sql))
-	datasets = flight_features.build_flight_datasets(all_flights)
-	return datasets["current"]
+async def get_current_subset():
+	return (await flight_snapshot.get_datasets())["current"]
 
 
 @router.get("/static")
-def get_static_flights(
+async def get_static_flights(
 	origin_code: Optional[str] = None,
 	destination_code: Optional[str] = None,
 	airline_name: Optional[str] = None,
 	limit: Optional[int] = Query(None, ge=1) # 1. Ajout du paramètre optionnel (minimum 1)
 ):
 	# Récupére les callsigns en cours
-	current_rows = get_current_subset()
+	current_rows = await get_current_subset()
 	current_callsigns = {row["callsign"] for row in current_rows if row.get("callsign")}
 
 	if not current_callsigns:
@@ -63,6 +59,6 @@ def get_static_flights(
 		params.append(limit)
 
 	# Exécution
-	rows = db.query(sql, tuple(params))
+	rows = await adb.query(sql, tuple(params), cache=True)
 
 	return {"count": len(rows), "flights": rows}
\ No newline at end of file
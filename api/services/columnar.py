@@ -0,0 +1,57 @@
+import io
+from enum import Enum
+from typing import Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import Query, Request, Response
+from api.core.database import adb
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+class ResponseFormat(str, Enum):
+	json = "json"
+	arrow = "arrow"
+	parquet = "parquet"
+
+COLUMNAR_FORMATS = (ResponseFormat.arrow, ResponseFormat.parquet)
+
+def response_format(request: Request, format: Optional[ResponseFormat] = Query(None)) -> ResponseFormat:
+	"""Négociation : paramètre format= prioritaire, sinon en-tête Accept."""
+	if format is not None:
+		return format
+	accept = request.headers.get("accept", "")
+	if ARROW_STREAM in accept:
+		return ResponseFormat.arrow
+	if PARQUET in accept:
+		return ResponseFormat.parquet
+	return ResponseFormat.json
+
+def is_columnar(fmt) -> bool:
+	# Appel direct d'un endpoint (sans injection FastAPI) : JSON par défaut
+	return fmt in COLUMNAR_FORMATS
+
+def table_from_columns(names: list, rows: list) -> pa.Table:
+	"""Construit la table colonne par colonne à partir des tuples du curseur."""
+	columns = list(zip(*rows)) if rows else [()] * len(names)
+	return pa.Table.from_arrays([pa.array(col) for col in columns], names = names)
+
+def table_from_records(records: list, names: list) -> pa.Table:
+	return pa.Table.from_arrays([pa.array([r.get(name) for r in records]) for name in names], names = names)
+
+def table_response(table: pa.Table, fmt: ResponseFormat, headers: Optional[dict] = None) -> Response:
+	sink = io.BytesIO()
+	if fmt == ResponseFormat.parquet:
+		pq.write_table(table, sink)
+		media_type = PARQUET
+	else:
+		with pa.ipc.new_stream(sink, table.schema) as writer:
+			writer.write_table(table)
+		media_type = ARROW_STREAM
+
+	headers = {"X-Count": str(table.num_rows), **(headers or {})}
+	return Response(content = sink.getvalue(), media_type = media_type, headers = headers)
+
+async def query_response(sql: str, params, fmt: ResponseFormat, headers: Optional[dict] = None, cache: bool = False) -> Response:
+	names, rows = await adb.query_columns(sql, params, cache=cache)
+	return table_response(table_from_columns(names, rows), fmt, headers)
@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 from api.core.config import STALE_THRESHOLD
 
+CURRENT_STATUSES = ["departing", "en route"]
+DAY_SHIFT_HORIZON = pd.Timedelta(hours=6)
+
 def dataframe_to_list_of_dicts(df: pd.DataFrame) -> list:
 	return df.replace({np.nan: None}).where(pd.notna(df), None).to_dict(orient="records")
 
@@ -26,7 +29,7 @@ def build_flight_datasets(all_flights: pd.DataFrame) -> dict:
 	# Recalage J-1 global
 	is_yesterday_flight = (
 		(df["status"].isin(["en route", "arrived"])) & 
-		(df["departure_scheduled_ts"] > now + pd.Timedelta(hours=6))
+		(df["departure_scheduled_ts"] > now + DAY_SHIFT_HORIZON)
 	)
 	
 	cols_scheduled_ts = ["departure_scheduled_ts", "arrival_scheduled_ts"]
@@ -36,8 +39,8 @@ def build_flight_datasets(all_flights: pd.DataFrame) -> dict:
 	# Recalage J-1
 	is_yesterday_actual_too = (
 		is_yesterday_flight & 
-		((df["departure_actual_ts"] > now + pd.Timedelta(hours=6)) | 
-		 (df["arrival_actual_ts"] > now + pd.Timedelta(hours=6)))
+		((df["departure_actual_ts"] > now + DAY_SHIFT_HORIZON) | 
+		 (df["arrival_actual_ts"] > now + DAY_SHIFT_HORIZON))
 	)
 	cols_actual_ts = ["departure_actual_ts", "arrival_actual_ts"]
 	df.loc[is_yesterday_actual_too, cols_actual_ts] -= pd.Timedelta(days=1)
@@ -98,7 +101,7 @@ def build_flight_datasets(all_flights: pd.DataFrame) -> dict:
 
 	# Séparation et nettoyage JSON
 	done = normalized[(normalized["status"] == "arrived") & (normalized["arrival_difference"].notna())].copy()
-	current = normalized[normalized["status"].isin(["departing", "en route"])].copy()
+	current = normalized[normalized["status"].isin(CURRENT_STATUSES)].copy()
 
 	# Filtrage
 	seconds_since_update = (now - current["last_update"]).dt.total_seconds()
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import timezone
+import pandas as pd
+from api.core.config import SNAPSHOT_WATERMARK_OVERLAP, SNAPSHOT_RESYNC_INTERVAL
+from api.core.database import adb
+from api.core.request_context import memoize
+from api.core.singleflight import SingleFlight
+from api.metrics import COALESCED_CALLS
+from api.services import flight_status
+from api.services.flight_features import CURRENT_STATUSES
+
+class FlightSnapshot:
+	"""
+	Vue process-wide du découpage "current"/"done" de flight_dynamic.
+	Construite une seule fois, puis mise à jour par delta sur last_update.
+	"""
+
+	def __init__(self, client = adb):
+		self.client = client
+		self._lock = asyncio.Lock()
+		self._inflight = SingleFlight(on_coalesce=COALESCED_CALLS.labels(operation="snapshot").inc)
+		self.reset()
+
+	def reset(self):
+		self._watermark = None
+		self._last_resync = 0.0
+		# Vols dont la classification dépend encore de l'heure courante : unique_key -> ligne
+		self._open = {}
+		# Vols terminés figés : unique_key -> ligne normalisée
+		self._done = {}
+		self._done_rows = []
+
+	async def _fetch(self) -> list:
+		sql = f"SELECT * FROM {flight_status.FLIGHT_DATASETS_VIEW}"
+
+		if self._watermark is None:
+			sql += " WHERE dataset IS NOT NULL OR status = ANY(%s)"
+			return await self.client.query(sql, (CURRENT_STATUSES,))
+
+		# Delta : lignes modifiées + vols encore ouverts (ex: statut modifié sans last_update)
+		sql += """
+			WHERE unique_key IN (SELECT unique_key FROM flight_dynamic WHERE last_update > %s)
+			   OR unique_key = ANY(%s::text[])
+		"""
+		watermark = (self._watermark - SNAPSHOT_WATERMARK_OVERLAP).replace(tzinfo = timezone.utc)
+		return await self.client.query(sql, (watermark, list(self._open)))
+
+	def _merge(self, rows: list):
+		# Les vols ouverts sont tous relus à chaque delta
+		self._open = {}
+
+		for row in rows:
+			row = dict(row)
+			key = row["unique_key"]
+			dataset = row.pop("dataset")
+			day_adjust_state = row.pop("day_adjust_state")
+			row.pop("suspicious_duration", None)
+
+			if self._done.pop(key, None) is not None:
+				self._done_rows = None
+
+			# Vol en cours (filtre stale) ou recalage J-1 encore possible
+			if row["status"] in CURRENT_STATUSES or (dataset == "done" and day_adjust_state.startswith("shifted_J-1")):
+				self._open[key] = (dataset, row)
+			elif dataset == "done":
+				self._done[key] = row
+				self._done_rows = None
+
+			if row["last_update"] is not None and (self._watermark is None or row["last_update"] > self._watermark):
+				self._watermark = row["last_update"]
+
+	async def datasets(self) -> dict:
+		"""Appels concurrents regroupés sur le même rafraîchissement (résultat partagé, ne pas modifier)."""
+		return await self._inflight.do("datasets", self._refresh)
+
+	async def _refresh(self) -> dict:
+		async with self._lock:
+			# Reconstruction complète périodique (suppressions, corrections manuelles)
+			if self._watermark is not None and time.monotonic() - self._last_resync > SNAPSHOT_RESYNC_INTERVAL.total_seconds():
+				self.reset()
+			if self._watermark is None:
+				self._last_resync = time.monotonic()
+
+			self._merge(await self._fetch())
+
+			current = [row for dataset, row in self._open.values() if dataset == "current"]
+			open_done = [row for dataset, row in self._open.values() if dataset == "done"]
+			return {
+				"done": self._sorted_done(open_done),
+				"current": sorted(current, key = _last_update_key, reverse = True)
+			}
+
+	def _sorted_done(self, open_done: list) -> list:
+		if self._done_rows is None:
+			self._done_rows = sorted(self._done.values(), key = _last_update_key, reverse = True)
+		if not open_done:
+			return self._done_rows
+		return sorted(self._done_rows + open_done, key = _last_update_key, reverse = True)
+
+def _last_update_key(row):
+	return row.get("last_update") if row.get("last_update") is not None else pd.Timestamp.min
+
+snapshot = FlightSnapshot()
+
+async def get_datasets() -> dict:
+	"""Datasets du snapshot, calculés une seule fois par requête HTTP."""
+	return await memoize("flight_datasets", snapshot.datasets)
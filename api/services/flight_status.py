@@ -0,0 +1,48 @@
+from typing import Optional
+from api.core.database import adb
+
+# Équivalent SQL de flight_features.build_flight_datasets, définie dans airflow/config/init_airlines.sql
+FLIGHT_DATASETS_VIEW = "flight_datasets"
+
+FLIGHT_DATASETS_COLUMNS = [
+	"unique_key", "callsign", "icao24", "status",
+	"departure_scheduled_ts", "departure_actual_ts",
+	"arrival_scheduled_ts", "arrival_actual_ts",
+	"departure_difference", "arrival_difference",
+	"last_update"
+]
+
+async def query_flight_datasets(dataset: Optional[str] = None, callsign: Optional[str] = None, limit: Optional[int] = None, client = adb) -> list:
+	"""Classification côté PostgreSQL, filtrée par dataset ("current"/"done") et callsign : seule la tranche demandée est lue."""
+	sql = f"SELECT {', '.join(FLIGHT_DATASETS_COLUMNS)} FROM {FLIGHT_DATASETS_VIEW} WHERE dataset IS NOT NULL"
+	params = []
+
+	if dataset:
+		sql += " AND dataset = %s"
+		params.append(dataset)
+
+	if callsign:
+		sql += " AND callsign = %s"
+		params.append(callsign)
+
+	# Même ordre que le snapshot (last_update inconnu en dernier)
+	sql += " ORDER BY last_update DESC NULLS LAST"
+
+	if limit is not None:
+		sql += " LIMIT %s"
+		params.append(limit)
+
+	return await client.query(sql, tuple(params))
+
+async def query_callsign_datasets(callsign: str, client = adb) -> dict:
+	"""Vols d'un callsign classés côté PostgreSQL, au format du snapshot : {"current": [...], "done": [...]}."""
+	sql = f"""
+		SELECT {', '.join(FLIGHT_DATASETS_COLUMNS)}, dataset
+		FROM {FLIGHT_DATASETS_VIEW}
+		WHERE dataset IS NOT NULL AND callsign = %s
+		ORDER BY last_update DESC NULLS LAST
+	"""
+	datasets = {"current": [], "done": []}
+	for row in await client.query(sql, (callsign,)):
+		datasets[row.pop("dataset")].append(row)
+	return datasets
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Artefact MLflow produit par MLClient.train_and_log_model : un fichier .npy par tableau
+FOREST_ARTIFACT = "forest"
+
+class ForestPredictor:
+	"""
+	Inférence vectorisée d'une forêt exportée par airflow/plugins/forest_export.py :
+	imputation, encodage ordinal puis parcours simultané de tous les arbres en NumPy.
+	Même interface que le modèle pyfunc : predict(DataFrame) -> ndarray.
+	"""
+
+	# Lignes traitées par bloc (borne la mémoire du parcours : lignes x arbres)
+	CHUNK_SIZE = 1024
+
+	def __init__(self, tables):
+		self.numeric_columns = [str(c) for c in tables["numeric_columns"]]
+		self.numeric_fill = np.asarray(tables["numeric_fill"], dtype=np.float64)
+		self.categorical_columns = [str(c) for c in tables["categorical_columns"]]
+		self.categories = [pd.Index(tables[f"categories_{i}"].astype(object)) for i in range(len(self.categorical_columns))]
+		self.unknown_value = float(tables["unknown_value"].item())
+
+		# Tableaux des arbres utilisés tels quels (aucune copie : pages mmap partagées entre workers)
+		self.feature = tables["feature"]
+		self.threshold = tables["threshold"]
+		self.children = tables["children"]
+		self.value = tables["value"]
+		self.roots = np.asarray(tables["roots"])
+		self.max_depth = int(tables["max_depth"].item())
+
+	@classmethod
+	def load(cls, directory: str, mmap: bool = True) -> "ForestPredictor":
+		"""mmap=True : projection en lecture seule, chargement quasi constant et mémoire partagée par le cache de pages."""
+		mode = "r" if mmap else None
+		tables = {
+			name[:-4]: np.load(os.path.join(directory, name), mmap_mode=mode, allow_pickle=False)
+			for name in os.listdir(directory) if name.endswith(".npy")
+		}
+		return cls(tables)
+
+	@property
+	def n_trees(self) -> int:
+		return len(self.roots)
+
+	def transform(self, X: pd.DataFrame) -> np.ndarray:
+		"""Équivalent du ColumnTransformer : colonnes numériques imputées puis catégories encodées."""
+		numeric = X[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+		numeric = np.where(np.isnan(numeric), self.numeric_fill, numeric)
+
+		encoded = np.empty((len(X), len(self.categorical_columns)), dtype=np.float64)
+		for i, (column, categories) in enumerate(zip(self.categorical_columns, self.categories)):
+			values = X[column].to_numpy(dtype=object)
+			codes = categories.get_indexer(values).astype(np.float64)
+			codes[codes < 0] = self.unknown_value
+			codes[pd.isna(values)] = np.nan
+			encoded[:, i] = codes
+
+		# Les arbres sklearn comparent en float32
+		return np.hstack([numeric, encoded]).astype(np.float32)
+
+	def _traverse(self, X: np.ndarray) -> np.ndarray:
+		n_rows, n_features = X.shape
+		flat = X.ravel()
+		# Décalage de chaque ligne dans X aplati, répété pour chaque arbre
+		row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+		nodes = np.tile(self.roots, n_rows)
+		# Les feuilles pointent sur elles-mêmes : max_depth pas suffisent pour tous les arbres
+		for _ in range(self.max_depth):
+			values = flat.take(row_offset + self.feature.take(nodes))
+			go_right = ~(values <= self.threshold.take(nodes))
+			nodes = self.children.take(2 * nodes + go_right)
+		return self.value.take(nodes).reshape(n_rows, self.n_trees).mean(axis=1)
+
+	def predict(self, X: pd.DataFrame) -> np.ndarray:
+		matrix = self.transform(X)
+		if len(matrix) == 0:
+			return np.empty(0, dtype=np.float64)
+		return np.concatenate([
+			self._traverse(matrix[start:start + self.CHUNK_SIZE])
+			for start in range(0, len(matrix), self.CHUNK_SIZE)
+		])
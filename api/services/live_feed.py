@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from api.core.config import LIVE_FEED_POLL_INTERVAL, LIVE_FEED_QUEUE_SIZE
+
+class LiveFeed:
+	"""
+	Diffusion push des positions live : un seul poller lit le delta par run ETL,
+	puis le diff est copié dans la file de chaque abonné (aucune lecture DB par abonné).
+	"""
+
+	def __init__(self, fetch_changes, notifier = None, poll_interval = LIVE_FEED_POLL_INTERVAL, queue_size = LIVE_FEED_QUEUE_SIZE):
+		# fetch_changes(cursor) -> {"next_cursor", "data", "removed", "reset" (optionnel)}
+		self.fetch_changes = fetch_changes
+		# notifier() -> itérateur async de notifications (LISTEN/NOTIFY), optionnel
+		self.notifier = notifier
+		self.poll_interval = poll_interval.total_seconds()
+		self.queue_size = queue_size
+		self._subscribers = set()
+		self._wakeup = asyncio.Event()
+		self._refresh_lock = asyncio.Lock()
+		self._tasks = []
+		# Callbacks appelés à chaque notification d'un run ETL (autres workers de l'API)
+		self.on_notify = []
+		self._generation = 0
+		self.reset()
+
+	def reset(self):
+		# Un refresh en vol lancé avant le reset n'applique pas son delta sur l'état vidé
+		self._generation += 1
+		self.cursor = None
+		# Dernière position connue par vol : unique_key -> ligne
+		self.positions = {}
+
+	@property
+	def subscribers(self) -> int:
+		return len(self._subscribers)
+
+	def snapshot_event(self) -> dict:
+		return {"event": "snapshot", "cursor": self.cursor, "data": list(self.positions.values()), "removed": []}
+
+	def subscribe(self) -> asyncio.Queue:
+		queue = asyncio.Queue(self.queue_size)
+		if self.cursor is not None:
+			queue.put_nowait(self.snapshot_event())
+		else:
+			# Premier abonné : amorçage immédiat de l'état
+			self.notify()
+		self._subscribers.add(queue)
+		return queue
+
+	def unsubscribe(self, queue: asyncio.Queue):
+		self._subscribers.discard(queue)
+		# Plus personne à l'écoute : l'état sera reconstruit au prochain abonné
+		if not self._subscribers:
+			self.reset()
+
+	def notify(self):
+		self._wakeup.set()
+
+	async def refresh(self):
+		"""Lit le delta depuis le curseur (une seule requête) et le diffuse à tous les abonnés."""
+		async with self._refresh_lock:
+			generation = self._generation
+			bootstrap = self.cursor is None
+			changes = await self.fetch_changes(self.cursor)
+			if generation != self._generation:
+				return None
+			if changes.get("reset"):
+				# Curseur oublié par la source : état reconstruit depuis le jeu complet
+				self.positions = {}
+				bootstrap = True
+
+			for key in changes["removed"]:
+				self.positions.pop(key, None)
+			for row in changes["data"]:
+				previous = self.positions.get(row["unique_key"])
+				if previous is None or row["indice"] > previous["indice"]:
+					self.positions[row["unique_key"]] = row
+			self.cursor = changes["next_cursor"]
+
+			if bootstrap:
+				event = self.snapshot_event()
+			elif changes["data"] or changes["removed"]:
+				event = {"event": "diff", "cursor": self.cursor, "data": changes["data"], "removed": changes["removed"]}
+			else:
+				return None
+
+			self.broadcast(event)
+			return event
+
+	def broadcast(self, event: dict):
+		for queue in list(self._subscribers):
+			try:
+				queue.put_nowait(event)
+			except asyncio.QueueFull:
+				# Abonné trop lent : file vidée puis resynchronisation par snapshot
+				while not queue.empty():
+					queue.get_nowait()
+				queue.put_nowait(self.snapshot_event())
+
+	async def run(self):
+		"""Poller unique : réveillé par notify() ou à intervalle fixe, inactif sans abonné."""
+		while True:
+			try:
+				await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+			except asyncio.TimeoutError:
+				pass
+			self._wakeup.clear()
+
+			if not self._subscribers:
+				continue
+			try:
+				await self.refresh()
+			except Exception as e:
+				logging.error(f"Live feed refresh failed: {e}")
+
+	async def listen(self):
+		"""Relaie les notifications (NOTIFY du DAG etl) vers le poller, avec reconnexion."""
+		while True:
+			try:
+				async for _ in self.notifier():
+					self.notify()
+					for callback in self.on_notify:
+						callback()
+			except Exception as e:
+				logging.warning(f"Live feed notifications lost: {e}")
+			await asyncio.sleep(self.poll_interval)
+
+	def start(self):
+		self._tasks = [asyncio.create_task(self.run())]
+		if self.notifier is not None:
+			self._tasks.append(asyncio.create_task(self.listen()))
+
+	async def stop(self):
+		for task in self._tasks:
+			task.cancel()
+		await asyncio.gather(*self._tasks, return_exceptions = True)
+		self._tasks = []
@@ -0,0 +1,58 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from api.core.config import SHADOW_MAX_PENDING
+from api.metrics import PREDICTION_COUNT, PREDICTION_OUTPUTS, PREDICTION_LATENCY, SHADOW_DROPPED, observe_many
+
+class ShadowScorer:
+	"""
+	Scoring fantôme (challenger) sur un thread dédié, hors du chemin de la réponse.
+	Le lot est abandonné si le thread a déjà max_pending lots en attente : la production n'attend jamais.
+	"""
+
+	def __init__(self, alias = "challenger", max_pending = SHADOW_MAX_PENDING):
+		self.alias = alias
+		self._slots = threading.BoundedSemaphore(max_pending)
+		self._executor = None
+
+	def start(self):
+		self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"shadow-{self.alias}", initializer=_lower_priority)
+
+	def stop(self):
+		if self._executor is not None:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
+
+	def submit(self, model, model_version: str, X):
+		"""Retourne immédiatement ; None si non soumis (pas de challenger, arrêté ou saturé)."""
+		if model is None or self._executor is None:
+			return None
+		if not self._slots.acquire(blocking=False):
+			SHADOW_DROPPED.labels(model_alias=self.alias).inc()
+			return None
+		future = self._executor.submit(self._score, model, model_version, X)
+		future.add_done_callback(lambda _: self._slots.release())
+		return future
+
+	def _score(self, model, model_version: str, X):
+		try:
+			start = time.perf_counter()
+			preds = np.asarray(model.predict(X))
+			PREDICTION_LATENCY.labels(model_alias=self.alias).observe(time.perf_counter() - start)
+		except Exception as e:
+			logging.warning(f"Shadow scoring ({self.alias}) failed: {e}")
+			return None
+
+		PREDICTION_COUNT.labels(model_alias=self.alias, model_version=model_version).inc()
+		observe_many(PREDICTION_OUTPUTS.labels(model_alias=self.alias), preds)
+		return preds
+
+def _lower_priority():
+	"""Thread fantôme ordonnancé après les threads de production (Linux : priorité par thread)."""
+	try:
+		os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+	except (AttributeError, OSError):
+		pass
@@ -1,13 +1,33 @@
+import io
+import json
+import asyncio
+import threading
+from types import SimpleNamespace
 import pytest
+import pyarrow as pa
 import pandas as pd
 import numpy as np
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from api.main import app
 from api.services import flight_features
+from api.services.flight_snapshot import FlightSnapshot
+from api.core.cache import QueryCache
+from api.core.config import PREDICTION_WORKER_LOCK
+from api.core.database import db, adb
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram
+from api.metrics import observe_many
+from api.routers import live, merged, predict
+from api.services.shadow import ShadowScorer
 
 client = TestClient(app)
 
+@pytest.fixture(scope="module", autouse=True)
+def app_lifespan():
+	"""Démarre l'application (pool async) une seule fois pour tout le module"""
+	with client:
+		yield
+
 @pytest.fixture
 def mock_mlflow_model():
 	"""Crée un mock pour le modèle MLflow car le serveur n'existe pas en CI"""
@@ -47,6 +67,29 @@ def test_dynamic_flights_enums(timeline):
 	assert response.status_code == 200
 	assert "data" in response.json()
 
+def test_dynamic_slices_filtered_in_database():
+	"""Tranche live/historique ou callsign : lue dans la vue, sans passer par le snapshot complet"""
+	full = client.get("/dynamic").json()["data"]
+	with patch("api.services.flight_snapshot.snapshot.datasets", AsyncMock(side_effect=AssertionError("snapshot complet"))):
+		live_rows = client.get("/dynamic", params={"timeline": "live"}).json()["data"]
+		done_rows = client.get("/dynamic", params={"timeline": "historical"}).json()["data"]
+		assert client.get("/dynamic", params={"timeline": "historical", "limit": 1}).json()["data"] == done_rows[:1]
+		callsign = full[0]["callsign"] if full else "NONE"
+		by_callsign = client.get("/dynamic", params={"callsign": callsign}).json()["data"]
+		merged_res = client.get(f"/merged/{callsign}")
+
+	# Les deux tranches partitionnent le jeu complet, dans le même ordre
+	order = [r["unique_key"] for r in full]
+	assert sorted(order) == sorted(r["unique_key"] for r in live_rows + done_rows)
+	for rows in (live_rows, done_rows):
+		keys = [r["unique_key"] for r in rows]
+		assert keys == [key for key in order if key in keys]
+	assert by_callsign == [r for r in full if r["callsign"] == callsign]
+	# /merged : mêmes vols que la tranche callsign (404 si le callsign n'a pas de statique)
+	if merged_res.status_code != 404:
+		merged_keys = [f["unique_key"] for f in merged_res.json()["history"] + merged_res.json()["live"]]
+		assert sorted(merged_keys) == sorted(r["unique_key"] for r in by_callsign)
+
 def test_live_projections():
 	"""Vérifie que les endpoints live renvoient les bonnes colonnes"""
 	weather_res = client.get("/live/current/weather?limit=1")
@@ -56,6 +99,206 @@ def test_live_projections():
 		assert "wind_speed" in fields
 		assert "longitude" in fields
 
+def test_live_history_keyset_pagination():
+	"""Vérifie que le curseur sur indice parcourt tout l'historique sans doublon"""
+	full = client.get("/live/history/all").json()
+	seen, cursor = [], None
+	while True:
+		params = {"page_size": 1}
+		if cursor is not None:
+			params["after"] = cursor
+		page = client.get("/live/history/all", params=params).json()
+		seen.extend(row["indice"] for row in page["data"])
+		cursor = page["next_cursor"]
+		if cursor is None:
+			break
+	assert seen == sorted(seen)
+	assert sorted(seen) == sorted(row["indice"] for row in full["data"])
+
+def test_live_history_ndjson_stream():
+	"""Vérifie le mode streaming NDJSON (curseur côté serveur)"""
+	full = client.get("/live/history/all").json()
+	response = client.get("/live/history/all?stream=true")
+	assert response.status_code == 200
+	assert response.headers["content-type"].startswith("application/x-ndjson")
+	lines = [json.loads(line) for line in response.text.splitlines() if line]
+	assert len(lines) == full["count"]
+	assert [row["indice"] for row in lines] == sorted(row["indice"] for row in full["data"])
+
+@pytest.mark.parametrize("endpoint", ["/live/current/all", "/live/current/position", "/live/history/all", "/dynamic"])
+def test_columnar_formats_match_json(endpoint):
+	"""Vérifie la négociation Arrow (Accept) / Parquet (format=) sur les endpoints de masse"""
+	rows = client.get(endpoint).json()["data"]
+
+	arrow_res = client.get(endpoint, headers={"Accept": "application/vnd.apache.arrow.stream"})
+	assert arrow_res.status_code == 200
+	assert arrow_res.headers["content-type"] == "application/vnd.apache.arrow.stream"
+	table = pa.ipc.open_stream(arrow_res.content).read_all()
+	assert table.num_rows == len(rows)
+
+	parquet_res = client.get(endpoint, params={"format": "parquet"})
+	assert parquet_res.status_code == 200
+	df = pd.read_parquet(io.BytesIO(parquet_res.content))
+	assert len(df) == len(rows)
+	if rows:
+		assert set(rows[0]) == set(df.columns)
+		assert sorted(df["unique_key"]) == sorted(r["unique_key"] for r in rows)
+
+def test_live_history_parquet_pagination():
+	"""Vérifie le curseur en en-tête pour les pages Parquet"""
+	full = client.get("/live/history/all").json()
+	response = client.get("/live/history/all", params={"format": "parquet", "page_size": 1})
+	df = pd.read_parquet(io.BytesIO(response.content))
+	assert len(df) == min(1, full["count"])
+	if full["count"] > 1:
+		assert response.headers["X-Next-Cursor"] == str(df["indice"].iloc[-1])
+
+def test_live_changes_since_cursor():
+	"""Vérifie le delta : jeu complet sans curseur, vide au curseur, vols sortis listés"""
+	current = client.get("/live/current/all").json()["data"]
+	bootstrap = client.get("/live/changes").json()
+	assert sorted(r["indice"] for r in bootstrap["data"]) == sorted(r["indice"] for r in current)
+	assert bootstrap["removed"] == [] and not bootstrap["reset"]
+
+	cursor = bootstrap["next_cursor"]
+	unchanged = client.get("/live/changes", params={"since": cursor}).json()
+	assert unchanged["count"] == 0 and not unchanged["reset"]
+
+	# Curseur inconnu du serveur : jeu complet, le client repart de zéro
+	unknown = client.get("/live/changes", params={"since": cursor + 1000}).json()
+	assert unknown["reset"] and unknown["count"] == len(current)
+
+	if current:
+		latest = max(current, key=lambda r: r["indice"])
+		since = client.get("/live/changes", params={"since": latest["request_id"]}).json()["since"]
+		assert since >= latest["indice"]
+
+	assert client.get("/live/changes", params={"since": "not-a-cursor"}).status_code == 422
+
+def test_live_changes_reports_flight_missing_from_last_run():
+	"""Un vol en cours au curseur mais absent du dernier run est signalé quand il sort du jeu courant"""
+	live_flights = client.get("/dynamic", params={"timeline": "live"}).json()["data"]
+	historical = client.get("/dynamic", params={"timeline": "historical"}).json()["data"]
+	if not historical:
+		return
+
+	# Vol terminé présenté comme en cours : ses lignes live sont dans un run antérieur au dernier
+	ghost = historical[0]
+	with patch.object(live, "get_current_subset", AsyncMock(return_value=live_flights + [ghost])):
+		cursor = client.get("/live/changes").json()["next_cursor"]
+	delta = client.get("/live/changes", params={"since": cursor}).json()
+	assert not delta["reset"]
+	assert delta["removed"] == [ghost["unique_key"]]
+	assert all(r["unique_key"] != ghost["unique_key"] for r in delta["data"])
+
+	# Filtre callsign appliqué aussi aux vols sortis
+	filtered = client.get("/live/changes", params={"since": cursor, "callsign": "NOPE"}).json()
+	assert filtered["removed"] == []
+
+def test_merged_batches_live_data_and_caches_history():
+	"""Une seule requête live_data par appel, l'historique terminé est servi par le cache"""
+	done = client.get("/dynamic?timeline=historical").json()["data"]
+	if not done:
+		pytest.skip("Aucun vol terminé dans les données de test")
+	callsign = done[0]["callsign"]
+	merged.history_cache.clear()
+
+	spy = AsyncMock(side_effect=adb.query)
+	def live_queries():
+		return [c.args for c in spy.call_args_list if "FROM live_data" in c.args[0]]
+
+	with patch.object(merged.adb, "query", spy):
+		first = client.get(f"/merged/{callsign}").json()
+		assert len(live_queries()) == 1
+		spy.reset_mock()
+		second = client.get(f"/merged/{callsign}").json()
+
+	# Second appel : seuls les vols en cours sont relus
+	current_keys = [f["unique_key"] for f in first["live"]]
+	assert [params[1] for _, params in live_queries()] == ([current_keys] if current_keys else [])
+	assert first == second
+	assert len(first["history"]) == len([f for f in done if f["callsign"] == callsign])
+
+# Cache des requêtes
+def cache_metric(name, **labels):
+	return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_query_cache_hits_until_new_etl_run():
+	"""Deuxième appel servi par le cache, puis invalidation au changement de request_id"""
+	client.get("/static", params={"limit": 2})
+	hits, misses = cache_metric("api_query_cache_hits_total"), cache_metric("api_query_cache_misses_total")
+	first = client.get("/static", params={"limit": 2}).json()
+	assert cache_metric("api_query_cache_hits_total") == hits + 1
+	assert cache_metric("api_query_cache_misses_total") == misses
+
+	# Simule l'arrivée d'un nouveau run : la génération relue diffère de celle en cache
+	evicted = cache_metric("api_query_cache_evictions_total", reason="generation")
+	adb.query_cache.generation = "previous-run"
+	adb.expire_generation()
+	assert client.get("/static", params={"limit": 2}).json() == first
+	assert cache_metric("api_query_cache_evictions_total", reason="generation") > evicted
+	assert cache_metric("api_query_cache_misses_total") == misses + 1
+
+def test_async_pool_closed_when_event_loop_changes():
+	"""Pool d'une event loop terminée fermé avant d'être remplacé (TestClient, asyncio.run successifs)"""
+	async def current_pool():
+		await adb.query("SELECT 1")
+		return adb._pool
+
+	try:
+		first = asyncio.run(current_pool())
+		second = asyncio.run(current_pool())
+	finally:
+		asyncio.run(adb.close())
+	assert first is not second
+	assert first.closed and second.closed
+
+def test_query_cache_skips_unbounded_history():
+	"""L'historique complet n'est pas mis en cache, une page bornée l'est"""
+	misses = cache_metric("api_query_cache_misses_total")
+	client.get("/live/history/all")
+	client.get("/live/history/all")
+	assert cache_metric("api_query_cache_misses_total") == misses
+	client.get("/live/history/all", params={"page_size": 2})
+	assert cache_metric("api_query_cache_misses_total") == misses + 1
+
+def test_query_cache_ttl_and_size_limits():
+	"""Les entrées expirent après le TTL et la plus ancienne sort en premier"""
+	evictions = []
+	cache = QueryCache(2, ttl=60, on_evict=lambda reason, count: evictions.append(reason))
+	cache.set("a", [1])
+	cache.set("b", [2])
+	cache.get("a")
+	cache.set("c", [3])
+	assert "b" not in cache and cache.get("a") == [1]
+	assert evictions == ["size"]
+
+	cache.clear()
+	cache.ttl = 0
+	cache.set("d", [4])
+	assert cache.get("d") is None
+	assert evictions == ["size", "ttl"]
+
+def test_observe_many_matches_observe_loop():
+	"""Histogramme vectorisé identique à observe() valeur par valeur (bornes incluses, +Inf, NaN ignorés)"""
+	registry = CollectorRegistry()
+	looped = Histogram("looped", "", ["alias"], buckets=[-15.0, 0.0, 15.0, 30.0], registry=registry)
+	batched = Histogram("batched", "", ["alias"], buckets=[-15.0, 0.0, 15.0, 30.0], registry=registry)
+	fallback = Histogram("fallback", "", ["alias"], buckets=[-15.0, 0.0, 15.0, 30.0], registry=registry)
+	values = np.concatenate([np.random.default_rng(0).normal(10, 20, 5000), [-15.0, 0.0, 30.0, 1e9]])
+
+	for v in values:
+		looped.labels(alias="a").observe(v)
+	observe_many(batched.labels(alias="a"), np.append(values, np.nan))
+	# Internes absents (autre version de prometheus_client) : repli sur observe()
+	observe_many(SimpleNamespace(observe=fallback.labels(alias="a").observe), np.append(values, np.nan))
+
+	for suffix, le in [("_bucket", b) for b in ["-15.0", "0.0", "15.0", "30.0", "+Inf"]] + [("_sum", None), ("_count", None)]:
+		labels = {"alias": "a", **({"le": le} if le else {})}
+		expected = registry.get_sample_value("looped" + suffix, labels)
+		assert registry.get_sample_value("batched" + suffix, labels) == pytest.approx(expected)
+		assert registry.get_sample_value("fallback" + suffix, labels) == pytest.approx(expected)
+
 # Tests de prédiction
 def test_predict_arrival_delay_with_seed_data(mock_mlflow_model):
     """
@@ -76,6 +319,230 @@ def test_predict_arrival_delay_with_seed_data(mock_mlflow_model):
         
         assert isinstance(first_pred["predicted_delay"], (int, float))
 
+def test_predict_reads_stored_predictions(mock_mlflow_model):
+	"""Les prédictions sont enregistrées par version de modèle puis relues sans inférence"""
+	try:
+		with patch("api.routers.predict.get_model", return_value=mock_mlflow_model), \
+			 patch("api.routers.predict.current_model_version", "test-v1"):
+			first = client.get("/prediction/arrival_delay").json()
+			calls = mock_mlflow_model.predict.call_count
+			second = client.get("/prediction/arrival_delay").json()
+			assert mock_mlflow_model.predict.call_count == calls
+			assert second == first
+
+		# Nouvelle version : scoring à la demande
+		with patch("api.routers.predict.get_model", return_value=mock_mlflow_model), \
+			 patch("api.routers.predict.current_model_version", "test-v2"):
+			client.get("/prediction/arrival_delay")
+			assert mock_mlflow_model.predict.call_count == calls + 1
+
+		stored = db.query("SELECT model_version, count(*) AS n FROM live_predictions WHERE model_version LIKE 'test-%%' GROUP BY 1")
+		assert {row["model_version"]: row["n"] for row in stored} == {"test-v1": first["count"], "test-v2": first["count"]}
+	finally:
+		db.execute("DELETE FROM live_predictions WHERE model_version LIKE 'test-%%'")
+
+def test_prediction_worker_scores_only_with_advisory_lock(mock_mlflow_model):
+	"""Un autre worker de l'API détient le verrou : ce run est sauté, puis scoré une fois le verrou libéré"""
+	worker = predict.PredictionWorker()
+	idle_in_transaction = []
+	predict_current = predict.predict_current
+
+	async def observed_predict_current(*args):
+		# Verrou tenu hors pool : aucune connexion laissée ouverte en transaction pendant le scoring
+		rows = await adb.query("SELECT count(*) AS n FROM pg_stat_activity WHERE datname = current_database() AND state = 'idle in transaction'")
+		idle_in_transaction.append(rows[0]["n"])
+		return await predict_current(*args)
+
+	async def scenario(other_worker):
+		try:
+			await asyncio.to_thread(db_lock, other_worker, "pg_advisory_lock")
+			skipped = await worker.score()
+			calls = mock_mlflow_model.predict.call_count
+			await asyncio.to_thread(db_lock, other_worker, "pg_advisory_unlock")
+			return skipped, calls, await worker.score(), await worker.score()
+		finally:
+			await adb.close()
+
+	def db_lock(conn, function):
+		with conn.cursor() as cur:
+			cur.execute(f"SELECT {function}(%s)", (PREDICTION_WORKER_LOCK,))
+		conn.commit()
+
+	try:
+		with patch("api.routers.predict.get_model", return_value=mock_mlflow_model), \
+			 patch("api.routers.predict.current_model_version", "test-lock"), \
+			 patch("api.routers.predict.predict_current", observed_predict_current), \
+			 db.get_connection() as other_worker:
+			skipped, calls, scored, rescored = asyncio.run(scenario(other_worker))
+	finally:
+		db.execute("DELETE FROM live_predictions WHERE model_version = 'test-lock'")
+
+	assert skipped == 0 and calls == 0
+	assert scored > 0 and rescored == scored
+	assert idle_in_transaction == [0, 0]
+	# Second passage : tout est déjà en table, aucune inférence
+	assert mock_mlflow_model.predict.call_count == 1
+
+def test_predict_latest_mode_scores_one_position_per_flight(mock_mlflow_model):
+	"""mode=latest : une prédiction par vol en cours, sur sa dernière position"""
+	with patch("api.routers.predict.get_model", return_value=mock_mlflow_model):
+		full = client.get("/prediction/arrival_delay").json()
+		mock_mlflow_model.predict.reset_mock()
+		latest = client.get("/prediction/arrival_delay", params={"mode": "latest"}).json()
+
+	expected = db.query("""
+		SELECT unique_key, max(indice) AS indice
+		FROM live_data
+		WHERE indice = ANY(%s::int[])
+		GROUP BY unique_key
+	""", ([p["indice"] for p in full["predictions"]],))
+	assert latest["mode"] == "latest" and full["mode"] == "full"
+	assert {(p["unique_key"], p["indice"]) for p in latest["predictions"]} == {(r["unique_key"], r["indice"]) for r in expected}
+	assert latest["count"] < full["count"]
+	# Aucune ligne à scorer : version inconnue, donc inférence sur les seules dernières positions
+	assert len(mock_mlflow_model.predict.call_args.args[0]) == latest["count"]
+
+def test_predict_scans_flight_dynamic_once(mock_mlflow_model):
+	"""Les helpers live et dynamic partagent le même snapshot au sein d'une requête"""
+	spy = AsyncMock(side_effect=adb.query)
+	with patch("api.routers.predict.get_model", return_value=mock_mlflow_model), patch.object(adb, "query", spy):
+		response = client.get("/prediction/arrival_delay")
+
+	assert response.status_code == 200
+	scans = [c for c in spy.call_args_list if "flight_datasets" in c.args[0] or "flight_dynamic" in c.args[0]]
+	assert len(scans) == 1
+
+def test_model_refresh_swaps_new_version_in_background(mock_mlflow_model):
+	"""Nouvelle version chargée hors requête et remplacée d'un bloc ; un échec conserve l'ancienne"""
+	def reloads(outcome):
+		return REGISTRY.get_sample_value("api_model_reload_duration_seconds_count", {"model_alias": "production", "outcome": outcome}) or 0.0
+
+	success, failure = reloads("success"), reloads("failure")
+	with patch.object(predict, "cached_model", None), patch.object(predict, "current_model_version", "unknown"):
+		with patch.object(predict, "resolve_production_version", return_value="7"), \
+			 patch.object(predict, "load_model_version", return_value=mock_mlflow_model) as load:
+			assert asyncio.run(predict.refresh_model())
+			assert predict.get_model() is mock_mlflow_model and predict.current_model_version == "v7"
+			# Même version : aucun rechargement
+			assert not asyncio.run(predict.refresh_model())
+			assert load.call_count == 1
+
+		with patch.object(predict, "resolve_production_version", side_effect=RuntimeError("MLflow down")):
+			assert not asyncio.run(predict.refresh_model())
+			assert predict.get_model() is mock_mlflow_model and predict.current_model_version == "v7"
+
+	assert reloads("success") == success + 1
+	assert reloads("failure") == failure + 1
+	assert REGISTRY.get_sample_value("api_model_load_status", {"model_alias": "production"}) == 1.0
+
+def test_shadow_challenger_scores_same_batch_off_response_path(mock_mlflow_model):
+	"""Le challenger reçoit le même lot que la production, sur le thread fantôme"""
+	challenger = MagicMock()
+	challenger.predict.side_effect = lambda X: np.zeros(len(X))
+	with patch("api.routers.predict.get_model", return_value=mock_mlflow_model), \
+		 patch.object(predict, "challenger_model", challenger), patch.object(predict, "challenger_version", "v-challenger"):
+		response = client.get("/prediction/arrival_delay")
+		# File du thread fantôme vidée (un seul worker, ordre FIFO)
+		predict.shadow_scorer._executor.submit(lambda: None).result()
+
+	assert response.status_code == 200
+	production_X = mock_mlflow_model.predict.call_args.args[0]
+	assert challenger.predict.call_args.args[0] is production_X
+	assert REGISTRY.get_sample_value("api_predictions_total", {"model_alias": "challenger", "model_version": "v-challenger"}) >= 1
+
+def test_shadow_scorer_drops_batches_when_saturated():
+	"""Challenger lent : les lots en excès sont abandonnés au lieu d'être mis en file"""
+	def dropped():
+		return REGISTRY.get_sample_value("api_shadow_dropped_total", {"model_alias": "test-shadow"}) or 0.0
+
+	release = threading.Event()
+	slow = MagicMock()
+	slow.predict.side_effect = lambda X: release.wait(5) and np.ones(len(X))
+	scorer = ShadowScorer(alias="test-shadow", max_pending=1)
+	scorer.start()
+	try:
+		first = scorer.submit(slow, "v1", pd.DataFrame({"x": [1.0, 2.0]}))
+		assert scorer.submit(slow, "v1", pd.DataFrame({"x": [3.0]})) is None
+		assert dropped() == 1
+		release.set()
+		assert list(first.result(5)) == [1.0, 1.0]
+		assert scorer.submit(None, "v1", pd.DataFrame({"x": [1.0]})) is None
+	finally:
+		scorer.stop()
+	assert REGISTRY.get_sample_value("api_prediction_latency_seconds_count", {"model_alias": "test-shadow"}) == 1
+
+def batch_payload(n):
+	return {
+		"callsign": ["AFR123"] * n, "icao24": ["39856a"] * n,
+		"longitude": list(np.linspace(-5, 8, n)), "latitude": [48.0] * n,
+		"geo_altitude": [10000] * n, "velocity": [230.5] * (n - 1) + [None],
+		"global_condition": ["clear"] * n, "departure_difference": [12.0] * n
+	}
+
+def test_predict_batch_json_and_arrow(mock_mlflow_model):
+	"""Lot colonne par colonne (JSON ou Arrow) : une prédiction par ligne, dans l'ordre"""
+	payload = batch_payload(1000)
+	sink = io.BytesIO()
+	table = pa.table(payload)
+	with pa.ipc.new_stream(sink, table.schema) as writer:
+		writer.write_table(table)
+
+	with patch("api.routers.predict.get_model", return_value=mock_mlflow_model):
+		as_json = client.post("/prediction/batch", json=payload)
+		as_arrow = client.post(
+			"/prediction/batch", content=sink.getvalue(),
+			headers={"Content-Type": "application/vnd.apache.arrow.stream", "Accept": "application/vnd.apache.arrow.stream"}
+		)
+
+	assert as_json.status_code == 200 and as_json.json()["count"] == 1000
+	assert len(as_json.json()["predictions"]) == 1000
+	result = pa.ipc.open_stream(as_arrow.content).read_all()
+	assert result.column_names == ["predicted_delay"] and result.num_rows == 1000
+
+	X = mock_mlflow_model.predict.call_args_list[0].args[0]
+	assert list(X.columns) == predict.FEATURES
+	assert X["velocity"].dtype == np.float64 and X["velocity"].iloc[-1] == 0
+	assert X["longitude"].iloc[-1] == 8
+
+def test_predict_batch_rejects_invalid_columns(mock_mlflow_model):
+	"""Validation par colonne : absente, longueurs différentes, mauvais type"""
+	missing = batch_payload(3)
+	del missing["velocity"]
+	uneven = {**batch_payload(3), "latitude": [48.0]}
+	wrong_type = {**batch_payload(3), "velocity": ["fast", "fast", "fast"]}
+
+	with patch("api.routers.predict.get_model", return_value=mock_mlflow_model):
+		for payload, detail in [(missing, "manquantes"), (uneven, "longueurs"), (wrong_type, "velocity")]:
+			response = client.post("/prediction/batch", json=payload)
+			assert response.status_code == 422 and detail in response.json()["detail"]
+	mock_mlflow_model.predict.assert_not_called()
+
+def test_predict_batch_rejects_oversized_before_decoding(mock_mlflow_model):
+	"""Lot trop gros refusé en 413 avant décodage : Content-Length, puis nombre de lignes avant conversion pandas"""
+	sink = io.BytesIO()
+	table = pa.table(batch_payload(10))
+	with pa.ipc.new_stream(sink, table.schema) as writer:
+		for batch in table.to_batches(max_chunksize=4):
+			writer.write_batch(batch)
+	arrow = {"Content-Type": "application/vnd.apache.arrow.stream"}
+
+	with patch("api.routers.predict.get_model", return_value=mock_mlflow_model), \
+		 patch("api.routers.predict.PREDICTION_BATCH_MAX_ROWS", 5), \
+		 patch("api.routers.predict.PREDICTION_BATCH_MAX_BYTES", len(sink.getvalue()) - 1):
+		with patch("api.routers.predict.batch_columns") as decode:
+			oversized = client.post("/prediction/batch", content=sink.getvalue(), headers=arrow)
+		decode.assert_not_called()
+		assert oversized.status_code == 413 and "octets" in oversized.json()["detail"]
+
+		with patch("api.routers.predict.PREDICTION_BATCH_MAX_BYTES", 1 << 20), \
+			 patch("api.routers.predict.batch_frame") as frame:
+			too_many = client.post("/prediction/batch", content=sink.getvalue(), headers=arrow)
+			as_json = client.post("/prediction/batch", json=batch_payload(10))
+		frame.assert_not_called()
+		assert too_many.status_code == 413 and "5 lignes" in too_many.json()["detail"]
+		assert as_json.status_code == 413 and "5 lignes" in as_json.json()["detail"]
+	mock_mlflow_model.predict.assert_not_called()
+
 def test_predict_503_when_no_model():
 	"""Vérifie que l'API prévient si MLflow est inaccessible"""
 	with patch("api.routers.predict.get_model", return_value=None):
@@ -124,4 +591,68 @@ def test_stale_data_filtering():
 
 	datasets = flight_features.build_flight_datasets(test_data)
 	current_calls = [f["callsign"] for f in datasets["current"]]
-	assert "GHOST" not in current_calls
\ No newline at end of file
+	assert "GHOST" not in current_calls
+
+# Test du snapshot incrémental
+def test_flight_snapshot_incremental_refresh():
+	"""Vérifie que le snapshot ne relit que le delta et fige les vols terminés"""
+	now = pd.Timestamp.utcnow().replace(tzinfo=None).to_pydatetime()
+	def view_row(key, status, dataset, arrival_difference, last_update, day_adjust_state="initial"):
+		return {
+			"unique_key": key, "callsign": key[:6], "icao24": "ABC123", "status": status,
+			"departure_scheduled_ts": None, "departure_actual_ts": None,
+			"arrival_scheduled_ts": None, "arrival_actual_ts": None,
+			"departure_difference": 5.0, "arrival_difference": arrival_difference,
+			"last_update": last_update, "day_adjust_state": day_adjust_state,
+			"suspicious_duration": False, "dataset": dataset
+		}
+
+	done_row = view_row("DONE-1", "arrived", "done", 10.0, now - pd.Timedelta(days=1))
+	live_row = view_row("LIVE-1", "en route", "current", None, now - pd.Timedelta(minutes=1))
+	landed_row = view_row("LIVE-1", "arrived", "done", 20.0, now)
+
+	fake_db = AsyncMock()
+	fake_db.query.side_effect = [[done_row, live_row], [live_row], [landed_row], []]
+	snapshot = FlightSnapshot(client=fake_db)
+
+	first = asyncio.run(snapshot.datasets())
+	assert [f["unique_key"] for f in first["done"]] == ["DONE-1"]
+	assert [f["unique_key"] for f in first["current"]] == ["LIVE-1"]
+	assert "dataset" not in first["current"][0]
+
+	# Delta : seuls les vols ouverts et les lignes après le watermark sont relus
+	second = asyncio.run(snapshot.datasets())
+	sql, params = fake_db.query.call_args_list[1].args
+	assert "last_update >" in sql
+	assert params[1] == ["LIVE-1"]
+	assert [f["unique_key"] for f in second["current"]] == ["LIVE-1"]
+
+	# Atterrissage : le vol passe de current à done
+	third = asyncio.run(snapshot.datasets())
+	assert third["current"] == []
+	assert [f["unique_key"] for f in third["done"]] == ["LIVE-1", "DONE-1"]
+
+	# Plus aucun vol ouvert : le delta ne relit plus aucune clé
+	fourth = asyncio.run(snapshot.datasets())
+	assert fake_db.query.call_args_list[3].args[1][1] == []
+	assert [f["unique_key"] for f in fourth["done"]] == ["LIVE-1", "DONE-1"]
+
+# Test du regroupement des rafraîchissements concurrents
+def test_flight_snapshot_coalesces_concurrent_refreshes():
+	"""Des appels simultanés partagent un seul rafraîchissement du snapshot"""
+	async def slow_query(sql, params=None):
+		await asyncio.sleep(0.05)
+		return []
+
+	fake_db = AsyncMock()
+	fake_db.query.side_effect = slow_query
+	snapshot = FlightSnapshot(client=fake_db)
+	coalesced = REGISTRY.get_sample_value("api_coalesced_calls_total", {"operation": "snapshot"}) or 0.0
+
+	async def burst():
+		return await asyncio.gather(*(snapshot.datasets() for _ in range(50)))
+
+	results = asyncio.run(burst())
+	assert fake_db.query.await_count == 1
+	assert all(result is results[0] for result in results)
+	assert REGISTRY.get_sample_value("api_coalesced_calls_total", {"operation": "snapshot"}) == coalesced + 49
@@ -0,0 +1,85 @@
+import os
+import sys
+import uuid
+import pytest
+from api.core.database import db
+
+# Chargement en masse des plugins Airflow (module sans dépendance Airflow)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "airflow", "plugins"))
+from bulk_loader import BulkLoader, FLIGHT_STATIC, FLIGHT_DYNAMIC, LIVE_DATA
+
+def dynamic(key, status, departure_actual=None, arrival_actual=None):
+	return {"callsign": "BLK001", "icao24": "blk001", "flight_date": "2026-01-12", "departure_scheduled": "10:00:00",
+			"departure_actual": departure_actual, "arrival_scheduled": "12:00:00", "arrival_actual": arrival_actual,
+			"status": status, "unique_key": key}
+
+def live(key, longitude):
+	return {"request_id": str(uuid.uuid4()), "callsign": "BLK001", "icao24": "blk001", "flight_date": "2026-01-12",
+			"departure_scheduled": "10:00:00", "longitude": longitude, "latitude": 48.0, "on_ground": False,
+			"global_condition": "Clear\tsky", "unique_key": key}
+
+@pytest.fixture
+def conn():
+	with db.get_connection() as conn:
+		yield conn
+		conn.rollback()
+		with conn.cursor() as cur:
+			cur.execute("DELETE FROM live_data WHERE callsign = 'BLK001'")
+			cur.execute("DELETE FROM flight_dynamic WHERE callsign = 'BLK001'")
+			cur.execute("DELETE FROM flight_static WHERE callsign LIKE 'BLK%'")
+		conn.commit()
+
+def fetch(conn, sql, params=None):
+	with conn.cursor() as cur:
+		cur.execute(sql, params)
+		rows = cur.fetchall()
+	conn.commit()
+	return rows
+
+def test_bulk_loader_collapses_duplicate_keys_in_batch(conn):
+	"""Plusieurs lignes d'une même clé dans un lot : fusion dans l'ordre, sans perte de champ"""
+	loader = BulkLoader(conn)
+	loaded = loader.load(FLIGHT_STATIC, [
+		{"callsign": "BLK001", "airline_name": "Air Bulk", "origin_code": "CDG", "destination_code": None, "commercial_flight": True},
+		{"callsign": "BLK002", "airline_name": "Air Bulk", "origin_code": "ORY", "destination_code": "NCE", "commercial_flight": True},
+		{"callsign": "BLK001", "airline_name": "Unknown Airline", "origin_code": None, "destination_code": "JFK", "commercial_flight": False},
+	])
+	assert loaded == 3
+	assert fetch(conn, "SELECT * FROM flight_static WHERE callsign LIKE 'BLK%' ORDER BY callsign") == [
+		("BLK001", "Air Bulk", "CDG", "JFK", True),
+		("BLK002", "Air Bulk", "ORY", "NCE", True),
+	]
+
+	loader.load(FLIGHT_DYNAMIC, [dynamic("BLK001_1", "departing", departure_actual="10:05:00"), dynamic("BLK001_1", "en route")])
+	assert fetch(conn, "SELECT status, departure_actual::text FROM flight_dynamic WHERE unique_key = 'BLK001_1'") == [("en route", "10:05:00")]
+
+def test_bulk_loader_upserts_existing_rows(conn):
+	"""Un second run met à jour les lignes existantes sans effacer les champs déjà connus"""
+	loader = BulkLoader(conn)
+	loader.load(FLIGHT_STATIC, [{"callsign": "BLK001", "airline_name": "Air Bulk", "origin_code": "CDG", "destination_code": "JFK", "commercial_flight": True}])
+	loader.load(FLIGHT_DYNAMIC, [dynamic("BLK001_1", "en route", departure_actual="10:05:00")])
+
+	assert loader.load(FLIGHT_STATIC, [{"callsign": "BLK001", "airline_name": "Unknown Airline", "origin_code": None, "destination_code": "LHR", "commercial_flight": True}]) == 1
+	assert loader.load(FLIGHT_DYNAMIC, [dynamic("BLK001_1", "arrived", arrival_actual="12:10:00")]) == 1
+
+	assert fetch(conn, "SELECT airline_name, origin_code, destination_code FROM flight_static WHERE callsign = 'BLK001'") == [("Air Bulk", "CDG", "LHR")]
+	assert fetch(conn, "SELECT count(*), max(status), max(departure_actual::text), max(arrival_actual::text) FROM flight_dynamic WHERE callsign = 'BLK001'") == [(1, "arrived", "10:05:00", "12:10:00")]
+
+def test_bulk_loader_drops_only_rows_violating_constraints(conn):
+	"""Lignes live sans vol dynamique (clé étrangère) écartées seules, le reste du lot est chargé"""
+	loader = BulkLoader(conn, batch_size=4)
+	loader.load(FLIGHT_DYNAMIC, [dynamic("BLK001_1", "en route")])
+
+	rows = [live("BLK001_1", float(i)) for i in range(10)]
+	rows[3]["unique_key"] = rows[8]["unique_key"] = "BLK001_missing"
+	assert loader.load(LIVE_DATA, rows) == 8
+
+	stored = fetch(conn, "SELECT longitude, global_condition FROM live_data WHERE callsign = 'BLK001' ORDER BY indice")
+	assert [row[0] for row in stored] == [0.0, 1.0, 2.0, 4.0, 5.0, 6.0, 7.0, 9.0]
+	assert stored[0][1] == "Clear\tsky"
+
+def test_bulk_loader_empty_batch(conn):
+	"""Lot vide : aucune requête, zéro ligne chargée"""
+	loader = BulkLoader(conn)
+	assert loader.load(LIVE_DATA, []) == 0
+	assert loader._stages == set()
@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from psycopg2.extras import RealDictCursor
+from api.core.database import db, adb
+from api.services import flight_features, flight_status
+
+# Parité entre la classification SQL (vue flight_datasets) et build_flight_datasets
+
+NOW = pd.Timestamp.utcnow().replace(tzinfo=None).floor("s")
+
+def day(offset_days=0):
+	return (NOW + pd.Timedelta(days=offset_days)).strftime("%Y-%m-%d")
+
+def clock(offset_minutes=0):
+	return (NOW + pd.Timedelta(minutes=offset_minutes)).strftime("%H:%M:%S")
+
+def flight(key, flight_date, dep_sched, dep_act, arr_sched, arr_act, status, last_update):
+	return {
+		"unique_key": key, "callsign": key[:10], "icao24": "PAR001",
+		"flight_date": flight_date,
+		"departure_scheduled": dep_sched, "departure_actual": dep_act,
+		"arrival_scheduled": arr_sched, "arrival_actual": arr_act,
+		"status": status, "last_update": last_update
+	}
+
+RECENT = (NOW - pd.Timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S+00")
+OLD = (NOW - pd.Timedelta(hours=10)).strftime("%Y-%m-%d %H:%M:%S+00")
+
+CASES = [
+	# Vol terminé classique
+	flight("P-ARRIVED", "2026-01-10", "10:00:00", "10:20:00", "11:30:00", "11:45:00", "arrived", OLD),
+	# Passage de minuit (départ réel et arrivées J+1)
+	flight("P-WRAP", "2026-01-13", "23:50:00", "00:10:00", "01:00:00", "01:15:00", "arrived", OLD),
+	# Arrivée prévue après minuit uniquement
+	flight("P-ARRSCHED", "2026-01-11", "23:30:00", "23:55:00", "00:45:00", "01:10:00", "arrived", OLD),
+	# Durée suspecte (arrivée avant le départ réel recalé)
+	flight("P-SUSPECT", "2026-01-12", "23:00:00", "01:00:00", "02:00:00", "00:30:00", "arrived", OLD),
+	# Vol terminé sans heure d'arrivée réelle
+	flight("P-NOARR", "2026-01-12", "08:00:00", "08:10:00", "09:00:00", None, "arrived", OLD),
+	# Recalage J-1 global (date du lendemain)
+	flight("P-J1", day(1), clock(), clock(10), clock(90), None, "en route", RECENT),
+	# Recalage J-1 avec heures réelles dans le futur
+	flight("P-J1ACT", day(1), clock(-120), clock(-110), clock(-30), clock(-20), "arrived", RECENT),
+	# Vol en cours récent
+	flight("P-LIVE", day(), clock(-60), clock(-55), clock(60), None, "en route", RECENT),
+	# Vol au départ sans heure réelle
+	flight("P-DEPART", day(), clock(-10), None, clock(80), None, "departing", RECENT),
+	# Vol en cours sans arrivée prévue
+	flight("P-NOSCHED", day(), clock(-60), clock(-55), None, None, "en route", OLD),
+	# Vol obsolète (filtré)
+	flight("P-STALE", "2026-01-13", "10:00:00", "10:05:00", "11:00:00", None, "en route", OLD),
+	# Statut hors périmètre
+	flight("P-OTHER", day(), clock(-60), None, clock(60), None, "scheduled", RECENT),
+]
+
+@pytest.fixture
+def parity_connection():
+	"""Insère les cas de test dans une transaction annulée en fin de test"""
+	with db.get_connection() as conn:
+		try:
+			with conn.cursor() as cur:
+				for row in CASES:
+					cur.execute(
+						"INSERT INTO flight_static (callsign) VALUES (%s) ON CONFLICT DO NOTHING",
+						(row["callsign"],)
+					)
+					cur.execute("""
+						INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, departure_actual,
+												   arrival_scheduled, arrival_actual, status, last_update, unique_key)
+						VALUES (%(callsign)s, %(icao24)s, %(flight_date)s, %(departure_scheduled)s, %(departure_actual)s,
+								%(arrival_scheduled)s, %(arrival_actual)s, %(status)s, %(last_update)s, %(unique_key)s)
+					""", row)
+			yield conn
+		finally:
+			conn.rollback()
+
+def fetch(conn, sql, params=None):
+	with conn.cursor(cursor_factory=RealDictCursor) as cur:
+		cur.execute(sql, params or ())
+		return cur.fetchall()
+
+def sql_datasets(conn, keys=None):
+	sql = f"SELECT * FROM {flight_status.FLIGHT_DATASETS_VIEW} WHERE dataset IS NOT NULL"
+	params = ()
+	if keys is not None:
+		sql += " AND unique_key = ANY(%s)"
+		params = (keys,)
+	rows = fetch(conn, sql, params)
+	return {
+		name: {r["unique_key"]: r for r in rows if r["dataset"] == name}
+		for name in ("done", "current")
+	}
+
+def pandas_datasets(conn, keys=None):
+	sql = "SELECT * FROM flight_dynamic"
+	params = ()
+	if keys is not None:
+		sql += " WHERE unique_key = ANY(%s)"
+		params = (keys,)
+	rows = fetch(conn, sql, params)
+	if not rows:
+		return {"done": {}, "current": {}}
+	datasets = flight_features.build_flight_datasets(pd.DataFrame(rows))
+	return {name: {r["unique_key"]: r for r in datasets[name]} for name in ("done", "current")}
+
+def normalize(value):
+	if value is None or (isinstance(value, float) and np.isnan(value)):
+		return None
+	if isinstance(value, datetime):
+		return pd.Timestamp(value)
+	if isinstance(value, float):
+		return round(value, 6)
+	return value
+
+def assert_same_datasets(expected, actual):
+	for name in ("done", "current"):
+		assert set(actual[name]) == set(expected[name]), name
+		for key, row in expected[name].items():
+			for col in flight_status.FLIGHT_DATASETS_COLUMNS:
+				assert normalize(actual[name][key][col]) == normalize(row[col]), (name, key, col)
+
+def test_view_matches_pandas_on_edge_cases(parity_connection):
+	"""Chaque règle de recalage donne le même résultat en SQL et en pandas"""
+	keys = [row["unique_key"] for row in CASES]
+	expected = pandas_datasets(parity_connection, keys)
+	actual = sql_datasets(parity_connection, keys)
+	assert_same_datasets(expected, actual)
+
+	# Sanity check : les cas couvrent bien les deux jeux et le filtre stale
+	assert {"P-ARRIVED", "P-WRAP", "P-ARRSCHED", "P-SUSPECT", "P-J1ACT"} <= set(actual["done"])
+	assert {"P-J1", "P-LIVE", "P-DEPART", "P-NOSCHED"} <= set(actual["current"])
+	assert "P-STALE" not in actual["current"]
+
+def test_view_matches_pandas_on_whole_table(parity_connection):
+	"""Parité sur l'ensemble de la table (seed + cas de test)"""
+	assert_same_datasets(pandas_datasets(parity_connection), sql_datasets(parity_connection))
+
+def test_view_flags_day_shifts(parity_connection):
+	"""Les recalages et la durée suspecte sont exposés par la vue"""
+	rows = {
+		r["unique_key"]: r
+		for r in fetch(parity_connection, f"SELECT * FROM {flight_status.FLIGHT_DATASETS_VIEW} WHERE unique_key LIKE 'P-%%'")
+	}
+	assert rows["P-J1"]["day_adjust_state"].startswith("shifted_J-1_global")
+	assert rows["P-J1ACT"]["day_adjust_state"].startswith("shifted_J-1_global (scheduled+actual)")
+	assert rows["P-WRAP"]["day_adjust_state"] == "shifted_J+1_departure_actual"
+	assert rows["P-SUSPECT"]["suspicious_duration"]
+	assert rows["P-SUSPECT"]["day_adjust_state"].endswith("[SUSPICIOUS_DURATION]")
+	assert rows["P-OTHER"]["dataset"] is None
+
+def run(coro):
+	"""Exécute une coroutine du client async puis ferme son pool"""
+	async def main():
+		try:
+			return await coro
+		finally:
+			await adb.close()
+	return asyncio.run(main())
+
+def test_query_flight_datasets_filters_in_database():
+	"""Le filtrage par dataset et callsign se fait côté PostgreSQL"""
+	current = run(flight_status.query_flight_datasets(dataset="current"))
+	assert all(r["status"] in flight_features.CURRENT_STATUSES for r in current)
+	assert all("dataset" not in r for r in current)
+
+	if current:
+		callsign = current[0]["callsign"]
+		filtered = run(flight_status.query_flight_datasets(dataset="current", callsign=callsign))
+		assert filtered and all(r["callsign"] == callsign for r in filtered)
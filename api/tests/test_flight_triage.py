@@ -0,0 +1,124 @@
+import os
+import sys
+from datetime import datetime, timezone
+import pytest
+from api.core.database import db
+
+# Triage ensembliste des plugins Airflow (module sans dépendance Airflow)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "airflow", "plugins"))
+from flight_triage import close_stale_flights, triage_flights
+
+STATIC = [
+	("TRG001", "Air Test", "CDG", "JFK", True),
+	("TRG002", "Air Test", None, "NCE", True),
+	("TRG003", "Air Test", "CDG", "LHR", True),
+	("TRG004", "Air Test", "ORY", "MAD", True),
+]
+
+# (callsign, icao24, flight_date, departure_scheduled, status, âge de last_update, unique_key)
+DYNAMIC = [
+	("TRG001", "trg001", "2026-01-10", "08:00", "arrived", "2 days", "TRG001_old"),
+	("TRG001", "trg001", "2026-01-12", "08:00", "en route", "2 minutes", "TRG001_live"),
+	("TRG002", "trg002", "2026-01-12", "09:00", "en route", "2 minutes", "TRG002_live"),
+	("TRG003", "trg003", "2026-01-12", "10:00", "arrived", "5 minutes", "TRG003_done"),
+	("TRG004", "trg004", "2026-01-12", "11:00", "en route", "30 minutes", "TRG004_stale"),
+]
+
+@pytest.fixture
+def conn():
+	with db.get_connection() as conn:
+		with conn.cursor() as cur:
+			cur.executemany("INSERT INTO flight_static VALUES (%s, %s, %s, %s, %s)", STATIC)
+			cur.executemany("""
+				INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, status, last_update, unique_key)
+				VALUES (%s, %s, %s, %s, %s, NOW() - %s::interval, %s)
+			""", DYNAMIC)
+		conn.commit()
+		yield conn
+		conn.rollback()
+		with conn.cursor() as cur:
+			cur.execute("DELETE FROM flight_dynamic WHERE callsign LIKE 'TRG%'")
+			cur.execute("DELETE FROM flight_static WHERE callsign LIKE 'TRG%'")
+		conn.commit()
+
+def per_row_triage(conn, flight, threshold_minutes=10):
+	"""Chemin historique : une lecture statique et une lecture dynamique par vol"""
+	with conn.cursor() as cur:
+		cur.execute("SELECT airline_name, origin_code, destination_code FROM flight_static WHERE callsign = %s", (flight["callsign"],))
+		static = cur.fetchone()
+		cur.execute("""
+			SELECT last_update, unique_key FROM flight_dynamic
+			WHERE callsign = %s AND icao24 = %s
+			ORDER BY flight_date DESC, departure_scheduled DESC LIMIT 1
+		""", (flight["callsign"], flight["icao24"]))
+		dynamic = cur.fetchone()
+
+	incomplete = not static or not all(static)
+	refresh = dynamic is None or (datetime.now(timezone.utc) - dynamic[0]).total_seconds() / 60 > threshold_minutes
+	if incomplete or refresh:
+		return "scrape", None
+	return "direct", dynamic[1]
+
+def test_triage_flights_matches_per_row_path(conn):
+	"""Vols nouveaux, incomplets, connus, périmés et terminés classés comme par le chemin ligne à ligne"""
+	flights = [
+		{"callsign": "TRG001", "icao24": "trg001"},
+		{"callsign": "TRG002", "icao24": "trg002"},
+		{"callsign": "TRG003", "icao24": "trg003"},
+		{"callsign": "TRG004", "icao24": "trg004"},
+		{"callsign": "TRG001", "icao24": "trg999"},
+		{"callsign": "TRG999", "icao24": "trg999"},
+	]
+	decisions = triage_flights(conn, flights)
+
+	batched = []
+	for decision in decisions:
+		if not decision["static_complete"] or decision["needs_refresh"]:
+			batched.append(("scrape", None))
+		else:
+			batched.append(("direct", decision["dynamic"]["unique_key"]))
+
+	assert batched == [per_row_triage(conn, f) for f in flights]
+	assert batched == [
+		("direct", "TRG001_live"),
+		("scrape", None),
+		("direct", "TRG003_done"),
+		("scrape", None),
+		("scrape", None),
+		("scrape", None),
+	]
+	assert decisions[2]["dynamic"]["status"] == "arrived"
+	assert decisions[4]["dynamic"] is None and decisions[5]["dynamic"] is None
+	assert triage_flights(conn, []) == []
+
+def test_close_stale_flights_only_touches_stale_open_flights(conn):
+	"""Seuls les vols en cours sans mise à jour depuis le seuil sont clos, les vols terminés restent intacts"""
+	# Tout se passe dans une transaction annulée : les données partagées de la base de test restent intactes
+	try:
+		# Vols périmés déjà présents (seed) clos d'abord, pour ne compter que ceux du test
+		close_stale_flights(conn, stale_minutes=90)
+		with conn.cursor() as cur:
+			cur.executemany("""
+				INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, status, last_update, unique_key)
+				VALUES (%s, 'trg005', '2026-01-12', '12:00', %s, NOW() - %s::interval, %s)
+			""", [
+				("TRG005", "en route", "100 minutes", "TRG005_stale"),
+				("TRG005", "departing", "2 hours", "TRG005_departing"),
+				("TRG005", "arrived", "3 hours", "TRG005_done"),
+			])
+			cur.execute("SELECT unique_key, status, last_update FROM flight_dynamic WHERE callsign LIKE 'TRG%' ORDER BY unique_key")
+			before = cur.fetchall()
+
+		assert close_stale_flights(conn, stale_minutes=90) == 2
+		with conn.cursor() as cur:
+			cur.execute("SELECT unique_key, status, last_update FROM flight_dynamic WHERE callsign LIKE 'TRG%' ORDER BY unique_key")
+			after = cur.fetchall()
+		assert close_stale_flights(conn, stale_minutes=90) == 0
+	finally:
+		conn.rollback()
+
+	closed = {"TRG005_stale", "TRG005_departing"}
+	assert [row[0] for row in after] == [row[0] for row in before]
+	for (key, status, last_update), (_, old_status, old_last_update) in zip(after, before):
+		assert status == ("arrived" if key in closed else old_status)
+		assert last_update == old_last_update
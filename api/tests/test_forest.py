@@ -0,0 +1,55 @@
+import os
+import sys
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+from api.services.forest import ForestPredictor
+from benchmarks._data import synthetic_flights, NUMERIC, CATEGORICAL
+
+# L'exporteur vit dans les plugins Airflow (module sans dépendance Airflow)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "airflow", "plugins"))
+from forest_export import export_forest, save_forest
+
+@pytest.fixture(scope="module")
+def pipeline():
+	"""Même structure que MLClient.train_and_log_model, forêt réduite pour la vitesse du test"""
+	df, y = synthetic_flights(3000)
+	preprocessor = ColumnTransformer([
+		("num", SimpleImputer(strategy="mean"), NUMERIC),
+		("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1), CATEGORICAL)
+	])
+	model = Pipeline([("prep", preprocessor), ("reg", RandomForestRegressor(n_estimators=20, max_depth=10, random_state=0))])
+	return model.fit(df, y)
+
+def test_forest_matches_sklearn_pipeline(pipeline):
+	"""Parité avec le pipeline sklearn, catégories inconnues et valeurs manquantes comprises"""
+	X, _ = synthetic_flights(1000, seed=1)
+	X.loc[X.index[:25], "callsign"] = "UNKNOWN"
+	X.loc[X.index[25:50], "icao24"] = 0  # fillna(0) côté API
+	X.loc[X.index[50:75], "geo_altitude"] = np.nan
+
+	predictor = ForestPredictor(export_forest(pipeline))
+	np.testing.assert_allclose(predictor.predict(X), pipeline.predict(X), rtol=1e-9, atol=1e-9)
+	assert predictor.n_trees == 20
+	assert predictor.predict(X.iloc[:0]).shape == (0,)
+
+def test_forest_roundtrip_through_memory_map(pipeline, tmp_path):
+	"""L'artefact se recharge sans pickle, projeté en lecture seule, et prédit à l'identique"""
+	directory = save_forest(pipeline, str(tmp_path))
+	predictor = ForestPredictor.load(directory)
+	# Aucune copie privée des tableaux des arbres
+	for array in (predictor.feature, predictor.threshold, predictor.children, predictor.value):
+		assert isinstance(array, np.memmap) and not array.flags.writeable
+
+	X, _ = synthetic_flights(200, seed=2)
+	np.testing.assert_allclose(predictor.predict(X), pipeline.predict(X), rtol=1e-9, atol=1e-9)
+
+def test_export_rejects_unsupported_pipeline():
+	df, y = synthetic_flights(100)
+	model = Pipeline([("reg", RandomForestRegressor(n_estimators=2))]).fit(df[NUMERIC].fillna(0), y)
+	with pytest.raises(ValueError):
+		export_forest(model)
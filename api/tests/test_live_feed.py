@@ -0,0 +1,141 @@
+import asyncio
+from datetime import timedelta
+from api.core.config import LIVE_FEED_CHANNEL
+from api.core.database import db, adb
+from api.services.live_feed import LiveFeed
+
+# Flux push des positions : une lecture par run ETL quel que soit le nombre d'abonnés
+
+SUBSCRIBERS = 500
+
+def position(indice, key):
+	return {"indice": indice, "unique_key": key, "callsign": key, "longitude": 2.0, "latitude": 48.0}
+
+class FakeChanges:
+	"""Source de delta simulée : un lot par run ETL, compte les lectures"""
+	def __init__(self, runs):
+		self.runs = list(runs)
+		self.calls = []
+
+	async def __call__(self, cursor):
+		self.calls.append(cursor)
+		return self.runs.pop(0)
+
+def fake_notifier(notifications):
+	async def notifier():
+		while True:
+			yield await notifications.get()
+	return notifier
+
+def test_live_feed_one_read_per_run_for_many_subscribers():
+	"""Chaque run notifié donne une seule lecture et le même diff à tous les abonnés"""
+	changes = FakeChanges([
+		{"next_cursor": 2, "data": [position(1, "A"), position(2, "B")], "removed": []},
+		{"next_cursor": 4, "data": [position(3, "A"), position(4, "C")], "removed": ["B"]},
+	])
+
+	async def scenario():
+		notifications = asyncio.Queue()
+		feed = LiveFeed(changes, notifier=fake_notifier(notifications), poll_interval=timedelta(hours=1))
+		feed.start()
+		queues = [feed.subscribe() for _ in range(SUBSCRIBERS)]
+		snapshots = [await asyncio.wait_for(q.get(), 1) for q in queues]
+
+		await notifications.put("run-2")
+		diffs = [await asyncio.wait_for(q.get(), 1) for q in queues]
+
+		# Abonné tardif : état servi depuis la mémoire, sans lecture
+		late = feed.subscribe().get_nowait()
+		await feed.stop()
+		return snapshots, diffs, late
+
+	snapshots, diffs, late = asyncio.run(scenario())
+
+	assert changes.calls == [None, 2]
+	assert all(event["event"] == "snapshot" and event["cursor"] == 2 for event in snapshots)
+	assert all(event is diffs[0] for event in diffs)
+	assert diffs[0]["removed"] == ["B"] and [r["indice"] for r in diffs[0]["data"]] == [3, 4]
+	assert sorted((r["unique_key"], r["indice"]) for r in late["data"]) == [("A", 3), ("C", 4)]
+
+def test_live_feed_resyncs_slow_subscriber():
+	"""Un abonné dont la file déborde reçoit un snapshot à la place des diffs perdus"""
+	runs = [{"next_cursor": 1, "data": [position(1, "A")], "removed": []}]
+	runs += [{"next_cursor": i, "data": [position(i, "A")], "removed": []} for i in range(2, 6)]
+	changes = FakeChanges(runs)
+
+	async def scenario():
+		feed = LiveFeed(changes, queue_size=2)
+		slow = feed.subscribe()
+		for _ in runs:
+			await feed.refresh()
+		return [slow.get_nowait() for _ in range(slow.qsize())]
+
+	events = asyncio.run(scenario())
+	assert events[0]["event"] == "snapshot"
+	assert events[-1]["cursor"] == 5
+	assert events[0]["data"][0]["indice"] >= 4
+
+def test_live_feed_wakes_up_on_postgres_notify():
+	"""Le NOTIFY émis par le DAG etl réveille le poller via LISTEN"""
+	changes = FakeChanges([
+		{"next_cursor": 1, "data": [], "removed": []},
+		{"next_cursor": 2, "data": [position(2, "A")], "removed": []},
+	])
+
+	async def scenario():
+		feed = LiveFeed(changes, notifier=lambda: adb.listen(LIVE_FEED_CHANNEL), poll_interval=timedelta(hours=1))
+		feed.start()
+		queue = feed.subscribe()
+		try:
+			await asyncio.wait_for(queue.get(), 2)
+			# Laisse le temps au LISTEN de s'établir avant le NOTIFY
+			for _ in range(50):
+				await asyncio.to_thread(db.execute, "SELECT pg_notify(%s, 'test-run')", (LIVE_FEED_CHANNEL,))
+				try:
+					return await asyncio.wait_for(queue.get(), 0.1)
+				except asyncio.TimeoutError:
+					continue
+		finally:
+			await feed.stop()
+			await adb.close()
+
+	event = asyncio.run(scenario())
+	assert event["event"] == "diff" and event["cursor"] == 2
+
+def test_live_feed_discards_refresh_in_flight_during_reset():
+	"""Un reset pendant une lecture en vol : le delta est écarté et le prochain abonné reçoit un état complet"""
+	release = asyncio.Event()
+	runs = [
+		{"next_cursor": 2, "data": [position(1, "A"), position(2, "B")], "removed": []},
+		{"next_cursor": 3, "data": [position(3, "C")], "removed": []},
+		{"next_cursor": 3, "data": [position(2, "B"), position(3, "C")], "removed": ["A"]},
+	]
+	calls = []
+
+	async def fetch_changes(cursor):
+		calls.append(cursor)
+		if len(calls) == 2:
+			await release.wait()
+		return runs[len(calls) - 1]
+
+	async def scenario():
+		feed = LiveFeed(fetch_changes)
+		first = feed.subscribe()
+		await feed.refresh()
+
+		# Delta en vol depuis le curseur 2, puis le dernier abonné part (reset)
+		in_flight = asyncio.create_task(feed.refresh())
+		await asyncio.sleep(0)
+		feed.unsubscribe(first)
+		release.set()
+		assert await in_flight is None
+		assert feed.cursor is None and feed.positions == {}
+
+		second = feed.subscribe()
+		await feed.refresh()
+		return second.get_nowait()
+
+	snapshot = asyncio.run(scenario())
+	assert calls == [None, 2, None]
+	assert snapshot["event"] == "snapshot" and snapshot["cursor"] == 3
+	assert sorted(r["unique_key"] for r in snapshot["data"]) == ["B", "C"]
@@ -0,0 +1,69 @@
+import os
+import sys
+import psycopg2
+import pytest
+from api.core.database import db, ASYNC_CONNECTION_KWARGS
+
+# Le cache météo vit dans les plugins Airflow (module sans dépendance Airflow)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "airflow", "plugins"))
+from weather_cache import WeatherCache
+
+WEATHER = {"temperature": 12.5, "wind_speed": 20.0, "gust_speed": None, "visibility": 10.0,
+		   "cloud_coverage": 75, "rain": 0.1, "global_condition": "Partly cloudy"}
+
+@pytest.fixture
+def conn():
+	# Connexion dédiée au cache (passée en autocommit), hors du pool partagé
+	conn = psycopg2.connect(**ASYNC_CONNECTION_KWARGS)
+	yield conn
+	with conn.cursor() as cur:
+		cur.execute("DELETE FROM weather_cache")
+	conn.commit()
+	conn.close()
+
+def test_weather_cache_shares_cell_across_aircraft_and_runs(conn):
+	"""Deux avions de la même cellule partagent l'entrée, relue par une autre tâche (autre processus)"""
+	cache = WeatherCache(conn, resolution=0.25, ttl_minutes=30)
+	assert cache.get(48.85, 2.35) is None
+	cache.set(48.85, 2.35, WEATHER)
+	assert cache.get(48.95, 2.45) == WEATHER
+
+	# Nouvelle instance : lecture depuis la table, cellule voisine distincte
+	next_run = WeatherCache(conn, resolution=0.25, ttl_minutes=30)
+	assert next_run.get(48.80, 2.30) == WEATHER
+	assert next_run.get(49.10, 2.35) is None
+	assert (cache.hits, cache.misses) == (1, 1)
+	assert next_run.hit_ratio == 0.5
+
+def test_weather_cache_expires_buckets_and_bounds_size(conn):
+	"""Purge : tranches échues, puis entrées les plus anciennes au-delà de max_entries"""
+	cache = WeatherCache(conn, resolution=1.0, ttl_minutes=30, max_entries=3)
+	for lat in range(5):
+		cache.set(float(lat), 0.0, WEATHER)
+	with conn.cursor() as cur:
+		cur.execute("INSERT INTO weather_cache (cell, bucket, weather) VALUES ('0:0', 1, '{}')")
+	conn.commit()
+
+	assert cache.prune() == 3
+	with conn.cursor() as cur:
+		cur.execute("SELECT cell FROM weather_cache ORDER BY cell")
+		assert [row[0] for row in cur.fetchall()] == ["2:0", "3:0", "4:0"]
+	conn.commit()
+
+def test_weather_cache_leaves_task_transaction_alone(conn):
+	"""Lectures, écritures et purge du cache ne valident ni n'annulent le travail en cours de la tâche"""
+	cache = WeatherCache(conn, resolution=1.0, ttl_minutes=30)
+	with db.get_connection() as task_conn:
+		with task_conn.cursor() as cur:
+			cur.execute("INSERT INTO flight_static (callsign, airline_name) VALUES ('WCACHE1', 'Pending')")
+		cache.get(10.0, 10.0)
+		cache.set(10.0, 10.0, WEATHER)
+		cache.prune()
+		assert task_conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+		task_conn.rollback()
+
+		with task_conn.cursor() as cur:
+			cur.execute("SELECT count(*) FROM flight_static WHERE callsign = 'WCACHE1'")
+			assert cur.fetchone()[0] == 0
+		task_conn.commit()
+	assert WeatherCache(conn, resolution=1.0, ttl_minutes=30).get(10.0, 10.0) == WEATHER
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from contextlib import closing
+import psycopg2
+import pytest
+from api.core.database import ASYNC_CONNECTION_KWARGS
+
+# Client météo des plugins Airflow (modules sans dépendance Airflow), testé contre un serveur HTTP local
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "airflow", "plugins"))
+from weather_cache import WeatherCache
+from weather_fetcher import WeatherFetcher, get_weather_many
+
+FIELDS = ["temperature", "wind_speed", "gust_speed", "visibility", "cloud_coverage", "rain", "global_condition"]
+
+class StubWeatherAPI(BaseHTTPRequestHandler):
+	"""Réponse type de l'API météo : temp_c = latitude demandée, après un délai fixe"""
+	protocol_version = "HTTP/1.1"
+	delay = 0.0
+	requests, connections = [], set()
+	# Appels simultanés en cours et maximum observé
+	lock, active, peak = threading.Lock(), 0, 0
+
+	def do_GET(self):
+		lat, lon = parse_qs(urlparse(self.path).query)["q"][0].split(",")
+		stub = type(self)
+		with stub.lock:
+			stub.requests.append((float(lat), float(lon)))
+			stub.connections.add(self.client_address)
+			stub.active += 1
+			stub.peak = max(stub.peak, stub.active)
+		time.sleep(self.delay)
+		with stub.lock:
+			stub.active -= 1
+		body = json.dumps({"current": {"temp_c": float(lat), "wind_kph": 10.0, "condition": {"text": "Sunny"}}}).encode()
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+@pytest.fixture
+def stub():
+	StubWeatherAPI.requests, StubWeatherAPI.connections, StubWeatherAPI.delay = [], set(), 0.0
+	StubWeatherAPI.active = StubWeatherAPI.peak = 0
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StubWeatherAPI)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	yield f"http://127.0.0.1:{server.server_address[1]}/current.json"
+	server.shutdown()
+	server.server_close()
+
+def test_weather_many_dedupes_and_fetches_concurrently_over_keep_alive(stub):
+	"""Coordonnées dédupliquées, appels en parallèle sur un pool de connexions réutilisées"""
+	StubWeatherAPI.delay = 0.2
+	fetcher = WeatherFetcher(stub, "key", timeout=5, max_workers=4, rate_limit=0, deadline=5)
+	points = [(40.0 + i, 2.0) for i in range(8)] + [(40.0, 2.0), (41.0, 2.0), (47.0, 2.0), (40.0, 2.0)]
+
+	start = time.perf_counter()
+	weather = get_weather_many(fetcher, points, FIELDS)
+	elapsed = time.perf_counter() - start
+	again = get_weather_many(fetcher, points[:4], FIELDS)
+
+	assert [w["temperature"] for w in weather] == [lat for lat, _ in points]
+	assert sorted(StubWeatherAPI.requests[:8]) == sorted(set(points))
+	# 8 appels de 0,2 s sur 4 workers : appels simultanés, bien en deçà des 1,6 s d'appels successifs
+	assert 2 <= StubWeatherAPI.peak <= 4
+	assert elapsed < 1.5
+	assert [w["temperature"] for w in again] == [40.0, 41.0, 42.0, 43.0]
+	assert len(StubWeatherAPI.connections) <= 4
+	# 16 lectures demandées, 12 points transmis à l'API (doublons du lot regroupés)
+	assert fetcher.requested == 12
+
+def test_weather_many_respects_rate_limit_and_deadline(stub):
+	"""Débit plafonné et échéance globale : les points non servis à temps restent vides"""
+	fetcher = WeatherFetcher(stub, "key", timeout=5, max_workers=8, rate_limit=5, deadline=0.5)
+	points = [(10.0 + i, 0.0) for i in range(10)]
+
+	start = time.perf_counter()
+	weather = get_weather_many(fetcher, points, FIELDS)
+	elapsed = time.perf_counter() - start
+
+	# 5 appels/s pendant 0,5 s : 2 ou 3 points servis, quel que soit leur rang dans le lot
+	served = [w for w in weather if w["temperature"] is not None]
+	assert 2 <= len(served) <= 3 and len(StubWeatherAPI.requests) == len(served)
+	assert weather.count({k: None for k in FIELDS}) == len(points) - len(served)
+	# Échéance respectée : pas d'attente des 2 s nécessaires aux 10 points
+	assert elapsed < 1.5
+
+def test_weather_many_shares_cache_cells(stub):
+	"""Avec le cache : un appel par cellule, puis plus aucun appel sur la même tranche"""
+	fetcher = WeatherFetcher(stub, "key", timeout=5, rate_limit=0)
+	points = [(48.1, 2.1), (48.9, 2.9), (45.5, 4.5), (48.5, 2.5)]
+	with closing(psycopg2.connect(**ASYNC_CONNECTION_KWARGS)) as conn:
+		try:
+			first = get_weather_many(fetcher, points, FIELDS, WeatherCache(conn, resolution=1.0, ttl_minutes=30))
+			assert len(StubWeatherAPI.requests) == 2
+			# Tâche suivante : tout est servi par la table
+			next_task = WeatherCache(conn, resolution=1.0, ttl_minutes=30)
+			second = get_weather_many(fetcher, points, FIELDS, next_task)
+			assert len(StubWeatherAPI.requests) == 2 and next_task.hits == 2
+			assert fetcher.requested == 2
+		finally:
+			with conn.cursor() as cur:
+				cur.execute("DELETE FROM weather_cache")
+
+	assert [w["temperature"] for w in first] == [48.1, 48.1, 45.5, 48.1]
+	assert second == first
@@ -0,0 +1,24 @@
+"""
+Vols synthétiques au format des features du modèle de retard, partagés par les benchmarks et les tests de la forêt.
+"""
+import numpy as np
+import pandas as pd
+
+NUMERIC = ["longitude", "latitude", "geo_altitude", "velocity", "departure_difference"]
+CATEGORICAL = ["callsign", "icao24", "global_condition"]
+
+def synthetic_flights(n, seed=0):
+	rng = np.random.default_rng(seed)
+	df = pd.DataFrame({
+		"callsign": rng.choice([f"AFR{i:03d}" for i in range(40)], n),
+		"icao24": rng.choice([f"abc{i:03d}" for i in range(60)], n),
+		"longitude": rng.normal(2, 3, n),
+		"latitude": rng.normal(48, 2, n),
+		"geo_altitude": rng.uniform(0, 12000, n),
+		"velocity": rng.uniform(0, 300, n),
+		"global_condition": rng.choice(["Sunny", "Rain", "Cloudy"], n),
+		"departure_difference": rng.normal(10, 20, n)
+	})
+	df.loc[rng.random(n) < 0.1, "velocity"] = np.nan
+	y = 0.8 * df["departure_difference"] + 0.01 * df["velocity"].fillna(150) + rng.normal(0, 5, n)
+	return df, y
@@ -0,0 +1,66 @@
+"""
+Test de charge local de l'API : débit (req/s) et latence p95 selon le nombre de clients concurrents.
+
+Lance uvicorn (un worker) sur l'arbre indiqué par PYTHONPATH, puis envoie les requêtes avec httpx.
+Permet de comparer les handlers sync (threadpool + psycopg2) et async (psycopg 3) sur la même base.
+Usage : PYTHONPATH=. python benchmarks/api_load.py [endpoint]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+PORT = 8765
+ENDPOINT = sys.argv[1] if len(sys.argv) > 1 else "/live/current/all"
+CONCURRENCY = [1, 10, 25, 50, 100]
+REQUESTS_PER_CLIENT = 20
+
+async def client_loop(http, latencies):
+	for _ in range(REQUESTS_PER_CLIENT):
+		start = time.perf_counter()
+		response = await http.get(ENDPOINT)
+		response.raise_for_status()
+		latencies.append(time.perf_counter() - start)
+
+async def run_level(concurrency):
+	latencies = []
+	limits = httpx.Limits(max_connections=concurrency)
+	async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as http:
+		start = time.perf_counter()
+		await asyncio.gather(*(client_loop(http, latencies) for _ in range(concurrency)))
+		elapsed = time.perf_counter() - start
+	p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+	return len(latencies) / elapsed, p95 * 1000
+
+def wait_ready(timeout=30):
+	deadline = time.time() + timeout
+	while time.time() < deadline:
+		try:
+			if httpx.get(f"http://127.0.0.1:{PORT}/healthcheck").status_code == 200:
+				return
+		except httpx.TransportError:
+			pass
+		time.sleep(0.2)
+	raise RuntimeError("API non démarrée")
+
+def main():
+	server = subprocess.Popen(
+		[sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(PORT), "--log-level", "warning"],
+		env=os.environ.copy()
+	)
+	try:
+		wait_ready()
+		print(f"{ENDPOINT} ({REQUESTS_PER_CLIENT} requêtes par client)")
+		print(f"{'clients':>8} {'req/s':>10} {'p95 (ms)':>10}")
+		for concurrency in CONCURRENCY:
+			throughput, p95 = asyncio.run(run_level(concurrency))
+			print(f"{concurrency:>8} {throughput:>10.1f} {p95:>10.1f}")
+	finally:
+		server.terminate()
+		server.wait()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,88 @@
+"""
+Chargement de live_data : INSERT + commit par ligne (avant) contre COPY en staging + fusion par lot (après).
+
+Les lignes de benchmark sont rattachées à des vols BLK* supprimés en fin de run.
+Usage : PYTHONPATH=. python benchmarks/bulk_loading.py
+"""
+import os
+import sys
+import time
+import uuid
+import psycopg2
+from api.core.config import POSTGRES_HOST, POSTGRES_PORT, AIRLINES_POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "plugins"))
+from bulk_loader import BulkLoader, LIVE_DATA
+
+SIZES = [1000, 10000, 100000]
+FLIGHTS = 100
+BAD_ROWS = 5
+
+ROW_INSERT = f"""
+	INSERT INTO live_data ({", ".join(LIVE_DATA.columns)})
+	VALUES ({", ".join(f"%({c})s" for c in LIVE_DATA.columns)})
+"""
+
+def seed(conn):
+	with conn.cursor() as cur:
+		for i in range(FLIGHTS):
+			cur.execute("INSERT INTO flight_static (callsign) VALUES (%s)", (f"BLK{i:03d}",))
+			cur.execute("""
+				INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, status, unique_key)
+				VALUES (%s, %s, '2026-01-01', '10:00:00', 'en route', %s)
+			""", (f"BLK{i:03d}", f"b{i:05d}", f"BLK-{i}"))
+	conn.commit()
+
+def live_rows(n, bad=0):
+	# Un request_id par run ETL simulé : une position par vol et par run
+	runs = [str(uuid.uuid4()) for _ in range(n // FLIGHTS + 1)]
+	rows = [{
+		"request_id": runs[i // FLIGHTS], "callsign": f"BLK{i % FLIGHTS:03d}", "icao24": f"b{i % FLIGHTS:05d}",
+		"flight_date": "2026-01-01", "departure_scheduled": "10:00:00", "longitude": 2.0 + i * 1e-5, "latitude": 48.0,
+		"baro_altitude": 10000.0, "geo_altitude": 10100.0, "on_ground": False, "velocity": 230.0, "vertical_rate": 0.0,
+		"temperature": 12.5, "wind_speed": 5.0, "gust_speed": None, "visibility": 10000.0, "cloud_coverage": 20.0,
+		"rain": 0.0, "global_condition": "Clouds", "unique_key": f"BLK-{i % FLIGHTS}"
+	} for i in range(n)]
+	# Lignes invalides (vol inconnu : clé étrangère) réparties dans le lot
+	for k in range(bad):
+		rows[(k + 1) * n // (bad + 1)]["unique_key"] = "BLK-unknown"
+	return rows
+
+def row_by_row(conn, rows):
+	cur = conn.cursor()
+	loaded = 0
+	for row in rows:
+		try:
+			cur.execute(ROW_INSERT, row)
+			conn.commit()
+			loaded += 1
+		except psycopg2.Error:
+			conn.rollback()
+	return loaded
+
+def timed(fn, *args):
+	start = time.perf_counter()
+	loaded = fn(*args)
+	return loaded, time.perf_counter() - start
+
+def main():
+	conn = psycopg2.connect(host=POSTGRES_HOST, port=POSTGRES_PORT, dbname=AIRLINES_POSTGRES_DB, user=POSTGRES_USER, password=POSTGRES_PASSWORD)
+	loader = BulkLoader(conn)
+	try:
+		seed(conn)
+		print(f"{'lignes':>8} {'invalides':>10} {'par ligne (l/s)':>16} {'bulk (l/s)':>12} {'chargées':>10}")
+		for n in SIZES:
+			for bad in (0, BAD_ROWS):
+				_, before = timed(row_by_row, conn, live_rows(n, bad))
+				loaded, after = timed(loader.load, LIVE_DATA, live_rows(n, bad))
+				print(f"{n:>8} {bad:>10} {n / before:>16.0f} {n / after:>12.0f} {loaded:>10}")
+	finally:
+		conn.rollback()
+		with conn.cursor() as cur:
+			for table in ("live_data", "flight_dynamic", "flight_static"):
+				cur.execute(f"DELETE FROM {table} WHERE callsign LIKE 'BLK%%'")
+		conn.commit()
+		conn.close()
+
+if __name__ == "__main__":
+	main()
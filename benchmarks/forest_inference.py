@@ -0,0 +1,71 @@
+"""
+Benchmark d'inférence du modèle de retard : pyfunc MLflow / pipeline sklearn / forêt NumPy exportée.
+
+Forêt de même taille que MLClient.train_and_log_model (100 arbres, profondeur 10),
+entraînée sur données synthétiques. Mesure la latence par taille de lot, le temps de chargement et la taille sur disque.
+Usage : PYTHONPATH=. python benchmarks/forest_inference.py
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+import mlflow.pyfunc
+import mlflow.sklearn
+from api.services.forest import ForestPredictor
+from benchmarks._data import synthetic_flights, NUMERIC, CATEGORICAL
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "plugins"))
+from forest_export import save_forest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+RUNS = 20
+
+def timed(fn, runs=RUNS):
+	durations = []
+	for _ in range(runs):
+		start = time.perf_counter()
+		fn()
+		durations.append(time.perf_counter() - start)
+	return statistics.median(durations) * 1000
+
+def dir_size(path):
+	return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def main():
+	df, y = synthetic_flights(50000)
+	preprocessor = ColumnTransformer([
+		("num", SimpleImputer(strategy="mean"), NUMERIC),
+		("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1), CATEGORICAL)
+	])
+	pipeline = Pipeline([("prep", preprocessor), ("reg", RandomForestRegressor(n_estimators=100, max_depth=10, n_jobs=-1, random_state=0))])
+	pipeline.fit(df, y)
+	pipeline.named_steps["reg"].n_jobs = 1
+
+	with tempfile.TemporaryDirectory() as tmp:
+		model_dir = os.path.join(tmp, "model")
+		mlflow.sklearn.save_model(pipeline, model_dir)
+		forest_path = save_forest(pipeline, os.path.join(tmp, "forest"))
+
+		pyfunc_load = timed(lambda: mlflow.pyfunc.load_model(model_dir), runs=5)
+		forest_load = timed(lambda: ForestPredictor.load(forest_path), runs=5)
+		print(f"{'':<12} {'chargement (ms)':>16} {'taille (Ko)':>12}")
+		print(f"{'pyfunc':<12} {pyfunc_load:>16.1f} {dir_size(model_dir) / 1024:>12.0f}")
+		print(f"{'numpy':<12} {forest_load:>16.1f} {dir_size(forest_path) / 1024:>12.0f}")
+
+		pyfunc = mlflow.pyfunc.load_model(model_dir)
+		forest = ForestPredictor.load(forest_path)
+
+	print(f"\n{'lot':>6} {'pyfunc (ms)':>12} {'sklearn (ms)':>13} {'numpy (ms)':>11}")
+	for size in BATCH_SIZES:
+		X, _ = synthetic_flights(size, seed=size)
+		runs = RUNS if size < 10000 else 5
+		print(f"{size:>6} {timed(lambda: pyfunc.predict(X), runs):>12.2f} {timed(lambda: pipeline.predict(X), runs):>13.2f} {timed(lambda: forest.predict(X), runs):>11.2f}")
+
+if __name__ == "__main__":
+	main()
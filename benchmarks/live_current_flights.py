@@ -0,0 +1,86 @@
+"""
+Benchmark des requêtes live_data sur les vols en cours :
+liste de tuples IN (...) / NOT IN (...) (avant) contre jointure unnest (après).
+
+Les données synthétiques sont insérées dans une transaction annulée en fin de run.
+Usage : PYTHONPATH=. python benchmarks/live_current_flights.py
+"""
+import statistics
+import time
+import uuid
+import psycopg2
+from psycopg2.extras import execute_values
+from api.core.config import POSTGRES_HOST, POSTGRES_PORT, AIRLINES_POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+from api.routers.live import CURRENT_FLIGHTS
+
+FLEET_SIZES = [100, 1000, 10000]
+ROWS_PER_FLIGHT = 10
+RUNS = 5
+
+def seed(cur, n_flights):
+	"""n_flights vols en cours + autant de vols terminés, ROWS_PER_FLIGHT positions chacun."""
+	flights = [(f"BENCH{i:05d}", f"B{i:05d}", f"BENCH-{i}") for i in range(2 * n_flights)]
+	execute_values(cur, "INSERT INTO flight_static (callsign) VALUES %s ON CONFLICT DO NOTHING", [(f[0],) for f in flights])
+	execute_values(cur, """
+		INSERT INTO flight_dynamic (callsign, icao24, flight_date, departure_scheduled, status, last_update, unique_key)
+		VALUES %s
+	""", [(c, i, "2026-01-01", "10:00:00", "en route" if n < n_flights else "arrived", "2026-01-01", k) for n, (c, i, k) in enumerate(flights)])
+	runs = [str(uuid.uuid4()) for _ in range(ROWS_PER_FLIGHT)]
+	execute_values(cur, """
+		INSERT INTO live_data (request_id, callsign, icao24, flight_date, departure_scheduled, unique_key, longitude, latitude)
+		VALUES %s
+	""", [(r, c, i, "2026-01-01", "10:00:00", k, 2.0, 48.0) for r in runs for (c, i, k) in flights], page_size=5000)
+	cur.execute("ANALYZE live_data")
+	return flights[:n_flights]
+
+def tuple_list_sql(current, negate=False):
+	in_clause = ",".join(["(%s,%s,%s)"] * len(current))
+	op = "NOT IN" if negate else "IN"
+	sql = f"SELECT * FROM live_data WHERE (unique_key, callsign, icao24) {op} ({in_clause}) ORDER BY request_id DESC"
+	return sql, [v for (c, i, k) in current for v in (k, c, i)]
+
+def unnest_sql(current, negate=False):
+	params = [[k for (_, _, k) in current], [c for (c, _, _) in current], [i for (_, i, _) in current]]
+	if negate:
+		sql = f"""
+			SELECT * FROM live_data WHERE NOT EXISTS (
+				SELECT 1 FROM {CURRENT_FLIGHTS}
+				WHERE cur.unique_key = live_data.unique_key AND cur.callsign = live_data.callsign AND cur.icao24 = live_data.icao24
+			) ORDER BY request_id DESC
+		"""
+	else:
+		sql = f"SELECT live_data.* FROM live_data JOIN {CURRENT_FLIGHTS} USING (unique_key, callsign, icao24) ORDER BY request_id DESC"
+	return sql, params
+
+def timed(cur, sql, params):
+	durations = []
+	for _ in range(RUNS):
+		start = time.perf_counter()
+		try:
+			cur.execute(sql, params)
+			cur.fetchall()
+		except psycopg2.errors.QueryCanceled:
+			return None
+		durations.append((time.perf_counter() - start) * 1000)
+	return statistics.median(durations)
+
+def main():
+	conn = psycopg2.connect(host=POSTGRES_HOST, port=POSTGRES_PORT, dbname=AIRLINES_POSTGRES_DB, user=POSTGRES_USER, password=POSTGRES_PASSWORD)
+	print(f"{'flights':>8} {'query':>8} {'before (ms)':>12} {'after (ms)':>12}")
+	for n in FLEET_SIZES:
+		with conn.cursor() as cur:
+			current = seed(cur, n)
+			cur.execute("SAVEPOINT bench")
+			for label, negate in [("current", False), ("history", True)]:
+				cur.execute("SET LOCAL statement_timeout = '60s'")
+				before = timed(cur, *tuple_list_sql(current, negate))
+				if before is None:
+					cur.execute("ROLLBACK TO SAVEPOINT bench")
+				after = timed(cur, *unnest_sql(current, negate))
+				before_txt = f"{before:.1f}" if before is not None else "> 60000"
+				print(f"{n:>8} {label:>8} {before_txt:>12} {after:>12.1f}")
+		conn.rollback()
+	conn.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,91 @@
+"""
+Mémoire résidente et temps de chargement du modèle par worker API :
+pyfunc MLflow (pickle) / forêt NumPy lue en mémoire / forêt NumPy projetée (mmap).
+
+Lance WORKERS processus simultanés (comme des workers uvicorn/gunicorn) qui chargent le même artefact.
+RSS : mémoire résidente du worker ; PSS : part proportionnelle (pages partagées divisées entre workers).
+Usage : PYTHONPATH=. python benchmarks/model_memory.py
+"""
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+import mlflow.pyfunc
+import mlflow.sklearn
+from api.services.forest import ForestPredictor
+from benchmarks._data import synthetic_flights, NUMERIC, CATEGORICAL
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "plugins"))
+from forest_export import save_forest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+WORKERS = 4
+BATCH = 500
+
+def memory_kb():
+	"""(RSS, PSS) du processus courant en Ko, d'après /proc/self/smaps_rollup."""
+	values = {}
+	with open("/proc/self/smaps_rollup") as f:
+		for line in f:
+			parts = line.split()
+			if parts[0] in ("Rss:", "Pss:"):
+				values[parts[0][:-1]] = int(parts[1])
+	return values["Rss"], values["Pss"]
+
+def load(mode, path):
+	if mode == "pyfunc":
+		return mlflow.pyfunc.load_model(path)
+	return ForestPredictor.load(path, mmap=(mode == "mmap"))
+
+def worker(mode, path, barrier, results):
+	X, _ = synthetic_flights(BATCH, seed=1)
+	rss_before, pss_before = memory_kb()
+	start = time.perf_counter()
+	model = load(mode, path)
+	load_ms = (time.perf_counter() - start) * 1000
+	model.predict(X)
+	# Tous les workers ont chargé le modèle avant la mesure (partage des pages)
+	barrier.wait()
+	rss_after, pss_after = memory_kb()
+	results.put((load_ms, rss_after - rss_before, pss_after - pss_before))
+	barrier.wait()
+
+def measure(mode, path):
+	ctx = mp.get_context("spawn")
+	barrier, results = ctx.Barrier(WORKERS), ctx.Queue()
+	processes = [ctx.Process(target=worker, args=(mode, path, barrier, results)) for _ in range(WORKERS)]
+	for p in processes:
+		p.start()
+	rows = [results.get() for _ in processes]
+	for p in processes:
+		p.join()
+	return [sum(col) / len(rows) for col in zip(*rows)]
+
+def main():
+	df, y = synthetic_flights(50000)
+	preprocessor = ColumnTransformer([
+		("num", SimpleImputer(strategy="mean"), NUMERIC),
+		("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1), CATEGORICAL)
+	])
+	pipeline = Pipeline([("prep", preprocessor), ("reg", RandomForestRegressor(n_estimators=100, max_depth=10, n_jobs=-1, random_state=0))])
+	pipeline.fit(df, y)
+	pipeline.named_steps["reg"].n_jobs = 1
+
+	with tempfile.TemporaryDirectory() as tmp:
+		model_dir = os.path.join(tmp, "model")
+		mlflow.sklearn.save_model(pipeline, model_dir)
+		forest_dir = save_forest(pipeline, os.path.join(tmp, "forest"))
+
+		print(f"{WORKERS} workers, moyenne par worker")
+		print(f"{'':<8} {'chargement (ms)':>16} {'RSS (Mo)':>10} {'PSS (Mo)':>10}")
+		for mode, path in [("pyfunc", model_dir), ("numpy", forest_dir), ("mmap", forest_dir)]:
+			load_ms, rss, pss = measure(mode, path)
+			print(f"{mode:<8} {load_ms:>16.1f} {rss / 1024:>10.1f} {pss / 1024:>10.1f}")
+
+if __name__ == "__main__":
+	main()
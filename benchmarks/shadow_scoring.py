@@ -0,0 +1,79 @@
+"""
+Latence du chemin de production (score_rows) avec et sans scoring fantôme du challenger.
+
+Deux forêts NumPy de la taille de MLClient.train_and_log_model (100 arbres, profondeur 10),
+CLIENTS appelants concurrents sur la boucle asyncio (pause THINK_TIME entre deux appels, charge sous la saturation),
+lots de BATCH lignes, version "unknown" (aucune écriture DB). Configurations alternées sur ROUNDS tours.
+Usage : PYTHONPATH=. python benchmarks/shadow_scoring.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from api.routers import predict
+from api.services.forest import ForestPredictor
+from benchmarks._data import synthetic_flights, NUMERIC, CATEGORICAL
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "plugins"))
+from forest_export import export_forest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+CLIENTS = 4
+CALLS_PER_CLIENT = 100
+BATCH = 200
+THINK_TIME = 0.1
+ROUNDS = 3
+
+def train(seed):
+	df, y = synthetic_flights(50000, seed=seed)
+	preprocessor = ColumnTransformer([
+		("num", SimpleImputer(strategy="mean"), NUMERIC),
+		("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1), CATEGORICAL)
+	])
+	pipeline = Pipeline([("prep", preprocessor), ("reg", RandomForestRegressor(n_estimators=100, max_depth=10, n_jobs=-1, random_state=seed))])
+	return ForestPredictor(export_forest(pipeline.fit(df, y)))
+
+async def caller(model, rows, latencies):
+	for _ in range(CALLS_PER_CLIENT):
+		start = time.perf_counter()
+		await predict.score_rows(model, "unknown", rows, [])
+		latencies.append(time.perf_counter() - start)
+		await asyncio.sleep(THINK_TIME)
+
+async def run(model, rows):
+	latencies = []
+	await asyncio.gather(*(caller(model, rows, latencies) for _ in range(CLIENTS)))
+	# Lots fantômes restants traités avant la mesure suivante
+	if predict.shadow_scorer._executor is not None:
+		await asyncio.wrap_future(predict.shadow_scorer._executor.submit(lambda: None))
+	quantiles = statistics.quantiles(latencies, n=100)
+	return quantiles[49] * 1000, quantiles[98] * 1000
+
+def main():
+	production, challenger = train(0), train(1)
+	X, _ = synthetic_flights(BATCH, seed=2)
+	rows = [{**row, "indice": i, "unique_key": f"k{i}"} for i, row in enumerate(X.drop(columns="departure_difference").to_dict("records"))]
+
+	configs = {"sans challenger": (None, None), "challenger fantôme": (challenger, "v-challenger")}
+	results = {label: [] for label in configs}
+	predict.shadow_scorer.start()
+	asyncio.run(run(production, rows))  # échauffement
+	for _ in range(ROUNDS):
+		for label, (model, version) in configs.items():
+			predict.challenger_model, predict.challenger_version = model, version
+			results[label].append(asyncio.run(run(production, rows)))
+	predict.shadow_scorer.stop()
+
+	print(f"{CLIENTS} clients, {CALLS_PER_CLIENT} appels chacun, lots de {BATCH} lignes (médiane sur {ROUNDS} tours)")
+	print(f"{'':<22} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+	for label, runs in results.items():
+		p50, p99 = (statistics.median(col) for col in zip(*runs))
+		print(f"{label:<22} {p50:>10.1f} {p99:>10.1f}")
+
+if __name__ == "__main__":
+	main()